@@ -26,9 +26,13 @@ from src.core.database import engine, Base, run_auto_migrations
 from src.models.user import User
 from src.models.profile import Experience, Education, Skill, Language
 from src.models.usage import UsageLog
+from src.models.job import Job
 
 from src.api import auth, analysis, generation, profile as profile_api, admin as admin_api
 from src.core.orchestration import parser_agent
+from src.core.latex_compiler import available_engines
+from src.core.job_queue import JobWorker
+from src.core.retention import RetentionSweeper
 from src.core.error_handlers import global_exception_handler, database_exception_handler
 
 # --- Environment State ---
@@ -45,6 +49,18 @@ try:
 except Exception as e:
     logger.error(f"Migration error: {e}")
 
+# --- LaTeX engines (probed once per process, not per generation) ---
+available_engines()
+
+# --- Job worker ---
+# "embedded": jobs run in this process (local dev, single dyno).
+# "external": the API only enqueues; run `python worker.py` as separate processes.
+JOB_WORKER_MODE = os.getenv("JOB_WORKER_MODE", "embedded")
+embedded_worker = JobWorker() if JOB_WORKER_MODE == "embedded" else None
+
+# --- Generated CV retention (periodic cleanup of outputs/generated_cvs) ---
+retention_sweeper = RetentionSweeper()
+
 # --- FastAPI App ---
 app = FastAPI(
     title="reZume API",
@@ -88,6 +104,18 @@ app.include_router(analysis.router, prefix="/api", tags=["Analysis"])
 app.include_router(generation.router, prefix="/api", tags=["Generation"])
 app.include_router(admin_api.router, prefix="/api/admin", tags=["Admin"])
 
+@app.on_event("startup")
+def start_background_threads():
+    retention_sweeper.start()
+    if embedded_worker:
+        embedded_worker.start()
+
+@app.on_event("shutdown")
+def stop_background_threads():
+    retention_sweeper.stop()
+    if embedded_worker:
+        embedded_worker.stop(timeout=30)
+
 @app.get("/")
 def health_check():
     return {"status": "Online"} if ENV == "prod" else {"status": "Online", "db": "Active", "env": ENV}
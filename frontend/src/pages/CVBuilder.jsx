@@ -200,17 +200,33 @@ export default function CVBuilderApp() {
     }
   }, [API_URL, profileData]);
 
-  // Polling Logic
+  // Long-polling: the server holds each request until the job reaches another stage
   useEffect(() => {
-    let pollInterval;
-    if (jobId && isGenerating) {
-      pollInterval = setInterval(async () => {
+    let cancelled = false;
+    const STAGE_LABELS = {
+      queued: "En file d'attente",
+      ranking_skills: "Classement des compétences",
+      llm: "Rédaction par l'IA",
+      compiling: "Compilation LaTeX",
+      validating: "Vérification (1 page)",
+      retrying: "CV trop long, nouvelle tentative",
+    };
+
+    const poll = async () => {
+      let since = '';
+      while (!cancelled) {
         try {
-          const res = await fetch(`${API_URL}/api/status/${jobId}`, {
+          const res = await fetch(`${API_URL}/api/status/${jobId}?wait=25&since=${encodeURIComponent(since)}`, {
             headers: { 'Authorization': `Bearer ${token}` }
           });
-          if (!res.ok) return;
+          if (!res.ok) {
+            await new Promise(r => setTimeout(r, 3000));
+            continue;
+          }
           const data = await res.json();
+          if (cancelled) return;
+          if (data.state === since) continue;
+          since = data.state;
 
           if (data.status === 'success') {
             addLog("Generation completed successfully.", 'success');
@@ -237,7 +253,7 @@ export default function CVBuilderApp() {
             
             setIsGenerating(false);
             setJobId(null);
-            clearInterval(pollInterval);
+            return;
           } else if (data.status === 'error') {
             setIsGenerating(false);
             setIsPreviewing(false);
@@ -245,16 +261,19 @@ export default function CVBuilderApp() {
             addLog(`Error detected by worker. Please check your data.`, 'error');
             addToast("La génération a échoué.", "error");
             setJobId(null);
-            clearInterval(pollInterval);
+            return;
           } else {
-            addLog(`Background worker: ${data.status}...`, 'wait');
+            addLog(`${STAGE_LABELS[data.stage] || data.stage}... (${data.progress}%)`, 'wait');
           }
         } catch (err) {
           console.error("Polling error:", err);
+          await new Promise(r => setTimeout(r, 3000));
         }
-      }, 3000);
-    }
-    return () => clearInterval(pollInterval);
+      }
+    };
+
+    if (jobId && isGenerating) poll();
+    return () => { cancelled = true; };
   }, [jobId, isGenerating, isPreviewing, isDownloading, token, API_URL, addToast]);
 
   const addLog = (text, type = 'process') => {
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import numpy as np
+
+# Ajout du dossier racine au sys.path
+sys.path.append(os.getcwd())
+
+from src.core.mmr import mmr_select, normalize_rows
+
+DIM = 1536
+TOP_N = 3
+LAMBDA = 0.7
+
+def _cosine_similarity(v1, v2):
+    """Ancienne implémentation (pairwise, renormalisation à chaque appel)."""
+    v1 = np.array(v1)
+    v2 = np.array(v2)
+    norm_v1 = np.linalg.norm(v1)
+    norm_v2 = np.linalg.norm(v2)
+    if norm_v1 == 0 or norm_v2 == 0:
+        return 0.0
+    return np.dot(v1, v2) / (norm_v1 * norm_v2)
+
+def legacy_mmr(embeddings, relevance, top_n=TOP_N, lambda_mult=LAMBDA):
+    """MMR équivalent écrit avec des boucles Python et _cosine_similarity."""
+    selected = []
+    remaining = list(range(len(embeddings)))
+    while remaining and len(selected) < top_n:
+        best, best_score = None, -np.inf
+        for i in remaining:
+            max_sim = max((_cosine_similarity(embeddings[i], embeddings[j]) for j in selected), default=0.0)
+            score = lambda_mult * relevance[i] - (1 - lambda_mult) * max_sim
+            if score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+        remaining.remove(best)
+    return selected
+
+def make_candidates(k, rng):
+    """Candidats regroupés en quelques clusters (expériences proches), comme dans un vrai profil."""
+    centers = rng.normal(size=(max(1, k // 10), DIM))
+    vectors = centers[rng.integers(0, len(centers), size=k)] + 0.1 * rng.normal(size=(k, DIM))
+    relevance = rng.uniform(0.2, 0.9, size=k)
+    # Les résultats FAISS sont des listes Python côté ancienne implémentation
+    return vectors.tolist(), relevance
+
+def bench(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f"{'k':>5} | {'legacy (ms)':>12} | {'vectorized (ms)':>16} | {'core only (ms)':>15} | {'speedup':>8}")
+    print("-" * 70)
+    for k in (20, 50, 100, 200, 500):
+        embeddings, relevance = make_candidates(k, rng)
+        repeat = 3 if k >= 200 else 10
+
+        legacy_ms = bench(lambda: legacy_mmr(embeddings, relevance), repeat)
+        vectorized_ms = bench(
+            lambda: mmr_select(normalize_rows(embeddings), relevance, top_n=TOP_N, lambda_mult=LAMBDA),
+            repeat
+        )
+        # Matrice déjà construite (cas de search_vector_store qui relit les vecteurs normalisés)
+        matrix = normalize_rows(embeddings)
+        core_ms = bench(lambda: mmr_select(matrix, relevance, top_n=TOP_N, lambda_mult=LAMBDA), repeat)
+
+        # Les deux implémentations doivent choisir les mêmes candidats (à l'ordre près en cas d'égalité float32)
+        expected = legacy_mmr(embeddings, relevance)
+        chosen, _ = mmr_select(matrix, relevance, top_n=TOP_N, lambda_mult=LAMBDA)
+        assert sorted(chosen) == sorted(expected), (k, list(chosen), expected)
+
+        print(f"{k:>5} | {legacy_ms:>12.2f} | {vectorized_ms:>16.2f} | {core_ms:>15.3f} | {legacy_ms / vectorized_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+import logging
+
+# Ajout du dossier racine au sys.path
+sys.path.append(os.getcwd())
+
+from src.core.latex_formats import build_all_formats, FORMATS_DIR
+
+logging.basicConfig(level=logging.INFO)
+
+if __name__ == "__main__":
+    # Précompile le préambule de chaque template (pdflatex + mylatexformat).
+    # À relancer après modification d'un template ; sinon le format est reconstruit au premier usage.
+    results = build_all_formats()
+    for template, fmt in results.items():
+        print(f"{template}: {fmt or 'ÉCHEC (pdflatex / mylatexformat indisponible)'}")
+    print(f"Formats dans {FORMATS_DIR}")
+    sys.exit(0 if all(results.values()) else 1)
@@ -1,6 +1,7 @@
 import logging
 import os
-from src.core.orchestration import parser_agent, _diversify_results
+from src.core.orchestration import parser_agent, MMR_LAMBDA
+from src.core.mmr import mmr_select, normalize_rows
 from src.core.vector_store import search_vector_store
 from src.core.database import SessionLocal
 from src.core.knowledge_base import get_profile_from_db
@@ -32,8 +33,13 @@ def test_analysis():
             print(f"  Embedding sample: {r['embedding'][:3]}...")
 
     print("\n--- 3. Testing Diversification ---")
-    diversified = _diversify_results(results, top_n=3)
-    print(f"Diversified Results: {len(diversified)}")
+    candidates = [r for r in results if r.get('embedding') is not None]
+    if not candidates:
+        print("Diversified Results: 0")
+        return
+    vectors = normalize_rows([r['embedding'] for r in candidates])
+    selected, scores = mmr_select(vectors, [r.get('match_score', 0.0) for r in candidates], top_n=3, lambda_mult=MMR_LAMBDA, redundancy_threshold=0.95)
+    print(f"Diversified Results: {len(selected)} (MMR scores: {[round(float(s), 3) for s in scores]})")
 
 if __name__ == "__main__":
     test_analysis()
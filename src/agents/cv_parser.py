@@ -23,7 +23,7 @@ class CVParserAgent:
             model = "llama-3.3-70b-versatile"
         
         try:
-            self.llm = get_llm(provider=provider, model=model)
+            self.llm = get_llm(provider=provider, model=model, cache=True)
             logger.info(f"CVParserAgent initialized with {provider or 'default'} / {model or 'default'}.")
         except Exception as e:
             self.llm = None
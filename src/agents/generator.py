@@ -1,15 +1,17 @@
 # src/agents/generator.py
 import os
+import re
 import json
-import subprocess
 import uuid
 import logging
 import requests
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable
 
 from src.core.utils import load_yaml, load_text
 from src.core.llm_provider import get_llm
+from src.core.latex_compiler import compile_tex, pdf_page_count, CompileResult
+from src.core import page_fit
 from src.config.constants import TEMPLATES_DIR
 
 logger = logging.getLogger(__name__)
@@ -83,6 +85,88 @@ def sanitize_data_recursive(data, skip_keys=None):
     else:
         return data
 
+# --- LOCAL TEMPLATE RENDERING ---
+
+_PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+
+def latex_text(value) -> str:
+    """Plain text -> LaTeX-safe text (special characters escaped, unicode normalized)."""
+    return clean_unicode_for_latex(escape_latex_special_chars(str(value or "").strip()))
+
+_SAFE_URL = re.compile(r"https?://[^\s{}\\]+", re.IGNORECASE)
+
+def latex_url(value) -> str:
+    """
+    Profile URL -> \\href argument. Only http(s) URLs without braces, backslashes or
+    whitespace are kept (anything else could close the argument and inject LaTeX);
+    a bare domain gets https://. Rejected URLs become empty.
+    """
+    url = str(value or "").strip()
+    if url and not re.match(r"[a-z][a-z0-9+.-]*:", url, re.IGNORECASE):
+        url = f"https://{url}"
+    if not _SAFE_URL.fullmatch(url):
+        if url:
+            logger.warning(f"Ignoring unsafe profile URL: {url[:80]!r}")
+        return ""
+    return url.replace("%", "\\%").replace("#", "\\#")
+
+def parse_cv_content(raw: str) -> Dict[str, Any]:
+    """
+    Parses the LLM's structured CV content:
+    {"summary": str, "experiences": [{"title", "company", "period", "location", "bullets": [str]}],
+     "hard_skills": [str], "soft_skills": [str]}
+    """
+    start, end = raw.find("{"), raw.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError("Aucun objet JSON dans la réponse.")
+    content = json.loads(raw[start:end + 1])
+    if not isinstance(content, dict) or not isinstance(content.get("experiences"), list):
+        raise ValueError("Champ 'experiences' manquant.")
+    return content
+
+def build_template_values(user_profile: Dict[str, Any], content: Dict[str, Any]) -> Dict[str, str]:
+    """LaTeX value of every template placeholder, built from the profile and the LLM content."""
+    experience_blocks = []
+    for exp in content.get("experiences", []):
+        bullets = "\n".join(f"    \\resumeItem{{{latex_text(b)}}}" for b in exp.get("bullets", []) if str(b).strip())
+        block = f"\\resumeSubheading{{{latex_text(exp.get('company'))}}}{{{latex_text(exp.get('period'))}}}{{{latex_text(exp.get('title'))}}}{{{latex_text(exp.get('location'))}}}"
+        if bullets:
+            block += f"\n  \\resumeItemListStart\n{bullets}\n  \\resumeItemListEnd"
+        experience_blocks.append(block)
+
+    education_blocks = [
+        f"\\resumeSubheading{{{latex_text(edu.get('institution'))}}}{{{latex_text(edu.get('period'))}}}{{{latex_text(edu.get('degree'))}}}{{{latex_text(edu.get('mention'))}}}"
+        for edu in user_profile.get("education") or [] if isinstance(edu, dict)
+    ]
+
+    languages = [
+        f"{lang.get('name')} ({lang.get('level')})" if lang.get('level') else lang.get('name')
+        for lang in user_profile.get("languages") or [] if isinstance(lang, dict)
+    ]
+
+    hard_skills = content.get("hard_skills") or user_profile.get("skills") or []
+    soft_skills = content.get("soft_skills") or user_profile.get("soft_skills") or []
+
+    return {
+        "name": latex_text(user_profile.get("name")),
+        "title": latex_text(user_profile.get("title")),
+        "email": latex_text(user_profile.get("email")),
+        "linkedin_url": latex_url(user_profile.get("linkedin_url")),
+        "portfolio_url": latex_url(user_profile.get("portfolio_url")),
+        "photo_path": user_profile.get("photo_path") or "",
+        "summary": latex_text(content.get("summary") or user_profile.get("summary")),
+        # These placeholders sit inside itemize lists: an empty list still needs one \item
+        "experiences_content": "\n\n".join(experience_blocks) or "\\item[]",
+        "education_content": "\n\n".join(education_blocks) or "\\item[]",
+        "hard_skills": ", ".join(latex_text(s) for s in hard_skills),
+        "soft_skills": ", ".join(latex_text(s) for s in soft_skills),
+        "languages": ", ".join(latex_text(l) for l in languages),
+    }
+
+def render_latex_template(template: str, values: Dict[str, str]) -> str:
+    """Replaces every {{placeholder}} of a template; unknown placeholders become empty."""
+    return _PLACEHOLDER.sub(lambda m: values.get(m.group(1), ""), template)
+
 class GeneratorAgent:
     """
     An agent responsible for generating the final LaTeX CV by calling an LLM
@@ -90,7 +174,7 @@ class GeneratorAgent:
     """
     def __init__(self, provider: str = None, model: str = None, api_key: str = None):
         try:
-            self.llm = get_llm(provider=provider, model=model, user_api_key=api_key)
+            self.llm = get_llm(provider=provider, model=model, user_api_key=api_key, cache=True)
             logger.info(f"✅ GeneratorAgent prêt ({provider or 'default'}/{model or 'default'}).")
         except Exception as e:
             self.llm = None
@@ -158,10 +242,72 @@ class GeneratorAgent:
             logger.error(f"Online compilation error: {e}")
             return False
 
+    def _render_from_content(self, user_profile: Dict[str, Any], experiences: List[Dict[str, Any]], cv_template: str, verbosity_instruction: str, feedback: str = None, template_name: str = "modern"):
+        """
+        Asks the LLM for the CV text only (JSON), then fills the template locally.
+        The LaTeX layout never goes through the LLM. The content is trimmed beforehand
+        if it is predicted to overflow one page.
+        Returns (latex, estimated_lines).
+        """
+        budget = page_fit.bullet_char_budget(user_profile, experiences, template_name)
+        verbosity_instruction += f" Budget : environ {budget} caractères de bullet points par expérience, au total."
+        prompt_template = load_yaml("src/config/prompts/generator_content.yaml")['template']
+        profile_for_prompt = {k: v for k, v in user_profile.items() if k != "photo_path"}
+        prompt = prompt_template.replace(
+            "{{user_profile}}", json.dumps(profile_for_prompt, indent=2, ensure_ascii=False)
+        ).replace(
+            "{{selected_experiences}}", json.dumps(experiences, indent=2, ensure_ascii=False)
+        ).replace(
+            "{{verbosity_instruction}}", verbosity_instruction
+        )
+        if feedback:
+            prompt = f"NOTE PRÉCÉDENTE : {feedback}\n\n" + prompt
+
+        content = parse_cv_content(self.llm.chat(prompt, json_mode=True))
+        content = page_fit.fit_to_page(content, user_profile, template_name)
+        estimated_lines = page_fit.estimate_lines(content, user_profile, template_name)
+        return render_latex_template(cv_template, build_template_values(user_profile, content)), estimated_lines
+
+    def _generate_full_latex(self, user_profile: Dict[str, Any], experiences: List[Dict[str, Any]], cv_template: str, verbosity_instruction: str, feedback: str = None) -> str:
+        """Legacy path: the LLM fills the whole template and returns the complete LaTeX document."""
+        safe_profile = sanitize_data_recursive(user_profile, skip_keys={"photo_path"})
+        safe_experiences = sanitize_data_recursive(experiences)
+        prompt_template = load_yaml("src/config/prompts/generator.yaml")['template']
+
+        final_prompt = prompt_template.replace(
+            "{{user_profile}}", json.dumps(safe_profile, indent=2, ensure_ascii=False)
+        ).replace(
+            "{{selected_experiences}}", json.dumps(safe_experiences, indent=2, ensure_ascii=False)
+        ).replace(
+            "{{cv_template}}", cv_template
+        ).replace(
+            "{{verbosity_instruction}}", verbosity_instruction
+        )
+
+        if feedback:
+            final_prompt = f"NOTE PRÉCÉDENTE : {feedback}\n\n" + final_prompt
+
+        try:
+            generated_latex_code = self.llm.chat(final_prompt)
+            generated_latex_code = clean_unicode_for_latex(generated_latex_code)
+            return self._clean_llm_output(generated_latex_code)
+        except Exception as e:
+            raise RuntimeError(f"L'IA a échoué: {e}") from e
+
     def generate_cv_from_llm(self, user_profile: Dict[str, Any], experiences: List[Dict[str, Any]], template_name: str = "modern", feedback: str = None, session_id: str = None) -> (str, str): 
         """
         Generates a PDF CV.
         """
+        result = self.generate_cv(user_profile, experiences, template_name, feedback, session_id)
+        return result.pdf_path, result.tex_path
+
+    def generate_cv(self, user_profile: Dict[str, Any], experiences: List[Dict[str, Any]], template_name: str = "modern", feedback: str = None, session_id: str = None, on_stage: Callable[[str], None] = None) -> CompileResult:
+        """
+        Generates a PDF CV and returns the compile result (pdf/tex paths, page count, log, warnings),
+        so callers can validate it without compiling again.
+        `on_stage` is called with "llm" and then "compiling" (job progress reporting).
+        """
+        on_stage = on_stage or (lambda stage: None)
         if not self.llm:
             raise RuntimeError("GeneratorAgent non initialisé.")
 
@@ -194,15 +340,11 @@ class GeneratorAgent:
             else:
                 user_profile["photo_path"] = ""
 
-        safe_profile = sanitize_data_recursive(user_profile, skip_keys={"photo_path"})
-        safe_experiences = sanitize_data_recursive(experiences)
-
         template_path = TEMPLATES_DIR / f"{template_name}.tex"
         if not template_path.exists():
             template_path = TEMPLATES_DIR / "modern.tex"
 
         cv_template_content = load_text(template_path)
-        prompt_template = load_yaml("src/config/prompts/generator.yaml")['template']
 
         num_experiences = len(experiences)
         if num_experiences <= 3:
@@ -210,25 +352,18 @@ class GeneratorAgent:
         else:
             verbosity_instruction = "OPTIMISATION 1 PAGE : sois concis pour les anciennes expériences."
 
-        final_prompt = prompt_template.replace(
-            "{{user_profile}}", json.dumps(safe_profile, indent=2, ensure_ascii=False)
-        ).replace(
-            "{{selected_experiences}}", json.dumps(safe_experiences, indent=2, ensure_ascii=False)
-        ).replace(
-            "{{cv_template}}", cv_template_content
-        ).replace(
-            "{{verbosity_instruction}}", verbosity_instruction
-        )
-
-        if feedback:
-            final_prompt = f"NOTE PRÉCÉDENTE : {feedback}\n\n" + final_prompt
+        on_stage("llm")
+        generated_latex_code, estimated_lines = None, None
+        if load_yaml("src/config/settings.yaml").get("cv_render_mode", "template") == "template":
+            try:
+                generated_latex_code, estimated_lines = self._render_from_content(
+                    user_profile, experiences, cv_template_content, verbosity_instruction, feedback, template_path.stem
+                )
+            except Exception as e:
+                logger.warning(f"Rendu par template impossible ({e}), génération LaTeX complète par l'IA.")
 
-        try:
-            generated_latex_code = self.llm.chat(final_prompt)
-            generated_latex_code = clean_unicode_for_latex(generated_latex_code)
-            generated_latex_code = self._clean_llm_output(generated_latex_code)
-        except Exception as e:
-            raise RuntimeError(f"L'IA a échoué: {e}")
+        if generated_latex_code is None:
+            generated_latex_code = self._generate_full_latex(user_profile, experiences, cv_template_content, verbosity_instruction, feedback)
 
         # Directory management
         unique_id = session_id or str(uuid.uuid4())
@@ -242,37 +377,24 @@ class GeneratorAgent:
             f.write(generated_latex_code)
 
         # --- MULTI-ENGINE COMPILATION ---
-        compiled = False
-        
-        # 1. Try Tectonic (Recommended for Docker/Production)
-        try:
-            subprocess.run(["tectonic", "--version"], capture_output=True, check=True)
-            logger.info("🚀 Compilation avec Tectonic...")
-            cmd = ["tectonic", "-o", str(session_dir), str(tex_path)]
-            subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-            if pdf_path.exists():
-                compiled = True
-        except:
-            pass
-
-        # 2. Try pdflatex (Local fallback)
-        if not compiled:
-            try:
-                subprocess.run(["pdflatex", "--version"], capture_output=True, check=True)
-                logger.info("🚀 Compilation avec pdflatex...")
-                cmd = ["pdflatex", "-interaction=nonstopmode", f"-output-directory={session_dir}", str(tex_path)]
-                subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                if pdf_path.exists():
-                    compiled = True
-            except:
-                pass
+        on_stage("compiling")
+        # 1-2. Local engines (Tectonic, then pdflatex) through the shared compile pool
+        result = compile_tex(tex_path, session_dir)
+        if not (result.success and pdf_path.exists()) and result.errors:
+            logger.warning(f"Local LaTeX compilation failed: {'; '.join(result.errors)}")
 
         # 3. Try Online APIs (Cloud fallback)
-        if not compiled:
-            compiled = self.compile_latex_online(generated_latex_code, pdf_path)
-
-        if not compiled or not pdf_path.exists():
+        if not (result.success and pdf_path.exists()):
+            if self.compile_latex_online(generated_latex_code, pdf_path) and pdf_path.exists():
+                result = CompileResult(
+                    success=True, engine="online", pdf_path=str(pdf_path),
+                    page_count=pdf_page_count(pdf_path), errors=result.errors
+                )
+
+        if not result.success or not pdf_path.exists():
             raise RuntimeError("La compilation LaTeX a échoué sur tous les moteurs (Tectonic, Local et Online).")
 
-        return str(pdf_path), str(tex_path)
+        result.tex_path = str(tex_path)
+        if estimated_lines is not None and result.page_count:
+            page_fit.record_observation(template_path.stem, estimated_lines, result.page_count)
+        return result
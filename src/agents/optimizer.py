@@ -8,18 +8,10 @@ logger = logging.getLogger(__name__)
 class OptimizerAgent:
     def __init__(self):
         # Using the standard get_llm which handles provider selection from env/settings
-        self.llm = get_llm()
+        self.llm = get_llm(cache=True)
         self.prompt_config = load_yaml("src/config/prompts/optimizer.yaml")
 
-    def optimize_description(self, text: str, tone: str = "standard", job_offer: str = None) -> str:
-        """
-        Rewrites a job description using the STAR method with a specific tone, 
-        potentially optimized for a specific job offer.
-        Tones: standard, dynamic, formal, explanatory
-        """
-        if not text or len(text) < 10:
-            return text
-
+    def _build_prompt(self, text: str, tone: str = "standard", job_offer: str = None) -> str:
         tone_instructions = {
             "standard": "Adopte un ton professionnel équilibré. Utilise la méthode STAR.",
             "dynamic": "Adopte un ton énergique et punchy. Utilise des verbes d'action forts. Idéal pour startups/tech.",
@@ -37,7 +29,18 @@ class OptimizerAgent:
         prompt = prompt_template.replace("{{context_prompt}}", context_prompt)\
                                 .replace("{{instruction}}", instruction)\
                                 .replace("{{text}}", text)
+        return prompt
+
+    def optimize_description(self, text: str, tone: str = "standard", job_offer: str = None) -> str:
+        """
+        Rewrites a job description using the STAR method with a specific tone, 
+        potentially optimized for a specific job offer.
+        Tones: standard, dynamic, formal, explanatory
+        """
+        if not text or len(text) < 10:
+            return text
 
+        prompt = self._build_prompt(text, tone, job_offer)
         try:
             # The get_llm wrapper returns an object with a .chat() method
             response = self.llm.chat(prompt)
@@ -45,3 +48,25 @@ class OptimizerAgent:
         except Exception as e:
             logger.error(f"Optimization failed: {e}")
             raise ValueError("Failed to optimize text with AI.")
+
+    async def aoptimize_description(self, text: str, tone: str = "standard", job_offer: str = None) -> str:
+        """Async variant of optimize_description (does not block the event loop)."""
+        if not text or len(text) < 10:
+            return text
+
+        prompt = self._build_prompt(text, tone, job_offer)
+        try:
+            response = await self.llm.achat(prompt)
+            return response.strip()
+        except Exception as e:
+            logger.error(f"Optimization failed: {e}")
+            raise ValueError("Failed to optimize text with AI.")
+
+    async def astream_optimize_description(self, text: str, tone: str = "standard", job_offer: str = None):
+        """Yields the rewritten description chunk by chunk as the LLM produces it."""
+        if not text or len(text) < 10:
+            yield text
+            return
+
+        async for chunk in self.llm.astream(self._build_prompt(text, tone, job_offer)):
+            yield chunk
@@ -1,11 +1,14 @@
 import json
 import re
+import hashlib
 import logging
 import os
 from typing import List, Optional
 from pydantic import BaseModel, Field, ConfigDict
 from src.core.utils import load_yaml
 from src.core.llm_provider import get_llm
+from src.core.cache import SQLiteCache
+from src.config.constants import CACHE_DIR
 
 # LlamaIndex imports
 from llama_index.core.program import LLMTextCompletionProgram
@@ -24,6 +27,17 @@ class JobOfferData(BaseModel):
     location: Optional[str] = Field(default=None, description="Job location if specified")
     contract_type: Optional[str] = Field(default=None, description="Type of contract (CDI, Stage, Alternance, etc.)")
 
+# Parsed offers, shared by all workers: (model, prompt, normalized offer text) -> JobOfferData JSON
+_parse_cache = SQLiteCache(
+    CACHE_DIR / "job_offers.sqlite",
+    table="job_offers",
+    max_entries=int(os.getenv("PARSE_CACHE_MAX_ENTRIES", 5000)),
+    ttl_seconds=float(os.getenv("PARSE_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+)
+
+def get_parse_cache_stats():
+    return _parse_cache.stats()
+
 class ParserAgent:
     def __init__(self, prompt_path: str = None):
         # We define the structured extraction program
@@ -48,6 +62,11 @@ class ParserAgent:
             {offer_text}
             """
         
+        # Changing the model or the prompt invalidates previously cached parses
+        model_name = getattr(self.llm, "model", type(self.llm).__name__)
+        prompt_version = hashlib.sha256(prompt_template_str.encode("utf-8")).hexdigest()[:12]
+        self._cache_namespace = f"{model_name}:{prompt_version}"
+
         self.program = LLMTextCompletionProgram.from_defaults(
             output_cls=JobOfferData,
             prompt_template_str=prompt_template_str,
@@ -71,13 +90,29 @@ class ParserAgent:
         missions = re.findall(r"(analyser|nettoyer|créer|développer|implémenter|déployer)[^\.]*", text_lower)
         return {"skills": skills, "missions": missions, "values": [], "location": None, "contract_type": None}
 
+    def _cache_key(self, offer_text: str) -> str:
+        normalized = " ".join(offer_text.split())
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        return f"{self._cache_namespace}:{digest}"
+
     def extract_information(self, offer_text: str):
         """
         Extracts structured information from job offer text using LlamaIndex Structured Extraction.
+        Identical offers (up to whitespace) are served from the shared parse cache.
         """
+        key = self._cache_key(offer_text)
+        cached = _parse_cache.get(key)
+        if cached is not None:
+            try:
+                return JobOfferData.model_validate_json(cached).model_dump()
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable cached parse: {e}")
+
         try:
             logger.info("Starting structured extraction for job offer.")
             output: JobOfferData = self.program(offer_text=offer_text)
+            # Only successful LLM extractions are cached, never the rule-based fallback
+            _parse_cache.set(key, output.model_dump_json().encode("utf-8"))
             return output.model_dump()
         except Exception as e:
             logger.error(f"Structured extraction failed: {e}. Falling back to rule-based method.")
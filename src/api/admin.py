@@ -6,6 +6,15 @@ from src.api.auth import get_admin_user
 from src.models.user import User
 from src.models.profile import Experience, Skill
 from src.models.usage import UsageLog
+from src.core.vector_store import get_embedding_cache_stats, get_index_cache_stats
+from src.agents.parser import get_parse_cache_stats
+from src.core.llm_provider import get_llm_client_stats, get_llm_response_cache_stats
+from src.core.llm_router import get_provider_health_stats
+from src.core.latex_compiler import get_compile_stats
+from src.core.job_queue import get_job_stats
+from src.core.cv_cache import get_cv_cache_stats
+from src.core.retention import get_retention_stats
+from src.core.knowledge_base import get_profile_cache_stats
 
 router = APIRouter()
 
@@ -49,7 +58,20 @@ def get_system_stats(admin: User = Depends(get_admin_user), db: Session = Depend
         },
         "performance": {
             "success_rate": round(success_rate, 2),
-            "total_calls": total_actions
+            "total_calls": total_actions,
+            "caches": {
+                "embeddings": get_embedding_cache_stats(),
+                "vector_indexes": get_index_cache_stats(),
+                "job_offer_parses": get_parse_cache_stats(),
+                "llm_clients": get_llm_client_stats(),
+                "llm_responses": get_llm_response_cache_stats(),
+                "generated_cvs": get_cv_cache_stats(),
+                "profiles": get_profile_cache_stats()
+            },
+            "llm_providers": get_provider_health_stats(),
+            "latex_compiler": get_compile_stats(),
+            "jobs": get_job_stats(db),
+            "retention": get_retention_stats()
         },
         "recent_activity": activity
     }
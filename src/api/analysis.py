@@ -1,13 +1,17 @@
 # api/analysis.py
+import json
 import logging
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from src.core.database import get_db
+from src.core.database import get_db, SessionLocal
 from pydantic import BaseModel
 
 # --- Local Imports ---
 from src.core.api_models import JobOfferRequest, AnalysisResponse
-from src.core.orchestration import run_analysis_pipeline
+from src.core import orchestration
+from src.core.orchestration import run_analysis_pipeline, iter_analysis_pipeline
 from src.agents.optimizer import OptimizerAgent
 from src.models.usage import UsageLog # New import
 
@@ -40,7 +44,8 @@ async def analyze_endpoint(
 
     try:
         # Use the authenticated user's ID
-        analysis_result = run_analysis_pipeline(request.raw_text, db=db, user_id=current_user.id)
+        # The pipeline is blocking (DB, FAISS, LLM calls): keep it off the event loop
+        analysis_result = await run_in_threadpool(run_analysis_pipeline, request.raw_text, db=db, user_id=current_user.id)
         
         log_entry.status = "success"
         db.commit()
@@ -57,8 +62,59 @@ async def analyze_endpoint(
         logger.error(f"An unhandled error occurred during analysis: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An unexpected server error occurred during analysis.")
 
+@router.post("/analyze/stream")
+def analyze_stream_endpoint(
+    request: JobOfferRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Streaming variant of /analyze (NDJSON, one event per line):
+    skills, keyword_score, matches, then one "bullet" per optimized experience
+    as it completes, and finally "result" (same payload as /analyze) or "error".
+    """
+    user_id = current_user.id
+    provider = current_user.llm_provider or "openai"
+    model = current_user.llm_model or "gpt-4o-mini"
+
+    def event_stream():
+        # The request-scoped session is closed before the response body is sent,
+        # so the stream owns its session.
+        db = SessionLocal()
+        log_entry = UsageLog(
+            user_id=user_id,
+            action="job_analysis",
+            provider=provider,
+            model=model,
+            status="pending"
+        )
+        db.add(log_entry)
+        db.commit()
+        try:
+            for event, data in iter_analysis_pipeline(request.raw_text, db=db, user_id=user_id):
+                if event == "result":
+                    data = AnalysisResponse(**data).model_dump()
+                yield json.dumps({"event": event, "data": data}, ensure_ascii=False, default=str) + "\n"
+            log_entry.status = "success"
+        except ValueError as e:
+            log_entry.status = "error"
+            logger.warning(f"Validation error during streamed analysis: {e}")
+            yield json.dumps({"event": "error", "data": {"detail": str(e)}}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            log_entry.status = "error"
+            logger.error(f"An unhandled error occurred during streamed analysis: {e}", exc_info=True)
+            yield json.dumps({"event": "error", "data": {"detail": "An unexpected server error occurred during analysis."}}) + "\n"
+        finally:
+            db.commit()
+            db.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/optimize-description")
-def optimize_description_endpoint(
+async def optimize_description_endpoint(
     request: OptimizationRequest,
     db: Session = Depends(get_db), # Added db for logging
     current_user: User = Depends(get_current_user)
@@ -73,8 +129,9 @@ def optimize_description_endpoint(
     db.commit()
 
     try:
-        agent = OptimizerAgent()
-        optimized_text = agent.optimize_description(request.text, tone=request.tone)
+        # Reuse the pipeline's agent (and its pooled client) when it initialized
+        agent = orchestration.optimizer_agent or OptimizerAgent()
+        optimized_text = await agent.aoptimize_description(request.text, tone=request.tone)
         
         log_entry.status = "success"
         db.commit()
@@ -85,3 +142,50 @@ def optimize_description_endpoint(
         db.commit()
         logger.error(f"Optimization error: {e}")
         raise HTTPException(status_code=500, detail=f"Optimization failed: {str(e)}")
+
+@router.post("/optimize-description/stream")
+def optimize_description_stream_endpoint(
+    request: OptimizationRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Streaming variant of /optimize-description (NDJSON, one event per line):
+    "chunk" events with the text as the LLM generates it, then "result"
+    (same payload as /optimize-description) or "error".
+    """
+    user_id = current_user.id
+    provider = current_user.llm_provider or "openai"
+
+    async def event_stream():
+        # The request-scoped session is closed before the response body is sent,
+        # so the stream owns its session.
+        db = SessionLocal()
+        log_entry = UsageLog(
+            user_id=user_id,
+            action="text_optimization",
+            provider=provider,
+            status="pending"
+        )
+        db.add(log_entry)
+        db.commit()
+        try:
+            agent = orchestration.optimizer_agent or OptimizerAgent()
+            chunks = []
+            async for chunk in agent.astream_optimize_description(request.text, tone=request.tone):
+                chunks.append(chunk)
+                yield json.dumps({"event": "chunk", "data": {"text": chunk}}, ensure_ascii=False) + "\n"
+            log_entry.status = "success"
+            yield json.dumps({"event": "result", "data": {"optimized_text": "".join(chunks).strip()}}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            log_entry.status = "error"
+            logger.error(f"Streamed optimization error: {e}")
+            yield json.dumps({"event": "error", "data": {"detail": f"Optimization failed: {str(e)}"}}, ensure_ascii=False) + "\n"
+        finally:
+            db.commit()
+            db.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
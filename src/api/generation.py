@@ -2,10 +2,13 @@
 import os
 import logging
 import uuid
+import re
 import json
-from typing import List, Any, Dict
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
-from fastapi.responses import FileResponse
+import hashlib
+from functools import lru_cache
+from typing import List, Any, Dict, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from src.core.database import get_db, SessionLocal
 from pathlib import Path
@@ -17,9 +20,10 @@ from src.core.knowledge_base import get_profile_from_db, Profile
 from src.api.auth import get_current_user
 from src.models.user import User
 from src.models.usage import UsageLog
-from src.config.constants import TEMPLATES_DIR
+from src.config.constants import TEMPLATES_DIR, GENERATED_CVS_DIR
 from src.core.orchestration import _rank_skills_by_relevance
 from src.core.cv_validator import validate_cv
+from src.core import job_queue, job_events, cv_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -55,19 +59,44 @@ def _profile_to_dict(profile: Profile) -> Dict[str, Any]:
 def background_generate_cv(job_id: str, request: CVGenerationRequest, user_id: int):
     """
     Worker function with retry logic for 1-page constraint.
+    Raises on failure so the job queue can retry; the UsageLog is only marked
+    as an error once no attempt is left (see _generation_job_failed).
     """
     db = SessionLocal()
     try:
         log_entry = db.query(UsageLog).filter(UsageLog.id == int(job_id)).first()
         if not log_entry: return
 
+        # Progress never goes backwards, even when a retry goes through the stages again
+        reached = {"progress": 0}
+        def stage(name: str):
+            reached["progress"] = max(reached["progress"], job_events.STAGES[name])
+            job_events.report_progress(job_id, name, progress=reached["progress"])
+
         user_profile = get_profile_from_db(db, user_id=user_id)
         current_user = db.query(User).filter(User.id == user_id).first()
+        template_name = current_user.selected_template or "modern"
+
+        # 0. Same inputs as a previous generation: reuse its validated PDF
+        cache_key = cv_cache.cache_key(
+            _profile_to_dict(user_profile), request.experiences, template_name,
+            current_user.llm_provider, current_user.llm_model, request.job_offer_text
+        )
+        if not request.force_regenerate:
+            cached = cv_cache.lookup(cache_key, GENERATED_CVS_DIR / str(uuid.uuid4()))
+            if cached:
+                logger.info(f"♻️ CV cache hit for Job {job_id}")
+                log_entry.status = "success"
+                log_entry.model = cached[0]
+                db.commit()
+                job_events.report_progress(job_id, "done", status="success")
+                return
         
         # 1. Ranking skills
+        stage("ranking_skills")
         if request.job_offer_text and user_profile.skills:
             try:
-                user_profile.skills = _rank_skills_by_relevance(user_profile.skills, request.job_offer_text, top_n=15)
+                user_profile.skills = _rank_skills_by_relevance(user_profile.skills, request.job_offer_text, top_n=15, user_id=user_id)
             except: pass
         
         generator = GeneratorAgent(
@@ -86,46 +115,66 @@ def background_generate_cv(job_id: str, request: CVGenerationRequest, user_id: i
             # On second attempt, force extreme conciseness
             feedback = None
             if attempt > 0:
+                stage("retrying")
                 feedback = "Le CV précédent était trop long (plus d'une page). RESTE SUR UNE SEULE PAGE. Sois très concis, élimine le superflu."
 
-            pdf_path, tex_path = generator.generate_cv_from_llm(
+            compile_result = generator.generate_cv(
                 user_profile=_profile_to_dict(user_profile),
                 experiences=request.experiences,
-                template_name=current_user.selected_template or "modern",
-                feedback=feedback
+                template_name=template_name,
+                feedback=feedback,
+                on_stage=stage
             )
+            pdf_path, tex_path = compile_result.pdf_path, compile_result.tex_path
             
-            # Validate page count
-            validation = validate_cv(tex_path)
+            # Validate page count (reuses the compile result, no second LaTeX run)
+            stage("validating")
+            validation = validate_cv(tex_path, compile_result=compile_result)
             if validation["valid"]:
                 logger.info(f"✅ CV validated (1 page) on attempt {attempt + 1}")
                 break
             else:
                 logger.warning(f"⚠️ CV validation failed: {validation['warnings']}")
                 if attempt == max_retries - 1:
-                    raise RuntimeError(f"Impossible de générer un CV sur une seule page après {max_retries} tentatives.")
+                    # Already retried with feedback: re-running the job would not help
+                    raise job_queue.PermanentJobError(f"Impossible de générer un CV sur une seule page après {max_retries} tentatives.")
+
+        cv_cache.store(cache_key, pdf_path, tex_path, {"user_id": user_id, "template": template_name})
 
         # 3. Finalize
         log_entry.status = "success"
         log_entry.model = pdf_path
         db.commit()
+        job_events.report_progress(job_id, "done", status="success")
 
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
         logger.error(f"❌ Background Generation Failed for Job {job_id}: {e}\n{error_details}")
-        log_entry = db.query(UsageLog).filter(UsageLog.id == int(job_id)).first()
+        raise
+    finally:
+        db.close()
+
+def _run_generation_job(payload: Dict[str, Any]):
+    background_generate_cv(payload["job_id"], CVGenerationRequest(**payload["request"]), payload["user_id"])
+
+def _generation_job_failed(payload: Dict[str, Any], error: str):
+    db = SessionLocal()
+    try:
+        log_entry = db.query(UsageLog).filter(UsageLog.id == int(payload["job_id"])).first()
         if log_entry:
             log_entry.status = "error"
-            log_entry.model = f"Error: {str(e)[:100]}"
+            log_entry.model = f"Error: {error.split(': ', 1)[-1][:100]}"
             db.commit()
+            job_events.report_progress(payload["job_id"], log_entry.stage or "queued", status="error", progress=log_entry.progress or 0)
     finally:
         db.close()
 
+job_queue.register_handler("cv_generation", _run_generation_job, on_failure=_generation_job_failed)
+
 @router.post("/generate-cv")
 async def generate_cv_endpoint(
     request: CVGenerationRequest, 
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -133,37 +182,130 @@ async def generate_cv_endpoint(
     log_entry = UsageLog(
         user_id=current_user.id,
         action="cv_generation",
-        status="processing"
+        status="processing",
+        stage="queued",
+        progress=0
     )
     db.add(log_entry)
     db.commit()
     db.refresh(log_entry)
     
-    background_tasks.add_task(background_generate_cv, str(log_entry.id), request, current_user.id)
+    # Durable queue: picked up by a worker process (or the embedded worker), survives restarts
+    job_queue.enqueue(
+        db, "cv_generation",
+        {"job_id": str(log_entry.id), "request": request.model_dump(), "user_id": current_user.id},
+        user_id=current_user.id, usage_log_id=log_entry.id
+    )
     
     return {"job_id": str(log_entry.id), "message": "Génération lancée."}
 
 @router.get("/status/{job_id}")
-async def get_job_status(job_id: str, db: Session = Depends(get_db)):
-    log = db.query(UsageLog).filter(UsageLog.id == int(job_id)).first()
-    if not log:
+async def get_job_status(job_id: str, wait: float = 0, since: str = None):
+    """
+    Current stage and progress of a generation job.
+    Long-polling: with `wait` (seconds, max 30) and the `state` of the previous answer
+    as `since`, the request is held until the job moves to another stage.
+    """
+    state = await job_events.wait_for_change(job_id, since, min(max(wait, 0), 30))
+    if state is None:
+        raise HTTPException(status_code=404, detail="Inconnu")
+    return {**state, "state": job_events.state_token(state)}
+
+@router.get("/status/{job_id}/events")
+async def stream_job_status(job_id: str):
+    """Server-Sent Events: one `data:` message per stage change, until success or error."""
+    state = await job_events.wait_for_change(job_id, None, 0)
+    if state is None:
         raise HTTPException(status_code=404, detail="Inconnu")
-    return {"status": log.status, "progress": 100 if log.status == "success" else 50}
+
+    async def events():
+        current = state
+        while True:
+            yield f"data: {json.dumps({**current, 'state': job_events.state_token(current)})}\n\n"
+            if current["status"] in job_events.TERMINAL_STATUSES:
+                return
+            token = job_events.state_token(current)
+            while True:
+                current = await job_events.wait_for_change(job_id, token, 15)
+                if current is None or job_events.state_token(current) != token:
+                    break
+                yield ": keep-alive\n\n"
+            if current is None:
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# A job's PDF never changes once generated (one folder per generation): clients may keep it
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+@lru_cache(maxsize=1024)
+def _content_etag(path: str, mtime_ns: int, size: int) -> str:
+    """Strong ETag from the file content (hashed once per file version)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return f'"{digest.hexdigest()[:32]}"'
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Single byte range "bytes=start-end" / "bytes=start-" / "bytes=-suffix" -> (start, end) inclusive.
+    Returns None for anything else (the full file is then sent), raises ValueError if unsatisfiable.
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", (header or "").strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    if match.group(1) == "":
+        start, end = max(0, size - int(match.group(2))), size - 1
+    else:
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+    if start >= size or start > end:
+        raise ValueError("unsatisfiable range")
+    return start, end
 
 @router.get("/download/{job_id}")
-async def download_cv(job_id: str, inline: bool = False, db: Session = Depends(get_db)):
+async def download_cv(job_id: str, request: Request, inline: bool = False, db: Session = Depends(get_db)):
     log = db.query(UsageLog).filter(UsageLog.id == int(job_id)).first()
+    if log and (log.status == "expired" or (log.status == "success" and not os.path.exists(log.model or ""))):
+        # Removed by the retention sweeper (src/core/retention.py)
+        raise HTTPException(status_code=410, detail="Ce CV a expiré, relancez la génération.")
     if not log or log.status != "success":
         raise HTTPException(status_code=400, detail="Non prêt")
     
-    headers = {}
+    stat = os.stat(log.model)
+    etag = _content_etag(log.model, stat.st_mtime_ns, stat.st_size)
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL, "Accept-Ranges": "bytes"}
     if inline:
         # 'inline' tells the browser to try and show the file inside the page
         headers["Content-Disposition"] = "inline"
-    
+    else:
+        headers["Content-Disposition"] = 'attachment; filename="reZume_CV.pdf"'
+
+    # Preview reloads: the browser already has this exact PDF
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers={k: v for k, v in headers.items() if k != "Content-Disposition"})
+
+    # PDF viewers fetch pages by byte range (only honoured if If-Range still matches)
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = _parse_range(range_header, stat.st_size)
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{stat.st_size}", "ETag": etag})
+        if byte_range:
+            start, end = byte_range
+            with open(log.model, "rb") as f:
+                f.seek(start)
+                body = f.read(end - start + 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            return Response(content=body, status_code=206, media_type="application/pdf", headers=headers)
+
+    # Full file: FileResponse streams it from disk (sendfile when the server supports it)
     return FileResponse(
         path=log.model, 
-        filename="reZume_CV.pdf" if not inline else None,
         media_type='application/pdf',
-        headers=headers
+        headers=headers,
+        stat_result=stat
     )
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, BackgroundTasks
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from pydantic import BaseModel, ConfigDict
@@ -7,10 +8,11 @@ from src.models.user import User
 from src.models.profile import Experience, Skill, Education, Language
 from src.core.security import verify_password
 from src.api.auth import router as auth_router, get_current_user
-from src.core.vector_store import recalculate_user_embeddings
+from src.core.vector_store import recalculate_user_embeddings, update_user_embeddings
 from src.core.pdf_extractor import extract_text_from_pdf
 from src.agents.cv_parser import CVParserAgent
 from src.core.storage import upload_file_to_cloud # NEW
+from src.core.knowledge_base import invalidate_profile_cache
 import os
 import shutil
 import uuid
@@ -23,16 +25,28 @@ from threading import Lock
 _user_locks = {}
 _locks_mutex = Lock()
 
+def _get_user_lock(user_id: int) -> Lock:
+    with _locks_mutex:
+        if user_id not in _user_locks:
+            _user_locks[user_id] = Lock()
+        return _user_locks[user_id]
+
+# CV parser shared by all uploads (prompt and LLM client are loaded once)
+_cv_parser = None
+
+def _get_cv_parser() -> CVParserAgent:
+    global _cv_parser
+    if _cv_parser is None or _cv_parser.llm is None:
+        _cv_parser = CVParserAgent()
+    return _cv_parser
+
 def debounced_recalculate(user_id: int):
     """
     Processes updates one by one (séquentiellement) for a specific user.
     Includes a small delay to batch multiple rapid changes.
     """
     # 1. Get or create a lock for this specific user
-    with _locks_mutex:
-        if user_id not in _user_locks:
-            _user_locks[user_id] = Lock()
-        user_lock = _user_locks[user_id]
+    user_lock = _get_user_lock(user_id)
 
     # 2. Wait for the turn (à tour de rôle)
     with user_lock:
@@ -42,6 +56,15 @@ def debounced_recalculate(user_id: int):
         logger.info(f"Starting sequential recalc for user {user_id}...")
         recalculate_user_embeddings(user_id)
 
+def sequential_update(user_id: int, kind: str, row_id: int = None):
+    """
+    Applies a single row change to the user's index (only that row is re-embedded).
+    Shares the per-user lock with full recalculations so index writes never interleave.
+    """
+    with _get_user_lock(user_id):
+        logger.info(f"Starting incremental index update for user {user_id} ({kind} {row_id or ''})...")
+        update_user_embeddings(user_id, kind, row_id)
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
@@ -151,6 +174,7 @@ def update_profile(
         setattr(current_user, key, value)
     
     db.add(current_user)
+    invalidate_profile_cache(db, current_user.id)
     db.commit()
     db.refresh(current_user)
     return current_user
@@ -172,13 +196,14 @@ async def upload_cv(
             shutil.copyfileobj(file.file, buffer)
 
         # Call the corrected function
-        cv_text = extract_text_from_pdf(temp_path)
+        cv_text = await run_in_threadpool(extract_text_from_pdf, temp_path)
 
         if not cv_text or len(cv_text.strip()) < 50:
             raise HTTPException(status_code=400, detail="Le texte extrait du CV est trop court ou illisible.")
 
-        parser = CVParserAgent()
-        extracted_data = parser.parse_cv(cv_text)
+        parser = _get_cv_parser()
+        # LLM round-trip: keep it off the event loop
+        extracted_data = await run_in_threadpool(parser.parse_cv, cv_text)
 
         # 1. Update User Profile
         if extracted_data.get("full_name"): current_user.full_name = extracted_data["full_name"]
@@ -221,6 +246,7 @@ async def upload_cv(
         for lang in extracted_data.get("languages", []):
             db.add(Language(user_id=current_user.id, name=lang.get("name"), level=lang.get("level")))
 
+        invalidate_profile_cache(db, current_user.id)
         db.commit()
         background_tasks.add_task(debounced_recalculate, current_user.id)
         return {"message": "CV successfully imported", "data": extracted_data}
@@ -255,6 +281,7 @@ async def upload_photo(
             
         current_user.photo_cv = cloud_url
         db.add(current_user)
+        invalidate_profile_cache(db, current_user.id)
         db.commit()
         return {"photo_url": cloud_url}
     finally:
@@ -316,9 +343,10 @@ def create_experience(
 ):
     db_exp = Experience(**experience.model_dump(), user_id=current_user.id)
     db.add(db_exp)
+    invalidate_profile_cache(db, current_user.id)
     db.commit()
     db.refresh(db_exp)
-    background_tasks.add_task(debounced_recalculate, current_user.id)
+    background_tasks.add_task(sequential_update, current_user.id, "experience", db_exp.id)
     return db_exp
 
 @router.put("/profile/experiences/{exp_id}", response_model=ExperienceResponse)
@@ -332,9 +360,10 @@ def update_experience(
     db_exp = db.query(Experience).filter(Experience.id == exp_id, Experience.user_id == current_user.id).first()
     if not db_exp: raise HTTPException(status_code=404, detail="Not found")
     for key, value in experience.model_dump().items(): setattr(db_exp, key, value)
+    invalidate_profile_cache(db, current_user.id)
     db.commit()
     db.refresh(db_exp)
-    background_tasks.add_task(debounced_recalculate, current_user.id)
+    background_tasks.add_task(sequential_update, current_user.id, "experience", db_exp.id)
     return db_exp
 
 @router.delete("/profile/experiences/{exp_id}")
@@ -342,8 +371,9 @@ def delete_experience(exp_id: int, background_tasks: BackgroundTasks, current_us
     db_exp = db.query(Experience).filter(Experience.id == exp_id, Experience.user_id == current_user.id).first()
     if not db_exp: raise HTTPException(status_code=404, detail="Not found")
     db.delete(db_exp)
+    invalidate_profile_cache(db, current_user.id)
     db.commit()
-    background_tasks.add_task(debounced_recalculate, current_user.id)
+    background_tasks.add_task(sequential_update, current_user.id, "experience", exp_id)
     return {"message": "Deleted"}
 
 # --- Education ---
@@ -355,9 +385,10 @@ def get_education(current_user: User = Depends(get_current_user), db: Session =
 def create_education(education: EducationCreate, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     db_edu = Education(**education.model_dump(), user_id=current_user.id)
     db.add(db_edu)
+    invalidate_profile_cache(db, current_user.id)
     db.commit()
     db.refresh(db_edu)
-    background_tasks.add_task(debounced_recalculate, current_user.id)
+    background_tasks.add_task(sequential_update, current_user.id, "education", db_edu.id)
     return db_edu
 
 @router.put("/profile/education/{edu_id}", response_model=EducationResponse)
@@ -365,9 +396,10 @@ def update_education(edu_id: int, education: EducationCreate, background_tasks:
     db_edu = db.query(Education).filter(Education.id == edu_id, Education.user_id == current_user.id).first()
     if not db_edu: raise HTTPException(status_code=404, detail="Not found")
     for key, value in education.model_dump().items(): setattr(db_edu, key, value)
+    invalidate_profile_cache(db, current_user.id)
     db.commit()
     db.refresh(db_edu)
-    background_tasks.add_task(debounced_recalculate, current_user.id)
+    background_tasks.add_task(sequential_update, current_user.id, "education", db_edu.id)
     return db_edu
 
 @router.delete("/profile/education/{edu_id}")
@@ -375,8 +407,9 @@ def delete_education(edu_id: int, background_tasks: BackgroundTasks, current_use
     db_edu = db.query(Education).filter(Education.id == edu_id, Education.user_id == current_user.id).first()
     if not db_edu: raise HTTPException(status_code=404, detail="Not found")
     db.delete(db_edu)
+    invalidate_profile_cache(db, current_user.id)
     db.commit()
-    background_tasks.add_task(debounced_recalculate, current_user.id)
+    background_tasks.add_task(sequential_update, current_user.id, "education", edu_id)
     return {"message": "Deleted"}
 
 # --- Skills ---
@@ -388,9 +421,10 @@ def get_skills(current_user: User = Depends(get_current_user), db: Session = Dep
 def create_skill(skill: SkillCreate, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     db_skill = Skill(**skill.model_dump(), user_id=current_user.id)
     db.add(db_skill)
+    invalidate_profile_cache(db, current_user.id)
     db.commit()
     db.refresh(db_skill)
-    background_tasks.add_task(debounced_recalculate, current_user.id)
+    background_tasks.add_task(sequential_update, current_user.id, "skills")
     return db_skill
 
 @router.put("/profile/skills/{skill_id}", response_model=SkillResponse)
@@ -398,9 +432,10 @@ def update_skill(skill_id: int, skill: SkillCreate, background_tasks: Background
     db_skill = db.query(Skill).filter(Skill.id == skill_id, Skill.user_id == current_user.id).first()
     if not db_skill: raise HTTPException(status_code=404, detail="Not found")
     for key, value in skill.model_dump().items(): setattr(db_skill, key, value)
+    invalidate_profile_cache(db, current_user.id)
     db.commit()
     db.refresh(db_skill)
-    background_tasks.add_task(debounced_recalculate, current_user.id)
+    background_tasks.add_task(sequential_update, current_user.id, "skills")
     return db_skill
 
 @router.delete("/profile/skills/{skill_id}")
@@ -408,8 +443,9 @@ def delete_skill(skill_id: int, background_tasks: BackgroundTasks, current_user:
     db_skill = db.query(Skill).filter(Skill.id == skill_id, Skill.user_id == current_user.id).first()
     if not db_skill: raise HTTPException(status_code=404, detail="Not found")
     db.delete(db_skill)
+    invalidate_profile_cache(db, current_user.id)
     db.commit()
-    background_tasks.add_task(debounced_recalculate, current_user.id)
+    background_tasks.add_task(sequential_update, current_user.id, "skills")
     return {"message": "Deleted"}
 
 # --- Languages ---
@@ -418,29 +454,29 @@ def get_languages(current_user: User = Depends(get_current_user), db: Session =
     return db.query(Language).filter(Language.user_id == current_user.id).all()
 
 @router.post("/profile/languages", response_model=LanguageResponse)
-def create_language(language: LanguageCreate, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_language(language: LanguageCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     db_lang = Language(**language.model_dump(), user_id=current_user.id)
     db.add(db_lang)
+    invalidate_profile_cache(db, current_user.id)
     db.commit()
     db.refresh(db_lang)
-    background_tasks.add_task(debounced_recalculate, current_user.id)
     return db_lang
 
 @router.put("/profile/languages/{lang_id}", response_model=LanguageResponse)
-def update_language(lang_id: int, language: LanguageCreate, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_language(lang_id: int, language: LanguageCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     db_lang = db.query(Language).filter(Language.id == lang_id, Language.user_id == current_user.id).first()
     if not db_lang: raise HTTPException(status_code=404, detail="Not found")
     for key, value in language.model_dump().items(): setattr(db_lang, key, value)
+    invalidate_profile_cache(db, current_user.id)
     db.commit()
     db.refresh(db_lang)
-    background_tasks.add_task(debounced_recalculate, current_user.id)
     return db_lang
 
 @router.delete("/profile/languages/{lang_id}")
-def delete_language(lang_id: int, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def delete_language(lang_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     db_lang = db.query(Language).filter(Language.id == lang_id, Language.user_id == current_user.id).first()
     if not db_lang: raise HTTPException(status_code=404, detail="Not found")
     db.delete(db_lang)
+    invalidate_profile_cache(db, current_user.id)
     db.commit()
-    background_tasks.add_task(debounced_recalculate, current_user.id)
     return {"message": "Deleted"}
@@ -11,6 +11,7 @@ ROOT_DIR = Path(__file__).resolve().parent.parent.parent
 # Define all other paths relative to the project root.
 KNOWLEDGE_BASE_PATH = ROOT_DIR / "data" / "knowledge_base.json"
 EMBEDDINGS_DIR = ROOT_DIR / "data" / "embeddings"
+CACHE_DIR = ROOT_DIR / "data" / "cache"
 JOB_OFFERS_DIR = ROOT_DIR / "data" / "exemples_offres" / "exemple_offre.txt"
 GENERATED_CVS_DIR = ROOT_DIR / "outputs" / "generated_cvs"
 TEMPLATES_DIR = ROOT_DIR / "src" / "templates"
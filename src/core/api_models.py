@@ -22,3 +22,4 @@ class CVGenerationRequest(BaseModel):
     experiences: List[Dict[str, Any]]
     job_offer_text: Optional[str] = None
     generation_id: Optional[str] = None
+    force_regenerate: bool = False # bypass the generated-CV cache
@@ -0,0 +1,150 @@
+# src/core/cache.py
+import os
+import sqlite3
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class SQLiteCache:
+    """
+    Small persistent key/value store backed by a local SQLite file.
+
+    - Values are raw bytes; callers handle (de)serialization.
+    - Entries are evicted least-recently-used first once `max_entries` is exceeded.
+    - Entries older than `ttl_seconds` (if set) are treated as misses.
+    - The file can be shared by several worker processes (WAL mode).
+    - Any SQLite error is logged and treated as a miss: a cache must never break the pipeline.
+    """
+    def __init__(self, path, table: str = "cache", max_entries: int = 50000, ttl_seconds: Optional[float] = None):
+        self.path = Path(path)
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    # --- Connection management ---
+    def _connect(self) -> sqlite3.Connection:
+        # Re-open after a fork (gunicorn workers) instead of sharing the parent's handle
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_last_access ON {self.table} (last_access)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    # --- Public API ---
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def set(self, key: str, value: bytes):
+        self.set_many({key: value})
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        found = {}
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                # SQLite limits the number of bound parameters; query in chunks
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT key, value, created_at FROM {self.table} WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    for key, value, created_at in rows:
+                        if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                            continue
+                        found[key] = value
+
+                if found:
+                    conn.executemany(
+                        f"UPDATE {self.table} SET last_access = ? WHERE key = ?",
+                        [(now, k) for k in found]
+                    )
+                    conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache '{self.table}' read failed: {e}")
+            found = {}
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items: Dict[str, bytes]):
+        if not items:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    [(k, sqlite3.Binary(v), now, now) for k, v in items.items()]
+                )
+                self._evict(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache '{self.table}' write failed: {e}")
+
+    def delete(self, key: str):
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache '{self.table}' delete failed: {e}")
+
+    def clear(self):
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(f"DELETE FROM {self.table}")
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache '{self.table}' clear failed: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    # --- Internals ---
+    def _evict(self, conn: sqlite3.Connection):
+        if self.ttl_seconds is not None:
+            conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+        count = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            logger.info(f"Cache '{self.table}': evicted {overflow} least recently used entries.")
@@ -0,0 +1,146 @@
+# src/core/cv_cache.py
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.utils import load_yaml
+from src.config.constants import ROOT_DIR, TEMPLATES_DIR
+
+logger = logging.getLogger(__name__)
+
+# One folder per generation inputs hash: cv.pdf, cv.tex, meta.json
+CV_CACHE_DIR = Path(os.getenv("CV_CACHE_DIR", str(ROOT_DIR / "outputs" / "cv_cache")))
+# Files whose content changes the generated CV besides the user inputs
+VERSIONED_FILES = ["src/config/prompts/generator.yaml", "src/config/prompts/generator_content.yaml"]
+CACHE_FORMAT = 1  # bump to invalidate every entry after a change in the generation code
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+def _policy() -> Dict[str, Any]:
+    settings = load_yaml("src/config/settings.yaml")
+    return {"enabled": True, "max_age_days": 30, "max_size_mb": 500, **(settings.get("cv_result_cache") or {})}
+
+def _file_digest(path: Path) -> str:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return "missing"
+
+def cache_key(user_profile: Dict[str, Any], experiences: List[Dict[str, Any]], template_name: str,
+              provider: str, model: str, job_offer_text: Optional[str] = None) -> str:
+    """
+    Stable hash of everything the generated CV depends on: profile (before skill ranking),
+    selected experiences, job offer, template, model, prompts and generation settings.
+    """
+    settings = load_yaml("src/config/settings.yaml")
+    template_path = TEMPLATES_DIR / f"{template_name}.tex"
+    inputs = {
+        "format": CACHE_FORMAT,
+        "profile": user_profile,
+        "experiences": experiences,
+        "job_offer": " ".join((job_offer_text or "").split()),
+        "template": template_name,
+        "template_version": _file_digest(template_path if template_path.exists() else TEMPLATES_DIR / "modern.tex"),
+        "prompts": [_file_digest(ROOT_DIR / p) for p in VERSIONED_FILES],
+        "llm": [provider, model, settings.get("temperature")],
+        "render_mode": settings.get("cv_render_mode", "template"),
+    }
+    encoded = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def lookup(key: str, dest_dir: Path) -> Optional[Tuple[str, str]]:
+    """
+    On a hit, copies the cached PDF/TeX into `dest_dir` (so eviction never breaks a
+    download link) and returns (pdf_path, tex_path).
+    """
+    if not _policy()["enabled"]:
+        return None
+    entry = CV_CACHE_DIR / key
+    pdf, tex = entry / "cv.pdf", entry / "cv.tex"
+    if not pdf.exists():
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    try:
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        # copyfile, not copy2: the job's files must be dated now, not when the entry was
+        # cached, or retention would treat a CV served a second ago as old
+        pdf_path = shutil.copyfile(pdf, dest_dir / f"cv_{dest_dir.name}.pdf")
+        tex_path = shutil.copyfile(tex, dest_dir / f"cv_{dest_dir.name}.tex") if tex.exists() else None
+    except OSError as e:
+        logger.warning(f"CV cache entry {key[:12]} unreadable: {e}")
+        return None
+    with _lock:
+        _stats["hits"] += 1
+    return str(pdf_path), str(tex_path) if tex_path else None
+
+def store(key: str, pdf_path: str, tex_path: Optional[str], meta: Dict[str, Any] = None):
+    """Adds a validated CV to the cache (written to a temp folder, then renamed), then evicts."""
+    policy = _policy()
+    if not policy["enabled"]:
+        return
+    entry = CV_CACHE_DIR / key
+    tmp = CV_CACHE_DIR / f".{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        tmp.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(pdf_path, tmp / "cv.pdf")
+        if tex_path and os.path.exists(tex_path):
+            shutil.copy2(tex_path, tmp / "cv.tex")
+        (tmp / "meta.json").write_text(json.dumps({"created_at": time.time(), **(meta or {})}), encoding="utf-8")
+        try:
+            tmp.rename(entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)  # stored concurrently by another worker
+    except OSError as e:
+        shutil.rmtree(tmp, ignore_errors=True)
+        logger.warning(f"Could not store CV in cache: {e}")
+        return
+    with _lock:
+        _stats["stores"] += 1
+    evict(policy["max_age_days"] * 86400, policy["max_size_mb"] * 1024 * 1024)
+
+def _entry_size(entry: Path) -> int:
+    return sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+
+def evict(max_age_s: float, max_bytes: int) -> int:
+    """Removes entries older than `max_age_s`, then the oldest ones until the total fits in `max_bytes`."""
+    if not CV_CACHE_DIR.exists():
+        return 0
+    now = time.time()
+    entries = []
+    for entry in CV_CACHE_DIR.iterdir():
+        if not entry.is_dir() or entry.name.startswith("."):
+            continue
+        try:
+            entries.append((entry.stat().st_mtime, _entry_size(entry), entry))
+        except OSError:
+            continue
+    entries.sort()
+
+    removed = 0
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, entry in entries:
+        if now - mtime <= max_age_s and total <= max_bytes:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+        removed += 1
+    if removed:
+        with _lock:
+            _stats["evictions"] += removed
+        logger.info(f"CV cache: evicted {removed} entries.")
+    return removed
+
+def get_cv_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        stats = dict(_stats)
+    entries = [e for e in CV_CACHE_DIR.iterdir() if e.is_dir() and not e.name.startswith(".")] if CV_CACHE_DIR.exists() else []
+    stats.update(entries=len(entries), size_mb=round(sum(_entry_size(e) for e in entries) / 1024 / 1024, 2))
+    return stats
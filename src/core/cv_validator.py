@@ -4,6 +4,7 @@ import subprocess
 import logging
 from pathlib import Path
 from typing import Tuple, List, Dict, Any
+from src.core.latex_compiler import CompileResult, pdf_page_count
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +43,12 @@ def check_content_rules(tex_content: str, target_company: str = None) -> List[st
             warnings.append(f"⚠️  Placeholder trouvé : '{p}'")
     return warnings
 
-def validate_cv(tex_path: str, target_company: str = None) -> Dict[str, Any]:
+def validate_cv(tex_path: str, target_company: str = None, compile_result: CompileResult = None) -> Dict[str, Any]:
+    """
+    Checks content rules and the 1-page limit.
+    The page count comes from `compile_result` when given, else from an existing PDF
+    next to the .tex; pdflatex is only run again when neither is available.
+    """
     path = Path(tex_path).resolve()
     if not path.exists():
         return {"valid": False, "warnings": ["Fichier non trouvé"]}
@@ -50,7 +56,16 @@ def validate_cv(tex_path: str, target_company: str = None) -> Dict[str, Any]:
     content = path.read_text(encoding='utf-8', errors='ignore')
     warnings = check_content_rules(content, target_company)
     
-    pages, _ = check_page_count(path, str(path.parent))
+    pages = None
+    if compile_result is not None:
+        pages = compile_result.page_count
+        if pages is None and compile_result.pdf_path:
+            pages = pdf_page_count(compile_result.pdf_path)
+    elif path.with_suffix('.pdf').exists():
+        pages = pdf_page_count(path.with_suffix('.pdf'))
+
+    if pages is None:
+        pages, _ = check_page_count(path, str(path.parent))
     
     page_status = "ok"
     if pages > 1:
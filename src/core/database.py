@@ -65,5 +65,20 @@ def run_auto_migrations():
             conn.commit()
         except Exception:
             pass
+
+        # 3. Generation progress on 'usage_logs'
+        for column in ("stage VARCHAR", "progress INTEGER"):
+            try:
+                conn.execute(text(f"ALTER TABLE usage_logs ADD COLUMN {column};"))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+
+        # 4. Profile cache version on 'users'
+        try:
+            conn.execute(text("ALTER TABLE users ADD COLUMN profile_version INTEGER DEFAULT 0;"))
+            conn.commit()
+        except Exception:
+            conn.rollback()
             
     logger.info("Migrations check complete.")
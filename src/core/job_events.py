@@ -0,0 +1,132 @@
+# src/core/job_events.py
+import asyncio
+import threading
+import logging
+from typing import Dict, Optional
+
+from src.core.database import SessionLocal
+from src.models.usage import UsageLog
+
+logger = logging.getLogger(__name__)
+
+# Generation stages and the progress they stand for
+STAGES = {
+    "queued": 0,
+    "ranking_skills": 10,
+    "llm": 25,
+    "compiling": 60,
+    "validating": 85,
+    "retrying": 90,
+    "done": 100,
+}
+TERMINAL_STATUSES = ("success", "error", "expired")
+
+# Fallback when the job runs in another process (JOB_WORKER_MODE=external):
+# waiters re-read the DB at this interval instead of being notified.
+DB_POLL_INTERVAL = 2.0
+
+def state_token(state: Dict) -> str:
+    """Opaque version of a state, sent back by clients as `since` to wait for the next change."""
+    return f"{state['status']}:{state['stage']}:{state['progress']}"
+
+class JobEventBus:
+    """
+    In-process pub/sub of job states. Workers publish from their threads; async
+    endpoints wait on an asyncio.Event woken up thread-safely on their own loop.
+    """
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._latest: Dict[str, Dict] = {}
+        self._waiters: Dict[str, set] = {}
+
+    def publish(self, job_id: str, state: Dict):
+        job_id = str(job_id)
+        with self._lock:
+            self._latest.pop(job_id, None)
+            self._latest[job_id] = state
+            while len(self._latest) > self.max_jobs:
+                self._latest.pop(next(iter(self._latest)))
+            waiters = self._waiters.pop(job_id, set())
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def latest(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._latest.get(str(job_id))
+
+    async def wait(self, job_id: str, timeout: float) -> bool:
+        """True if a new state was published for the job within `timeout` seconds."""
+        job_id = str(job_id)
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.setdefault(job_id, set()).add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters.get(job_id, set()).discard(waiter)
+                if not self._waiters.get(job_id):
+                    self._waiters.pop(job_id, None)
+
+bus = JobEventBus()
+
+def _state_from_log(log: UsageLog) -> Dict:
+    progress = 100 if log.status == "success" else (log.progress or 0)
+    stage = "done" if log.status == "success" else (log.stage or "queued")
+    return {"status": log.status, "stage": stage, "progress": progress}
+
+def report_progress(job_id: str, stage: str, status: str = "processing", progress: int = None):
+    """
+    Records a stage of a generation job: published in-process for waiting clients and
+    stored on the UsageLog (one small UPDATE per stage) for clients served by another process.
+    """
+    progress = STAGES.get(stage, 0) if progress is None else progress
+    state = {"status": status, "stage": stage, "progress": progress}
+    db = SessionLocal()
+    try:
+        db.query(UsageLog).filter(UsageLog.id == int(job_id)).update(
+            {UsageLog.stage: stage, UsageLog.progress: progress}, synchronize_session=False
+        )
+        db.commit()
+    except Exception as e:
+        logger.warning(f"Could not store progress of job {job_id}: {e}")
+    finally:
+        db.close()
+    bus.publish(job_id, state)
+
+def read_state(job_id: str) -> Optional[Dict]:
+    """Current state from the DB (source of truth), None if the job does not exist."""
+    db = SessionLocal()
+    try:
+        log = db.query(UsageLog).filter(UsageLog.id == int(job_id)).first()
+        return _state_from_log(log) if log else None
+    finally:
+        db.close()
+
+async def wait_for_change(job_id: str, since: Optional[str], timeout: float) -> Optional[Dict]:
+    """
+    Long-poll: returns as soon as the job state differs from `since` (or right away if
+    `since` is empty), else the unchanged state after `timeout` seconds.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    state = bus.latest(job_id)
+    if state is None or state["status"] in TERMINAL_STATUSES or not since:
+        # Terminal states are written to the DB by the worker; the bus may only know the last stage
+        state = await loop.run_in_executor(None, read_state, job_id)
+    while state is not None and since and state_token(state) == since and state["status"] not in TERMINAL_STATUSES:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        if await bus.wait(job_id, min(remaining, DB_POLL_INTERVAL)) and bus.latest(job_id):
+            state = bus.latest(job_id)
+        else:
+            state = await loop.run_in_executor(None, read_state, job_id)
+    return state
@@ -0,0 +1,249 @@
+# src/core/job_queue.py
+import os
+import json
+import uuid
+import signal
+import socket
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import Session
+
+from src.core.database import SessionLocal
+from src.core.llm_router import is_transient
+from src.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+# A claimed job is invisible to other workers until its lock expires.
+# The worker renews it while the handler runs; if the process dies, the job is picked up again.
+JOB_VISIBILITY_TIMEOUT = int(os.getenv("JOB_VISIBILITY_TIMEOUT", 300))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", 10))  # seconds, doubled at each attempt
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", 2))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+
+class PermanentJobError(Exception):
+    """
+    Raised by a handler when retrying cannot help: the job fails immediately.
+    Only transient errors (see llm_router.is_transient) are retried; anything else fails for good too.
+    """
+    pass
+
+# kind -> (handler(payload), on_failure(payload, error) or None)
+_handlers: Dict[str, tuple] = {}
+
+def register_handler(kind: str, handler: Callable[[dict], None], on_failure: Callable[[dict, str], None] = None):
+    """`on_failure` is called once, when the job has failed for good (no retry left)."""
+    _handlers[kind] = (handler, on_failure)
+
+def _now() -> datetime:
+    return datetime.utcnow()
+
+# --- PRODUCER ---
+
+def enqueue(db: Session, kind: str, payload: dict, user_id: int = None, usage_log_id: int = None, max_attempts: int = None) -> Job:
+    job = Job(
+        kind=kind, payload=json.dumps(payload), user_id=user_id, usage_log_id=usage_log_id,
+        status="queued", attempts=0, max_attempts=max_attempts or JOB_MAX_ATTEMPTS
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+# --- CONSUMER ---
+
+def _claimable(now: datetime):
+    return or_(
+        and_(Job.status == "queued", or_(Job.run_after.is_(None), Job.run_after <= now)),
+        # Lock expired: the worker that held it crashed or was restarted
+        and_(Job.status == "running", Job.locked_until < now, Job.attempts < Job.max_attempts),
+    )
+
+def claim_job(db: Session, worker_id: str, kinds: List[str] = None) -> Optional[Job]:
+    """
+    Claims the oldest available job with a conditional UPDATE: only one worker can move
+    a given row to 'running', on SQLite as on Postgres, without holding a transaction open.
+    """
+    now = _now()
+    query = db.query(Job.id).filter(_claimable(now))
+    if kinds:
+        query = query.filter(Job.kind.in_(kinds))
+    for (job_id,) in query.order_by(Job.id).limit(5).all():
+        claimed = db.query(Job).filter(Job.id == job_id, _claimable(now)).update({
+            Job.status: "running",
+            Job.locked_by: worker_id,
+            Job.locked_until: now + timedelta(seconds=JOB_VISIBILITY_TIMEOUT),
+            Job.attempts: Job.attempts + 1,
+        }, synchronize_session=False)
+        db.commit()
+        if claimed:
+            return db.get(Job, job_id, populate_existing=True)
+    return None
+
+def extend_lock(db: Session, job_id: int, worker_id: str) -> bool:
+    """Pushes the visibility timeout back; False if another worker took the job over."""
+    extended = db.query(Job).filter(Job.id == job_id, Job.locked_by == worker_id, Job.status == "running").update(
+        {Job.locked_until: _now() + timedelta(seconds=JOB_VISIBILITY_TIMEOUT)}, synchronize_session=False
+    )
+    db.commit()
+    return bool(extended)
+
+def complete_job(db: Session, job_id: int, worker_id: str):
+    db.query(Job).filter(Job.id == job_id, Job.locked_by == worker_id).update(
+        {Job.status: "done", Job.locked_until: None, Job.last_error: None}, synchronize_session=False
+    )
+    db.commit()
+
+def fail_job(db: Session, job: Job, worker_id: str, error: str, permanent: bool = False) -> bool:
+    """
+    Schedules a retry with exponential backoff, or marks the job failed. Returns True if final.
+    Returns False without touching the row if `worker_id` no longer holds the lock: the job
+    was taken over by another worker, which now owns its outcome.
+    """
+    final = permanent or job.attempts >= job.max_attempts
+    values = {Job.last_error: error[:2000], Job.locked_by: None, Job.locked_until: None}
+    if final:
+        values[Job.status] = "failed"
+    else:
+        values[Job.status] = "queued"
+        values[Job.run_after] = _now() + timedelta(seconds=JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1))
+    updated = db.query(Job).filter(Job.id == job.id, Job.locked_by == worker_id).update(values, synchronize_session=False)
+    db.commit()
+    if not updated:
+        logger.warning(f"Job {job.id}: lock lost by {worker_id}, failure not recorded.")
+        return False
+    return final
+
+def fail_abandoned_jobs(db: Session) -> List[Job]:
+    """Jobs whose lock expired on their last attempt: they will never be claimed again."""
+    now = _now()
+    abandoned = db.query(Job).filter(
+        Job.status == "running", Job.locked_until < now, Job.attempts >= Job.max_attempts
+    ).all()
+    failed = []
+    for job in abandoned:
+        updated = db.query(Job).filter(Job.id == job.id, Job.status == "running", Job.locked_until < now).update(
+            {Job.status: "failed", Job.last_error: "Worker lost (visibility timeout expired)", Job.locked_until: None},
+            synchronize_session=False
+        )
+        db.commit()
+        if updated:
+            failed.append(job)
+    return failed
+
+def _notify_failure(job: Job, error: str):
+    _, on_failure = _handlers.get(job.kind, (None, None))
+    if on_failure:
+        try:
+            on_failure(json.loads(job.payload or "{}"), error)
+        except Exception as e:
+            logger.error(f"on_failure hook of job {job.id} failed: {e}")
+
+def run_job(db: Session, job: Job, worker_id: str):
+    """Runs one claimed job, renewing its lock in the background while the handler works."""
+    handler, _ = _handlers.get(job.kind, (None, None))
+    if handler is None:
+        fail_job(db, job, worker_id, f"No handler registered for '{job.kind}'", permanent=True)
+        return
+
+    stop = threading.Event()
+    def heartbeat():
+        hb_db = SessionLocal()
+        try:
+            while not stop.wait(JOB_VISIBILITY_TIMEOUT / 3):
+                if not extend_lock(hb_db, job.id, worker_id):
+                    logger.warning(f"Job {job.id}: lock lost by {worker_id}.")
+                    return
+        finally:
+            hb_db.close()
+    renewer = threading.Thread(target=heartbeat, daemon=True, name=f"job-{job.id}-heartbeat")
+    renewer.start()
+
+    try:
+        handler(json.loads(job.payload or "{}"))
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        permanent = isinstance(e, PermanentJobError) or not is_transient(e)
+        final = fail_job(db, job, worker_id, error, permanent=permanent)
+        logger.error(f"Job {job.id} ({job.kind}) attempt {job.attempts}/{job.max_attempts} failed: {error}")
+        if final:
+            _notify_failure(job, error)
+    else:
+        complete_job(db, job.id, worker_id)
+        logger.info(f"Job {job.id} ({job.kind}) done on attempt {job.attempts}.")
+    finally:
+        stop.set()
+
+# --- WORKER ---
+
+class JobWorker:
+    """
+    Polls the jobs table with `concurrency` threads. Runs embedded in the API process
+    (JOB_WORKER_MODE=embedded) or standalone via worker.py, as many processes as needed.
+    """
+    def __init__(self, concurrency: int = None, poll_interval: float = None, kinds: List[str] = None):
+        self.concurrency = concurrency or JOB_WORKER_CONCURRENCY
+        self.poll_interval = poll_interval if poll_interval is not None else JOB_POLL_INTERVAL
+        self.kinds = kinds
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def run_once(self, slot: int = 0) -> bool:
+        """Claims and runs one job. Returns False when the queue was empty."""
+        db = SessionLocal()
+        try:
+            for job in fail_abandoned_jobs(db):
+                _notify_failure(job, "Worker lost (visibility timeout expired)")
+            job = claim_job(db, f"{self.worker_id}-{slot}", self.kinds)
+            if job is None:
+                return False
+            run_job(db, job, f"{self.worker_id}-{slot}")
+            return True
+        finally:
+            db.close()
+
+    def _loop(self, slot: int):
+        while not self._stop.is_set():
+            try:
+                if not self.run_once(slot):
+                    self._stop.wait(self.poll_interval)
+            except Exception as e:
+                logger.error(f"Job worker {self.worker_id}-{slot} error: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._loop, args=(slot,), daemon=True, name=f"job-worker-{slot}")
+            for slot in range(self.concurrency)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Job worker {self.worker_id} started ({self.concurrency} slots).")
+
+    def stop(self, timeout: float = None):
+        """Stops claiming new jobs and waits for the running ones."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def run_forever(self):
+        """Blocking mode for worker.py: runs until SIGTERM / Ctrl+C, then lets running jobs finish."""
+        signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+        self.start()
+        try:
+            while not self._stop.wait(1):
+                pass
+        except KeyboardInterrupt:
+            pass
+        logger.info(f"Stopping job worker {self.worker_id}, waiting for running jobs...")
+        self.stop()
+
+def get_job_stats(db: Session) -> Dict[str, int]:
+    return dict(db.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
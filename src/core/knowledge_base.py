@@ -1,11 +1,17 @@
+import os
 import json
+import copy
+import time
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional
 import jsonschema
 
 from src.config.constants import KNOWLEDGE_BASE_PATH
 from src.config.schema_definitions import KNOWLEDGE_BASE_SCHEMA
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload, configure_mappers
 from src.models.user import User as UserModel
 from src.models.profile import Experience as ExperienceModel, Education as EducationModel, Skill as SkillModel, Language as LanguageModel
 
@@ -43,35 +49,97 @@ class Profile:
     education: List[Education]
     languages: List[Language]
 
+def experience_from_model(exp: ExperienceModel) -> Experience:
+    return Experience(
+        title=exp.title or "Sans titre",
+        company=exp.company or "Inconnue",
+        period=f"{exp.start_date or ''} - {exp.end_date or 'Présent'}",
+        description=exp.description or ""
+    )
+
+def education_from_model(edu: EducationModel) -> Education:
+    return Education(
+        institution=edu.institution or "Inconnue",
+        degree=edu.degree or "Diplôme",
+        period=f"{edu.start_date or ''} - {edu.end_date or 'Présent'}",
+        mention=edu.mention
+    )
+
+def is_soft_skill(skill: SkillModel) -> bool:
+    cat = str(skill.category).lower() if skill.category else ""
+    return "soft" in cat
+
+# --- PROFILE CACHE ---
+# Profiles are rebuilt only when users.profile_version changes (bumped by the profile
+# endpoints) or after PROFILE_CACHE_TTL seconds; a hit costs one primary-key lookup.
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", 300))
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", 1000))
+
+_profile_cache: "OrderedDict[int, tuple]" = OrderedDict()  # user_id -> (version, loaded_at, Profile)
+_profile_cache_lock = threading.Lock()
+_profile_cache_stats = {"hits": 0, "misses": 0}
+
+def invalidate_profile_cache(db: Session, user_id: int):
+    """
+    Call before committing any change to a user's profile data: the version bump is part
+    of the same transaction, so every process sees the new profile on its next read.
+    """
+    db.query(UserModel).filter(UserModel.id == user_id).update(
+        {UserModel.profile_version: func.coalesce(UserModel.profile_version, 0) + 1}, synchronize_session=False
+    )
+    with _profile_cache_lock:
+        _profile_cache.pop(user_id, None)
+
+def get_profile_cache_stats() -> Dict[str, int]:
+    with _profile_cache_lock:
+        return {**_profile_cache_stats, "entries": len(_profile_cache)}
+
 def get_profile_from_db(db: Session, user_id: int) -> Profile:
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
+    """Returns a private copy: callers are free to modify it (e.g. re-ranked skills)."""
+    row = db.query(UserModel.profile_version).filter(UserModel.id == user_id).first()
+    if row is None:
+        raise ValueError(f"Utilisateur {user_id} introuvable.")
+    version = row[0] or 0
+
+    with _profile_cache_lock:
+        cached = _profile_cache.get(user_id)
+        if cached and cached[0] == version and time.monotonic() - cached[1] < PROFILE_CACHE_TTL:
+            _profile_cache.move_to_end(user_id)
+            _profile_cache_stats["hits"] += 1
+            return copy.deepcopy(cached[2])
+        _profile_cache_stats["misses"] += 1
+
+    profile = _load_profile(db, user_id)
+    with _profile_cache_lock:
+        _profile_cache[user_id] = (version, time.monotonic(), profile)
+        _profile_cache.move_to_end(user_id)
+        while len(_profile_cache) > PROFILE_CACHE_MAX_ENTRIES:
+            _profile_cache.popitem(last=False)
+    return copy.deepcopy(profile)
+
+def _load_profile(db: Session, user_id: int) -> Profile:
+    # Relationships are backrefs declared on the profile models: make sure they are set up
+    configure_mappers()
+    user = (
+        db.query(UserModel)
+        .options(
+            selectinload(UserModel.experiences), selectinload(UserModel.education),
+            selectinload(UserModel.skills), selectinload(UserModel.languages)
+        )
+        .filter(UserModel.id == user_id)
+        .first()
+    )
     if not user:
         raise ValueError(f"Utilisateur {user_id} introuvable.")
 
-    experiences = [
-        Experience(
-            title=exp.title or "Sans titre",
-            company=exp.company or "Inconnue",
-            period=f"{exp.start_date or ''} - {exp.end_date or 'Présent'}",
-            description=exp.description or ""
-        ) for exp in user.experiences
-    ]
-
-    education = [
-        Education(
-            institution=edu.institution or "Inconnue",
-            degree=edu.degree or "Diplôme",
-            period=f"{edu.start_date or ''} - {edu.end_date or 'Présent'}",
-            mention=edu.mention
-        ) for edu in user.education
-    ]
+    experiences = [experience_from_model(exp) for exp in user.experiences]
+    education = [education_from_model(edu) for edu in user.education]
 
     # Sécurité sur les catégories de compétences
     hard_skills = []
     soft_skills = []
     for s in user.skills:
-        cat = str(s.category).lower() if s.category else ""
-        if "soft" in cat:
+        if is_soft_skill(s):
             soft_skills.append(s.name)
         else:
             hard_skills.append(s.name)
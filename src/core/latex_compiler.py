@@ -0,0 +1,216 @@
+# src/core/latex_compiler.py
+import os
+import re
+import time
+import shutil
+import threading
+import subprocess
+import logging
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.config.constants import CACHE_DIR
+from src.core.latex_formats import format_for
+
+logger = logging.getLogger(__name__)
+
+# Preferred order: Tectonic (Docker/production), then a local TeX distribution
+ENGINE_ORDER = ["tectonic", "pdflatex"]
+
+# Shared Tectonic bundle/cache: packages are downloaded once, not per compile
+TECTONIC_CACHE_DIR = Path(os.getenv("TECTONIC_CACHE_DIR", str(CACHE_DIR / "tectonic")))
+
+@dataclass
+class CompileResult:
+    success: bool
+    engine: Optional[str] = None
+    pdf_path: Optional[str] = None
+    tex_path: Optional[str] = None
+    duration: float = 0.0      # seconds spent compiling
+    queue_wait: float = 0.0    # seconds spent waiting for a free worker
+    log: str = ""
+    page_count: Optional[int] = None
+    warnings: List[str] = field(default_factory=list)  # LaTeX warnings / overfull boxes from the log
+    errors: List[str] = field(default_factory=list)    # why engines failed
+
+# --- RESULT PARSING ---
+
+def parse_page_count(log: str) -> Optional[int]:
+    """Page count from a pdflatex log ("Output written on cv.pdf (1 page, ...)")."""
+    match = re.search(r"Output written on .*? \((\d+) pages?", log or "", re.DOTALL)
+    return int(match.group(1)) if match else None
+
+def parse_warnings(log: str) -> List[str]:
+    """LaTeX warnings and overfull boxes, one line each."""
+    return [
+        line.strip() for line in (log or "").splitlines()
+        if "LaTeX Warning:" in line or line.startswith("Overfull \\")
+    ]
+
+def pdf_page_count(pdf_path) -> Optional[int]:
+    """Page count read from the PDF itself (for online compiles or logs without it)."""
+    try:
+        from pypdf import PdfReader
+        return len(PdfReader(str(pdf_path)).pages)
+    except Exception as e:
+        logger.warning(f"Could not read page count from {pdf_path}: {e}")
+        return None
+
+# --- ENGINE DETECTION (once per process) ---
+
+_engines: Optional[List[str]] = None
+_engines_lock = threading.Lock()
+
+def available_engines(refresh: bool = False) -> List[str]:
+    """Local LaTeX engines that answered `--version`, probed once and then cached."""
+    global _engines
+    with _engines_lock:
+        if _engines is None or refresh:
+            found = []
+            for engine in ENGINE_ORDER:
+                if not shutil.which(engine):
+                    continue
+                try:
+                    subprocess.run([engine, "--version"], capture_output=True, check=True, timeout=10)
+                    found.append(engine)
+                except Exception as e:
+                    logger.warning(f"LaTeX engine {engine} found but not usable: {e}")
+            _engines = found
+            logger.info(f"Local LaTeX engines: {', '.join(found) or 'none (online fallback only)'}")
+        return list(_engines)
+
+# --- COMPILE POOL ---
+
+class LatexCompiler:
+    """
+    Bounded pool of compile workers. Each worker runs one engine process at a time,
+    so at most `max_workers` compilers run concurrently; extra requests wait in the queue.
+    """
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="latex")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._durations = []
+        self._waits = []
+
+    def compile(self, tex_path, output_dir=None, timeout: float = 60) -> CompileResult:
+        """Compiles `tex_path` with the first local engine that succeeds (blocks until done)."""
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+        return self._executor.submit(self._run, Path(tex_path), Path(output_dir or Path(tex_path).parent), timeout, submitted).result()
+
+    def _run(self, tex_path: Path, output_dir: Path, timeout: float, submitted: float) -> CompileResult:
+        queue_wait = time.perf_counter() - submitted
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+
+        start = time.perf_counter()
+        result = CompileResult(success=False, queue_wait=queue_wait)
+        try:
+            pdf_path = output_dir / tex_path.with_suffix(".pdf").name
+            for engine in available_engines():
+                try:
+                    log = _ENGINE_RUNNERS[engine](tex_path, output_dir, timeout)
+                except subprocess.TimeoutExpired:
+                    result.errors.append(f"{engine}: timeout after {timeout}s")
+                    continue
+                except Exception as e:
+                    result.errors.append(f"{engine}: {e}")
+                    continue
+                result.log = log
+                if pdf_path.exists():
+                    result.success, result.engine, result.pdf_path = True, engine, str(pdf_path)
+                    result.page_count = parse_page_count(log)
+                    if result.page_count is None:
+                        # Tectonic's log does not report the page count
+                        result.page_count = pdf_page_count(pdf_path)
+                    result.warnings = parse_warnings(log)
+                    break
+                result.errors.append(f"{engine}: no PDF produced")
+        finally:
+            result.duration = time.perf_counter() - start
+            with self._lock:
+                self._running -= 1
+                if result.success:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+                self._durations = (self._durations + [result.duration])[-200:]
+                self._waits = (self._waits + [queue_wait])[-200:]
+
+        logger.info(
+            f"LaTeX compile {'ok' if result.success else 'failed'} "
+            f"({result.engine or '-'}, {result.duration:.2f}s, queued {queue_wait:.2f}s)"
+        )
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            durations = sorted(self._durations)
+            waits = list(self._waits)
+            return {
+                "engines": list(_engines or []),
+                "workers": self.max_workers,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_compile_s": round(sum(durations) / len(durations), 3) if durations else None,
+                "p95_compile_s": round(durations[int(0.95 * (len(durations) - 1))], 3) if durations else None,
+                "avg_queue_wait_s": round(sum(waits) / len(waits), 3) if waits else None,
+            }
+
+# --- ENGINE RUNNERS ---
+
+def _run_tectonic(tex_path: Path, output_dir: Path, timeout: float) -> str:
+    TECTONIC_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    env = {**os.environ, "TECTONIC_CACHE_DIR": str(TECTONIC_CACHE_DIR)}
+    cmd = ["tectonic", "--keep-logs", "-o", str(output_dir), str(tex_path)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, env=env)
+    return _read_log(tex_path, output_dir) or (proc.stdout + proc.stderr)
+
+def _run_pdflatex(tex_path: Path, output_dir: Path, timeout: float) -> str:
+    cmd = ["pdflatex", "-interaction=nonstopmode", f"-output-directory={output_dir}", str(tex_path)]
+    env = None
+    fmt = format_for(tex_path.read_text(encoding="utf-8", errors="ignore"))
+    if fmt is not None:
+        # Preamble identical to a template: load its precompiled format instead of re-reading packages
+        env = {**os.environ, "TEXFORMATS": f"{fmt.parent}{os.pathsep}"}
+        fmt_cmd = cmd[:1] + [f"-fmt={fmt.stem}"] + cmd[1:]
+        subprocess.run(fmt_cmd, capture_output=True, text=True, timeout=timeout, env=env)
+        if (output_dir / tex_path.with_suffix(".pdf").name).exists():
+            cmd = fmt_cmd
+        else:
+            logger.warning(f"Compilation with format {fmt.stem} failed, retrying without it.")
+            env = None
+            subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    else:
+        subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    log = _read_log(tex_path, output_dir)
+    # Second pass only when LaTeX asks for it (labels/references changed)
+    if re.search(r"Rerun to get|Label\(s\) may have changed", log):
+        subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, env=env)
+        log = _read_log(tex_path, output_dir)
+    return log
+
+def _read_log(tex_path: Path, output_dir: Path) -> str:
+    log_file = output_dir / tex_path.with_suffix(".log").name
+    return log_file.read_text(encoding="utf-8", errors="ignore") if log_file.exists() else ""
+
+_ENGINE_RUNNERS = {"tectonic": _run_tectonic, "pdflatex": _run_pdflatex}
+
+compiler = LatexCompiler(int(os.getenv("LATEX_COMPILE_WORKERS", os.cpu_count() or 2)))
+
+def compile_tex(tex_path, output_dir=None, timeout: float = 60) -> CompileResult:
+    return compiler.compile(tex_path, output_dir, timeout)
+
+def get_compile_stats() -> Dict:
+    return compiler.stats()
@@ -0,0 +1,104 @@
+# src/core/latex_formats.py
+import os
+import re
+import hashlib
+import threading
+import subprocess
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.config.constants import TEMPLATES_DIR, CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Precompiled pdflatex formats (.fmt), one per template version
+FORMATS_DIR = Path(os.getenv("LATEX_FORMATS_DIR", str(CACHE_DIR / "latex_formats")))
+
+_build_lock = threading.Lock()
+# Template versions whose format could not be built (e.g. mylatexformat missing): not retried
+_failed_builds = set()
+
+def normalize_preamble(tex_source: str) -> Optional[str]:
+    """
+    Preamble (everything before \\begin{document}) without comments and with collapsed
+    whitespace, so cosmetic differences in generated documents still match the template.
+    Returns None if the document has no \\begin{document}.
+    """
+    idx = tex_source.find("\\begin{document}")
+    if idx == -1:
+        return None
+    preamble = re.sub(r"(?<!\\)%.*", "", tex_source[:idx])
+    return " ".join(preamble.split())
+
+_versions_cache = {"stamp": None, "versions": {}}
+
+def _template_versions() -> Dict[str, tuple]:
+    """normalized preamble -> (template file, format name) for every template (re-read when a template changes)."""
+    templates = sorted(TEMPLATES_DIR.glob("*.tex"))
+    stamp = tuple((t.name, t.stat().st_mtime_ns) for t in templates)
+    if _versions_cache["stamp"] == stamp:
+        return _versions_cache["versions"]
+
+    versions = {}
+    for template in templates:
+        source = template.read_text(encoding="utf-8")
+        preamble = normalize_preamble(source)
+        if preamble is None:
+            continue
+        # The hash covers the whole file: editing a template gives a new format name
+        digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:12]
+        versions[preamble] = (template, f"{template.stem}-{digest}")
+    _versions_cache.update(stamp=stamp, versions=versions)
+    return versions
+
+def build_format(template: Path, name: str, timeout: float = 120) -> Optional[Path]:
+    """
+    Dumps the template's preamble into FORMATS_DIR/<name>.fmt with mylatexformat.
+    Older formats of the same template are removed.
+    """
+    fmt_path = FORMATS_DIR / f"{name}.fmt"
+    with _build_lock:
+        if fmt_path.exists():
+            return fmt_path
+        if name in _failed_builds:
+            return None
+
+        FORMATS_DIR.mkdir(parents=True, exist_ok=True)
+        cmd = [
+            "pdflatex", "-ini", "-interaction=nonstopmode",
+            f"-output-directory={FORMATS_DIR}", f"-jobname={name}",
+            "&pdflatex", "mylatexformat.ltx", str(template.resolve())
+        ]
+        try:
+            # The template's \input files (e.g. glyphtounicode) are resolved from its folder
+            subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, cwd=str(template.parent))
+        except Exception as e:
+            logger.warning(f"Could not build LaTeX format {name}: {e}")
+        if not fmt_path.exists():
+            logger.warning(f"LaTeX format {name} was not produced (is mylatexformat installed?). Compiling without it.")
+            _failed_builds.add(name)
+            return None
+
+        for stale in FORMATS_DIR.glob(f"{template.stem}-*.fmt"):
+            if stale != fmt_path:
+                stale.unlink(missing_ok=True)
+        logger.info(f"Built LaTeX format {name}.")
+        return fmt_path
+
+def format_for(tex_source: str) -> Optional[Path]:
+    """
+    Precompiled format matching the document's preamble, built on first use.
+    Returns None when the preamble differs from every template (e.g. edited by the LLM).
+    """
+    preamble = normalize_preamble(tex_source)
+    if preamble is None:
+        return None
+    match = _template_versions().get(preamble)
+    if match is None:
+        return None
+    return build_format(*match)
+
+def build_all_formats() -> Dict[str, Optional[Path]]:
+    """Build step: precompiles the format of every template."""
+    return {template.stem: build_format(template, name) for template, name in _template_versions().values()}
@@ -1,10 +1,28 @@
 import os
-from anthropic import Anthropic
-from openai import OpenAI
-from groq import Groq
+import inspect
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from anthropic import Anthropic, AsyncAnthropic
+from openai import OpenAI, AsyncOpenAI
+from groq import Groq, AsyncGroq
 from src.core.utils import load_yaml
+from src.core.llm_router import LLMRouter, to_llm_error
+from src.core.cache import SQLiteCache
+from src.config.constants import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_PATH = "src/config/settings.yaml"
 
 # --- FACTORY FUNCTIONS ---
+# Every wrapper exposes the same interface:
+#   chat(prompt, json_mode)          -> str             (blocking)
+#   achat(prompt, json_mode)         -> str             (async, SDK async client)
+#   astream(prompt)                  -> async iterator of text chunks
+# Failures raise an LLMError subclass (see llm_router) instead of returning an error string.
+# Async SDK clients are created on first async use, so sync-only callers never pay for them.
 
 def _make_openai_client(model_name: str, temperature: float, max_tokens: int, api_key: str = None):
     key = api_key or os.getenv("OPENAI_API_KEY")
@@ -14,7 +32,9 @@ def _make_openai_client(model_name: str, temperature: float, max_tokens: int, ap
     client = OpenAI(api_key=key)
 
     class OpenAIWrapper:
-        def chat(self, prompt: str, json_mode: bool = False) -> str:
+        _aclient = None
+
+        def _params(self, prompt: str, json_mode: bool = False) -> dict:
             params = {
                 "model": model_name,
                 "messages": [{"role": "user", "content": prompt}],
@@ -23,12 +43,35 @@ def _make_openai_client(model_name: str, temperature: float, max_tokens: int, ap
             }
             if json_mode:
                 params["response_format"] = {"type": "json_object"}
-            
+            return params
+
+        def _async_client(self):
+            if self._aclient is None:
+                self._aclient = AsyncOpenAI(api_key=key)
+            return self._aclient
+
+        def chat(self, prompt: str, json_mode: bool = False) -> str:
+            try:
+                resp = client.chat.completions.create(**self._params(prompt, json_mode))
+                return resp.choices[0].message.content or ""
+            except Exception as e:
+                raise to_llm_error("openai", e) from e
+
+        async def achat(self, prompt: str, json_mode: bool = False) -> str:
             try:
-                resp = client.chat.completions.create(**params)
+                resp = await self._async_client().chat.completions.create(**self._params(prompt, json_mode))
                 return resp.choices[0].message.content or ""
             except Exception as e:
-                return f"Error (OpenAI): {str(e)}"
+                raise to_llm_error("openai", e) from e
+
+        async def astream(self, prompt: str):
+            try:
+                stream = await self._async_client().chat.completions.create(**self._params(prompt), stream=True)
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except Exception as e:
+                raise to_llm_error("openai", e) from e
 
     return OpenAIWrapper()
 
@@ -40,7 +83,9 @@ def _make_groq_client(model_name: str, temperature: float, max_tokens: int, api_
     client = Groq(api_key=key)
 
     class GroqWrapper:
-        def chat(self, prompt: str, json_mode: bool = False) -> str:
+        _aclient = None
+
+        def _params(self, prompt: str, json_mode: bool = False) -> dict:
             # Groq supports JSON mode for some models (like llama-3.3-70b-versatile)
             # We set response_format if json_mode is requested
             params = {
@@ -51,12 +96,35 @@ def _make_groq_client(model_name: str, temperature: float, max_tokens: int, api_
             }
             if json_mode:
                 params["response_format"] = {"type": "json_object"}
-            
+            return params
+
+        def _async_client(self):
+            if self._aclient is None:
+                self._aclient = AsyncGroq(api_key=key)
+            return self._aclient
+
+        def chat(self, prompt: str, json_mode: bool = False) -> str:
+            try:
+                resp = client.chat.completions.create(**self._params(prompt, json_mode))
+                return resp.choices[0].message.content or ""
+            except Exception as e:
+                raise to_llm_error("groq", e) from e
+
+        async def achat(self, prompt: str, json_mode: bool = False) -> str:
             try:
-                resp = client.chat.completions.create(**params)
+                resp = await self._async_client().chat.completions.create(**self._params(prompt, json_mode))
                 return resp.choices[0].message.content or ""
             except Exception as e:
-                return f"Error (Groq): {str(e)}"
+                raise to_llm_error("groq", e) from e
+
+        async def astream(self, prompt: str):
+            try:
+                stream = await self._async_client().chat.completions.create(**self._params(prompt), stream=True)
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except Exception as e:
+                raise to_llm_error("groq", e) from e
 
     return GroqWrapper()
 
@@ -68,17 +136,42 @@ def _make_anthropic_client(model_name: str, temperature: float, max_tokens: int,
     client = Anthropic(api_key=key)
 
     class AnthropicWrapper:
+        _aclient = None
+
+        def _params(self, prompt: str) -> dict:
+            return {
+                "model": model_name,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "messages": [{"role": "user", "content": prompt}]
+            }
+
+        def _async_client(self):
+            if self._aclient is None:
+                self._aclient = AsyncAnthropic(api_key=key)
+            return self._aclient
+
         def chat(self, prompt: str, json_mode: bool = False) -> str:
             try:
-                message = client.messages.create(
-                    model=model_name,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                    messages=[{"role": "user", "content": prompt}]
-                )
+                message = client.messages.create(**self._params(prompt))
                 return message.content[0].text
             except Exception as e:
-                return f"Error (Anthropic): {str(e)}"
+                raise to_llm_error("anthropic", e) from e
+
+        async def achat(self, prompt: str, json_mode: bool = False) -> str:
+            try:
+                message = await self._async_client().messages.create(**self._params(prompt))
+                return message.content[0].text
+            except Exception as e:
+                raise to_llm_error("anthropic", e) from e
+
+        async def astream(self, prompt: str):
+            try:
+                async with self._async_client().messages.stream(**self._params(prompt)) as stream:
+                    async for text in stream.text_stream:
+                        yield text
+            except Exception as e:
+                raise to_llm_error("anthropic", e) from e
 
     return AnthropicWrapper()
 
@@ -89,14 +182,14 @@ def _make_gemini_client(model_name: str, temperature: float, max_tokens: int, ap
 
     from google import genai
     client = genai.Client(api_key=key)
+    config = {
+        "temperature": temperature,
+        "max_output_tokens": max_tokens
+    }
 
     class GeminiWrapper:
         def chat(self, prompt: str, json_mode: bool = False) -> str:
             try:
-                config = {
-                    "temperature": temperature,
-                    "max_output_tokens": max_tokens
-                }
                 response = client.models.generate_content(
                     model=model_name,
                     contents=prompt,
@@ -104,17 +197,207 @@ def _make_gemini_client(model_name: str, temperature: float, max_tokens: int, ap
                 )
                 return response.text
             except Exception as e:
-                 return f"Error (Gemini): {str(e)}"
+                 raise to_llm_error("gemini", e) from e
+
+        async def achat(self, prompt: str, json_mode: bool = False) -> str:
+            # The genai client carries its own async interface (client.aio)
+            try:
+                response = await client.aio.models.generate_content(
+                    model=model_name,
+                    contents=prompt,
+                    config=config
+                )
+                return response.text
+            except Exception as e:
+                 raise to_llm_error("gemini", e) from e
+
+        async def astream(self, prompt: str):
+            try:
+                stream = client.aio.models.generate_content_stream(
+                    model=model_name,
+                    contents=prompt,
+                    config=config
+                )
+                # Async generator in some google-genai releases, coroutine returning one in others
+                if inspect.isawaitable(stream):
+                    stream = await stream
+                async for chunk in stream:
+                    if chunk.text:
+                        yield chunk.text
+            except Exception as e:
+                raise to_llm_error("gemini", e) from e
 
     return GeminiWrapper()
 
 
-def get_llm(provider: str = None, model: str = None, user_api_key: str = None):
+# --- SETTINGS & CLIENT REGISTRY ---
+
+_settings_cache = {"mtime": None, "data": {}}
+
+def _load_settings() -> dict:
+    """settings.yaml, re-parsed only when the file changes on disk."""
+    try:
+        mtime = os.stat(SETTINGS_PATH).st_mtime_ns
+    except OSError:
+        return {}
+    if _settings_cache["mtime"] != mtime:
+        _settings_cache["data"] = load_yaml(SETTINGS_PATH) or {}
+        _settings_cache["mtime"] = mtime
+    return _settings_cache["data"]
+
+class _ClientRegistry:
+    """
+    Bounded LRU of LLM wrappers keyed by (provider, model, temperature, max_tokens, key hash),
+    so SDK clients and their HTTP connection pools are reused across requests.
+
+    Evicted clients are only dropped, not closed: an agent may still be using one,
+    and the SDKs release their connection pool when the client is garbage-collected.
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, key, factory):
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return client
+            self.misses += 1
+
+        client = factory()
+        if client is None:
+            # Missing API key: nothing worth keeping (the key may be configured later)
+            return None
+
+        with self._lock:
+            # Another thread may have built the same client meanwhile; keep the first one
+            client = self._clients.setdefault(key, client)
+            self._clients.move_to_end(key)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+        return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._clients),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+_client_registry = _ClientRegistry(int(os.getenv("LLM_CLIENT_CACHE_SIZE", 32)))
+
+_FACTORIES = {
+    "openai": _make_openai_client,
+    "groq": _make_groq_client,
+    "anthropic": _make_anthropic_client,
+    "gemini": _make_gemini_client,
+}
+
+def get_llm_client_stats() -> dict:
+    return _client_registry.stats()
+
+# --- RESPONSE CACHE ---
+
+class CachedLLM:
+    """
+    Exact-match response cache in front of an LLM client (same chat / achat / astream interface).
+    Key: namespace (provider, model, temperature) + json_mode + hash of the prompt.
+    Only successful responses are stored; errors always propagate.
+    """
+    def __init__(self, llm, namespace: str, cache: SQLiteCache):
+        self.llm = llm
+        self.namespace = namespace
+        self.cache = cache
+
+    def _key(self, prompt: str, json_mode: bool) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"{self.namespace}:{int(json_mode)}:{digest}"
+
+    def _get(self, key: str):
+        value = self.cache.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    def chat(self, prompt: str, json_mode: bool = False) -> str:
+        key = self._key(prompt, json_mode)
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+        response = self.llm.chat(prompt, json_mode)
+        self.cache.set(key, response.encode("utf-8"))
+        return response
+
+    async def achat(self, prompt: str, json_mode: bool = False) -> str:
+        key = self._key(prompt, json_mode)
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+        response = await self.llm.achat(prompt, json_mode)
+        self.cache.set(key, response.encode("utf-8"))
+        return response
+
+    async def astream(self, prompt: str):
+        key = self._key(prompt, False)
+        cached = self._get(key)
+        if cached is not None:
+            yield cached
+            return
+        chunks = []
+        async for chunk in self.llm.astream(prompt):
+            chunks.append(chunk)
+            yield chunk
+        # Stored only once the stream completed
+        self.cache.set(key, "".join(chunks).encode("utf-8"))
+
+_response_cache = None
+
+def _get_response_cache(policy: dict) -> SQLiteCache:
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = SQLiteCache(
+            CACHE_DIR / "llm_responses.sqlite",
+            table="llm_responses",
+            max_entries=int(policy.get("max_entries", 2000)),
+            ttl_seconds=float(policy.get("ttl_seconds", 7 * 24 * 3600))
+        )
+    return _response_cache
+
+def get_llm_response_cache_stats() -> dict:
+    return _response_cache.stats() if _response_cache else {"hits": 0, "misses": 0, "hit_rate": 0.0}
+
+def _get_client(provider: str, model: str, temperature: float, max_tokens: int, api_key: str = None):
+    # Never keep raw API keys in the registry keys
+    key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else None
+    registry_key = (provider, model, temperature, max_tokens, key_hash)
+    factory = _FACTORIES[provider]
+    return _client_registry.get_or_create(
+        registry_key,
+        lambda: factory(model, temperature, max_tokens, api_key)
+    )
+
+def get_llm(provider: str = None, model: str = None, user_api_key: str = None, cache: bool = False):
     """
     Returns an LLM client based on arguments or default config.
-    Prioritizes args > config.
+    Prioritizes args > config. Underlying SDK clients are shared across calls.
+
+    The client is an LLMRouter: the requested provider first, then the `llm_fallbacks`
+    of settings.yaml that have an API key configured. Returns None if none is usable.
+
+    With cache=True, identical prompts are answered from the `llm_response_cache`
+    (settings.yaml). Sampled outputs (temperature > 0) bypass it unless the policy
+    sets `allow_nonzero_temperature`.
     """
-    cfg = load_yaml("src/config/settings.yaml")
+    cfg = _load_settings()
     
     # Defaults from config
     target_provider = provider or cfg.get("llm_provider", "openai")
@@ -122,14 +405,33 @@ def get_llm(provider: str = None, model: str = None, user_api_key: str = None):
     temperature = float(cfg.get("temperature", 0.3))
     max_tokens = int(cfg.get("max_output_tokens", 2048)) # Increased default for parsing
 
-    if target_provider == "openai":
-        return _make_openai_client(target_model, temperature, max_tokens, user_api_key)
-    elif target_provider == "groq":
-        return _make_groq_client(target_model, temperature, max_tokens, user_api_key)
-    elif target_provider == "anthropic":
-        return _make_anthropic_client(target_model, temperature, max_tokens, user_api_key)
-    elif target_provider == "gemini":
-        return _make_gemini_client(target_model, temperature, max_tokens, user_api_key)
-    
-    # Fallback
-    return _make_openai_client("gpt-4o-mini", temperature, max_tokens, user_api_key)
\ No newline at end of file
+    if target_provider not in _FACTORIES:
+        # Fallback
+        target_provider, target_model = "openai", "gpt-4o-mini"
+
+    backends = []
+    primary = _get_client(target_provider, target_model, temperature, max_tokens, user_api_key)
+    if primary is not None:
+        # A user's own key gets its own circuit: an invalid key must not disable the provider for everyone
+        health_name = target_provider
+        if user_api_key:
+            health_name += ":user-" + hashlib.sha256(user_api_key.encode("utf-8")).hexdigest()[:8]
+        backends.append((health_name, primary))
+
+    for fallback in cfg.get("llm_fallbacks") or []:
+        fb_provider, fb_model = fallback.get("provider"), fallback.get("model")
+        if fb_provider not in _FACTORIES or (fb_provider, fb_model) == (target_provider, target_model):
+            continue
+        client = _get_client(fb_provider, fb_model, temperature, max_tokens)
+        if client is not None:
+            backends.append((fb_provider, client))
+
+    if not backends:
+        return None
+    router = LLMRouter(backends, hedge_percentile=cfg.get("llm_hedge_percentile"))
+
+    policy = cfg.get("llm_response_cache") or {}
+    if cache and policy.get("enabled", False) and (temperature == 0 or policy.get("allow_nonzero_temperature", False)):
+        # Keyed on the requested provider/model: an answer served by a fallback is reused as well
+        return CachedLLM(router, f"{target_provider}:{target_model}:{temperature}", _get_response_cache(policy))
+    return router
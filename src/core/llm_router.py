@@ -0,0 +1,320 @@
+# src/core/llm_router.py
+import time
+import asyncio
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- TYPED ERRORS ---
+
+class LLMError(RuntimeError):
+    """Base class for LLM call failures (raised instead of returning an error string)."""
+    def __init__(self, message: str, provider: str = None, status: int = None):
+        super().__init__(f"{provider}: {message}" if provider else message)
+        self.provider = provider
+        self.status = status  # HTTP status of the provider answer, when known
+
+class LLMTimeoutError(LLMError):
+    pass
+
+class LLMRateLimitError(LLMError):
+    pass
+
+class LLMProviderError(LLMError):
+    """Any other provider-side failure (HTTP 5xx, invalid request, network error...)."""
+    pass
+
+class LLMUnavailableError(LLMError):
+    """No provider could serve the request (all failed or all circuits open)."""
+    def __init__(self, message: str, errors: List[LLMError] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+def to_llm_error(provider: str, exc: Exception) -> LLMError:
+    """Maps an SDK exception to the matching LLMError subclass."""
+    if isinstance(exc, LLMError):
+        return exc
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    status = status if isinstance(status, int) else None
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)) or "timeout" in type(exc).__name__.lower():
+        return LLMTimeoutError(str(exc), provider, status)
+    if status == 429 or "ratelimit" in type(exc).__name__.lower():
+        return LLMRateLimitError(str(exc), provider, status)
+    return LLMProviderError(str(exc), provider, status)
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    True for failures that may go away on retry: timeouts, rate limits, 5xx and network
+    errors. Client errors (4xx: invalid request, bad API key...) and non-LLM errors are not.
+    Follows `raise ... from` chains, so an LLM error wrapped by the caller is still recognized.
+    """
+    while exc is not None:
+        if isinstance(exc, LLMUnavailableError):
+            return not exc.errors or any(is_transient(e) for e in exc.errors)
+        if isinstance(exc, LLMError):
+            return exc.status is None or exc.status == 429 or not 400 <= exc.status < 500
+        if isinstance(exc, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+            return True
+        exc = exc.__cause__
+    return False
+
+# --- HEALTH TRACKING ---
+
+class ProviderHealth:
+    """
+    Circuit breaker and latency samples for one provider.
+
+    - closed: requests go through.
+    - open: after `failure_threshold` consecutive transient failures (see is_transient),
+      the provider is skipped for `reset_timeout` seconds.
+    - half-open: after that delay a single probe request is let through; success closes
+      the circuit, a transient failure re-opens it. A probe that never reports back
+      (caller cancelled, provider not used after all) is given up after `reset_timeout`.
+    """
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0, window: int = 100):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def _circuit(self, now: float) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if now - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        """True if a request may be sent; in half-open state, True for the probe only."""
+        with self._lock:
+            now = time.monotonic()
+            circuit = self._circuit(now)
+            if circuit == "closed":
+                return True
+            if circuit == "open":
+                return False
+            if self.probe_started_at is not None and now - self.probe_started_at < self.reset_timeout:
+                return False
+            self.probe_started_at = now
+            return True
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.probe_started_at = None
+            self.latencies.append(latency)
+
+    def record_failure(self, transient: bool = True):
+        """
+        Non-transient failures (invalid request, bad API key...) say nothing about the
+        provider's health: they only end the probe, without opening the circuit.
+        """
+        with self._lock:
+            half_open = self.probe_started_at is not None
+            self.probe_started_at = None
+            if not transient:
+                return
+            self.consecutive_failures += 1
+            if half_open or self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def latency_percentile(self, percentile: float, min_samples: int = 20) -> Optional[float]:
+        """Observed latency at `percentile` (0-1), or None until enough calls were measured."""
+        with self._lock:
+            if len(self.latencies) < min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+    def state(self) -> Dict:
+        p50 = self.latency_percentile(0.5, min_samples=1)
+        with self._lock:
+            circuit = self._circuit(time.monotonic())
+        return {
+            "circuit": circuit,
+            "consecutive_failures": self.consecutive_failures,
+            "p50_latency_s": round(p50, 3) if p50 is not None else None,
+        }
+
+# Shared by every router of the process: health is a property of the provider, not of the caller
+_provider_health: Dict[str, ProviderHealth] = {}
+_health_lock = threading.Lock()
+
+def get_provider_health(provider: str) -> ProviderHealth:
+    with _health_lock:
+        if provider not in _provider_health:
+            _provider_health[provider] = ProviderHealth()
+        return _provider_health[provider]
+
+def get_provider_health_stats() -> Dict[str, Dict]:
+    return {name: health.state() for name, health in list(_provider_health.items())}
+
+# Threads used only for hedged (duplicated) calls of the sync API
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+
+# --- ROUTER ---
+
+class LLMRouter:
+    """
+    Same interface as the provider wrappers (chat / achat / astream), spread over an
+    ordered list of (provider name, wrapper) backends.
+
+    - Providers whose circuit is open are skipped.
+    - On an LLMError, the next provider is tried.
+    - With `hedge_percentile` set, if the current provider has not answered after its
+      observed latency at that percentile, the next provider is queried in parallel and
+      the first successful answer wins.
+    """
+    def __init__(self, backends: List[tuple], hedge_percentile: Optional[float] = None):
+        self.backends = backends
+        self.hedge_percentile = hedge_percentile
+
+    def _next_candidate(self, start: int) -> Optional[int]:
+        """
+        Index of the first backend from `start` whose circuit lets a request through.
+        Checked just before the call: in half-open state allow() takes the single probe
+        slot, which must not be spent on a fallback that ends up not being called.
+        """
+        for j in range(start, len(self.backends)):
+            if get_provider_health(self.backends[j][0]).allow():
+                return j
+        return None
+
+    def _unavailable(self, errors: List[LLMError]) -> LLMUnavailableError:
+        if not errors:
+            return LLMUnavailableError(f"All LLM providers are temporarily disabled ({', '.join(n for n, _ in self.backends)}).")
+        return LLMUnavailableError(f"All LLM providers failed: {'; '.join(str(e) for e in errors)}", errors)
+
+    def _hedge_delay(self, name: str, has_next: bool) -> Optional[float]:
+        if not self.hedge_percentile or not has_next:
+            return None
+        return get_provider_health(name).latency_percentile(self.hedge_percentile)
+
+    # --- Sync ---
+    def _call(self, name: str, fn: Callable):
+        health = get_provider_health(name)
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            error = to_llm_error(name, e)
+            health.record_failure(is_transient(error))
+            logger.warning(f"LLM provider {name} failed ({type(error).__name__}): {error}")
+            raise error from e
+        health.record_success(time.perf_counter() - start)
+        return result
+
+    def _route(self, method: str, *args):
+        errors = []
+        i = self._next_candidate(0)
+        while i is not None:
+            name, client = self.backends[i]
+            delay = self._hedge_delay(name, i + 1 < len(self.backends))
+            if delay is None:
+                try:
+                    return self._call(name, lambda: getattr(client, method)(*args))
+                except LLMError as e:
+                    errors.append(e)
+                    i = self._next_candidate(i + 1)
+                    continue
+
+            # Hedged pair: the slower call keeps running in the background and its result is dropped
+            futures = {_hedge_executor.submit(self._call, name, lambda c=client: getattr(c, method)(*args)): name}
+            done, _ = wait(futures, timeout=delay)
+            hedge = self._next_candidate(i + 1) if not done else None
+            if hedge is not None:
+                hedge_name, hedge_client = self.backends[hedge]
+                logger.info(f"LLM provider {name} slower than p{int(self.hedge_percentile * 100)} ({delay:.2f}s), hedging with {hedge_name}.")
+                futures[_hedge_executor.submit(self._call, hedge_name, lambda c=hedge_client: getattr(c, method)(*args))] = hedge_name
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        return future.result()
+                    except LLMError as e:
+                        errors.append(e)
+            i = self._next_candidate((hedge if hedge is not None else i) + 1)
+
+        raise self._unavailable(errors)
+
+    def chat(self, prompt: str, json_mode: bool = False) -> str:
+        return self._route("chat", prompt, json_mode)
+
+    # --- Async ---
+    async def _acall(self, name: str, client, prompt: str, json_mode: bool):
+        health = get_provider_health(name)
+        start = time.perf_counter()
+        try:
+            result = await client.achat(prompt, json_mode)
+        except Exception as e:
+            # (a task cancelled after losing a hedge race raises CancelledError, not recorded)
+            error = to_llm_error(name, e)
+            health.record_failure(is_transient(error))
+            logger.warning(f"LLM provider {name} failed ({type(error).__name__}): {error}")
+            raise error from e
+        health.record_success(time.perf_counter() - start)
+        return result
+
+    async def achat(self, prompt: str, json_mode: bool = False) -> str:
+        errors = []
+        i = self._next_candidate(0)
+        while i is not None:
+            name, client = self.backends[i]
+            delay = self._hedge_delay(name, i + 1 < len(self.backends))
+            tasks = [asyncio.ensure_future(self._acall(name, client, prompt, json_mode))]
+            hedge = None
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                hedge = self._next_candidate(i + 1) if not done else None
+                if hedge is not None:
+                    hedge_name, hedge_client = self.backends[hedge]
+                    logger.info(f"LLM provider {name} slower than p{int(self.hedge_percentile * 100)} ({delay:.2f}s), hedging with {hedge_name}.")
+                    tasks.append(asyncio.ensure_future(self._acall(hedge_name, hedge_client, prompt, json_mode)))
+            pending = set(tasks)
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        try:
+                            return task.result()
+                        except LLMError as e:
+                            errors.append(e)
+            finally:
+                for task in pending:
+                    task.cancel()
+            i = self._next_candidate((hedge if hedge is not None else i) + 1)
+
+        raise self._unavailable(errors)
+
+    async def astream(self, prompt: str):
+        """Fails over only until the first chunk has been sent; no hedging for streams."""
+        errors = []
+        for name, client in self.backends:
+            health = get_provider_health(name)
+            if not health.allow():
+                continue
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in client.astream(prompt):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                error = to_llm_error(name, e)
+                health.record_failure(is_transient(error))
+                if started:
+                    raise error from e
+                logger.warning(f"LLM provider {name} failed before streaming ({type(error).__name__}): {error}")
+                errors.append(error)
+                continue
+            health.record_success(time.perf_counter() - start)
+            return
+
+        raise self._unavailable(errors)
@@ -0,0 +1,61 @@
+# src/core/mmr.py
+import numpy as np
+from typing import Optional, Tuple
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Returns a float32 (k, d) copy with L2-normalized rows (zero rows stay zero)."""
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def mmr_select(
+    vectors: np.ndarray,
+    relevance: np.ndarray,
+    top_n: int = 3,
+    lambda_mult: float = 0.7,
+    redundancy_threshold: Optional[float] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Maximal Marginal Relevance selection over a candidate matrix.
+
+    Args:
+        vectors: (k, d) float32 matrix of L2-normalized candidate vectors.
+        relevance: (k,) similarity of each candidate to the query.
+        top_n: Maximum number of candidates to select.
+        lambda_mult: 1.0 ranks purely by relevance, 0.0 purely by novelty.
+        redundancy_threshold: Candidates whose similarity to an already selected
+                              one exceeds this value are never selected.
+
+    Returns:
+        (indices, scores): selected row indices in selection order, and their MMR scores.
+    """
+    k = vectors.shape[0] if vectors.ndim == 2 else 0
+    top_n = min(top_n, k)
+    if top_n <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    relevance = np.asarray(relevance, dtype=np.float32)
+    # Highest similarity of each candidate to the current selection (0 until the first pick)
+    max_sim = np.full(k, -np.inf, dtype=np.float32)
+    available = np.ones(k, dtype=bool)
+
+    indices, scores = [], []
+    for _ in range(top_n):
+        penalty = max_sim if indices else 0.0
+        mmr = lambda_mult * relevance - (1.0 - lambda_mult) * penalty
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        if not np.isfinite(mmr[best]):
+            break
+
+        indices.append(best)
+        scores.append(float(mmr[best]))
+        available[best] = False
+
+        # One matrix-vector product per selected item instead of pairwise Python loops
+        max_sim = np.maximum(max_sim, vectors @ vectors[best])
+        if redundancy_threshold is not None:
+            available &= max_sim <= redundancy_threshold
+
+    return np.array(indices, dtype=np.int64), np.array(scores, dtype=np.float32)
@@ -1,15 +1,18 @@
 # src/core/orchestration.py
 import os
+import time
 import logging
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 from dotenv import load_dotenv
 from thefuzz import process
 
 from src.agents.parser import ParserAgent
 from src.agents.optimizer import OptimizerAgent
-from src.core.vector_store import search_vector_store, build_vector_store
+from src.core.vector_store import search_vector_store, recalculate_user_embeddings
 from src.core.knowledge_base import get_profile_from_db
+from src.core.mmr import mmr_select, normalize_rows
 from sqlalchemy.orm import Session
 from src.config.constants import KNOWLEDGE_BASE_PATH
 
@@ -42,120 +45,77 @@ def initialize_optimizer_agent():
         logger.error(f"Failed to initialize OptimizerAgent: {e}")
         return None
 
+# Trade-off between relevance and diversity when picking the experiences to show
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", 0.7))
+# Cosine similarity above which two differently spelled skills count as the same skill
+SEMANTIC_SKILL_THRESHOLD = float(os.getenv("SEMANTIC_SKILL_THRESHOLD", 0.8))
+
+# Concurrent LLM rewrites in the analysis pipeline (shared by all requests of this process)
+OPTIMIZER_CONCURRENCY = int(os.getenv("OPTIMIZER_CONCURRENCY", 4))
+OPTIMIZER_TIMEOUT = float(os.getenv("OPTIMIZER_TIMEOUT", 30))  # per rewrite, and per wait for a free worker
+_optimizer_executor = ThreadPoolExecutor(max_workers=OPTIMIZER_CONCURRENCY, thread_name_prefix="optimizer")
+
 # Optimizer first, then Parser (LlamaIndex)
 optimizer_agent = initialize_optimizer_agent()
 parser_agent = initialize_parser_agent()
 
-def _calculate_fuzzy_keyword_score(required_skills: list, user_skills: list) -> float:
+def _calculate_fuzzy_keyword_score(required_skills: list, user_skills: list, user_id: int = None) -> float:
     """
     Calculates a score based on fuzzy matching of required skills against the user's skill list.
+    Required skills with no close spelling match are compared semantically through the
+    shared skill vocabulary (e.g. "PostgreSQL" vs "Postgres").
     """
     if not required_skills or not user_skills:
         return 0.0
 
+    from src.core.skill_vectors import normalize_skill_name, get_skill_matrix, get_offer_skill_matrix
+
     found_count = 0
-    user_skills_lower = {s.lower() for s in user_skills}
+    user_skills_normalized = {normalize_skill_name(s) for s in user_skills}
+    unmatched = []
 
     for req_skill in required_skills:
-        req_skill_lower = req_skill.lower()
-        
-        best_match, score = process.extractOne(req_skill_lower, user_skills_lower)
+        best_match, score = process.extractOne(normalize_skill_name(req_skill), user_skills_normalized)
         
         if score > 85:
             found_count += 1
+        else:
+            unmatched.append(req_skill)
 
-    return (found_count / len(required_skills)) * 100
+    if unmatched:
+        try:
+            similarities = get_offer_skill_matrix(unmatched) @ get_skill_matrix(user_skills, user_id=user_id).T
+            found_count += int((similarities.max(axis=1) >= SEMANTIC_SKILL_THRESHOLD).sum())
+        except Exception as e:
+            logger.warning(f"Semantic skill matching failed: {e}. Using fuzzy matches only.")
 
-def _cosine_similarity(v1, v2):
-    """Calculates the cosine similarity between two vectors."""
-    v1 = np.array(v1)
-    v2 = np.array(v2)
-    norm_v1 = np.linalg.norm(v1)
-    norm_v2 = np.linalg.norm(v2)
-    if norm_v1 == 0 or norm_v2 == 0:
-        return 0.0 # Or raise an error, depending on desired behavior
-    return np.dot(v1, v2) / (norm_v1 * norm_v2)
-
-def _diversify_results(
-    results: list, 
-    threshold: float = 0.95, 
-    top_n: int = 3
-) -> list:
-    """
-    Diversifies a list of search results based on embedding similarity
-    to avoid returning overly similar experiences.
-    """
-    if not results:
-        return []
-
-    diverse_results = []
-    
-    for result in results:
-        if len(diverse_results) >= top_n:
-            break
-
-        is_too_similar = False
-        current_embedding_list = result.get('embedding')
-        if current_embedding_list is None:
-            logger.warning("Result missing embedding, skipping for diversification.")
-            continue
-        current_embedding = np.array(current_embedding_list)
-
-        for diverse_res in diverse_results:
-            diverse_embedding_list = diverse_res.get('embedding')
-            if diverse_embedding_list is None:
-                logger.warning("Diverse result missing embedding, skipping comparison.")
-                continue
-            diverse_embedding = np.array(diverse_embedding_list)
-            
-            similarity = _cosine_similarity(current_embedding, diverse_embedding)
-            
-            if similarity > threshold:
-                is_too_similar = True
-                logger.info(f"Skipping similar experience (similarity: {similarity:.2f})")
-                break
-        
-        if not is_too_similar:
-            diverse_results.append(result)
-            
-    return diverse_results
+    return (found_count / len(required_skills)) * 100
 
-def _rank_skills_by_relevance(user_skills: list, offer_text: str, top_n: int = 15) -> list:
+def _rank_skills_by_relevance(user_skills: list, offer_text: str, top_n: int = 15, user_id: int = None) -> list:
     """
     Ranks the user's skills based on their semantic relevance to the job offer text.
+    Skill vectors come from the user's precomputed skill matrix (see skill_vectors),
+    so only the offer itself needs an embedding here.
     """
     if not user_skills or not offer_text:
         return user_skills[:top_n]
 
     try:
-        from src.core.vector_store import get_embedding, get_embeddings
-        import numpy as np
+        from src.core.vector_store import get_embedding
+        from src.core.skill_vectors import get_skill_matrix, top_k_indices
         
         # Encode offer text (query)
-        offer_embedding_list = get_embedding(f"query: {offer_text}")
-        offer_embedding = np.array(offer_embedding_list, dtype=np.float32)
+        offer_embedding = np.array(get_embedding(f"query: {offer_text}"), dtype=np.float32)
         norm_offer = np.linalg.norm(offer_embedding)
+        if norm_offer == 0:
+            return user_skills[:top_n]
         
-        # Encode skills (passages)
-        skill_texts = [f"passage: {skill}" for skill in user_skills]
-        skill_embeddings_list = get_embeddings(skill_texts)
-        skill_embeddings = np.array(skill_embeddings_list, dtype=np.float32)
-        
-        # Calculate cosine similarity
-        scores = []
-        for i, skill_emb in enumerate(skill_embeddings):
-            norm_skill = np.linalg.norm(skill_emb)
-            if norm_offer == 0 or norm_skill == 0:
-                score = 0
-            else:
-                score = np.dot(offer_embedding, skill_emb) / (norm_offer * norm_skill)
-            scores.append((user_skills[i], score))
-            
-        # Sort by score descending
-        ranked_skills = sorted(scores, key=lambda x: x[1], reverse=True)
+        # Cosine similarity of every skill in one matrix-vector product (rows are normalized)
+        skill_matrix = get_skill_matrix(user_skills, user_id=user_id)
+        scores = skill_matrix @ (offer_embedding / norm_offer)
         
         # Return top N skill names
-        return [s[0] for s in ranked_skills[:top_n]]
+        return [user_skills[i] for i in top_k_indices(scores, top_n)]
         
     except ImportError:
         logger.warning("Could not import vector_store functions. Skipping skill ranking.")
@@ -163,15 +123,88 @@ def _rank_skills_by_relevance(user_skills: list, offer_text: str, top_n: int = 1
     except Exception as e:
         logger.warning(f"Skill ranking failed: {e}. Returning original order.")
         return user_skills[:top_n]
-        
-    except Exception as e:
-        logger.warning(f"Skill ranking failed: {e}. Returning original order.")
-        return user_skills[:top_n]
+
+def _iter_optimized_descriptions(descriptions: list, job_context: str):
+    """
+    Rewrites several experience descriptions concurrently for the same job offer.
+    Yields (index, text) as each rewrite finishes; a rewrite that fails or is still
+    running OPTIMIZER_TIMEOUT after it started yields (index, None) so the caller keeps
+    the original text. A rewrite still waiting for a free worker after OPTIMIZER_TIMEOUT
+    (the pool is busy with calls from other requests) is cancelled the same way.
+    """
+    if not optimizer_agent:
+        for i in range(len(descriptions)):
+            yield i, None
+        return
+
+    started = {}  # index -> time the call left the queue, written by the worker thread
+    def rewrite(i, desc):
+        started[i] = time.monotonic()
+        return optimizer_agent.optimize_description(desc, job_offer=job_context)
+
+    submitted = time.monotonic()
+    futures = {_optimizer_executor.submit(rewrite, i, desc): i for i, desc in enumerate(descriptions)}
+    pending = set(futures)
+
+    def deadline(future):
+        i = futures[future]
+        return (started[i] if i in started else submitted) + OPTIMIZER_TIMEOUT
+
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=max(0.0, min(deadline(f) for f in pending) - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=futures.get):
+                pending.discard(future)
+                i = futures[future]
+                if future.exception() is not None:
+                    logger.warning(f"Failed to optimize description {i + 1}/{len(futures)}: {future.exception()}")
+                    yield i, None
+                else:
+                    yield i, future.result()
+
+            now = time.monotonic()
+            for future in sorted((f for f in pending if deadline(f) <= now), key=futures.get):
+                i = futures[future]
+                if future.cancel():
+                    logger.warning(f"Description rewrite {i + 1}/{len(futures)} not started after {OPTIMIZER_TIMEOUT}s (optimizer pool busy).")
+                elif i in started:
+                    # The call keeps running in its worker thread, but we stop waiting for it
+                    logger.warning(f"Description rewrite {i + 1}/{len(futures)} timed out after {OPTIMIZER_TIMEOUT}s.")
+                else:
+                    continue  # picked up by a worker just now: its own deadline starts
+                pending.discard(future)
+                yield i, None
+    finally:
+        # Also reached when the consumer stops early (e.g. client disconnected from the stream):
+        # rewrites that have not started yet are dropped from the queue
+        for future in pending:
+            future.cancel()
+
+def _optimize_descriptions(descriptions: list, job_context: str) -> list:
+    """Same as _iter_optimized_descriptions, gathered in input order."""
+    results = [None] * len(descriptions)
+    for i, text in _iter_optimized_descriptions(descriptions, job_context):
+        results[i] = text
+    return results
+
+def _bullet_point(match: dict) -> str:
+    """Summary bullet point for display: title and first sentence of the description."""
+    description = match.get('description', '')
+    return f"{match.get('title')}: {description.split('.')[0]}..."
 
 # --- ANALYSIS PIPELINE ---
-def run_analysis_pipeline(raw_text: str, db: Session = None, user_id: int = 1) -> dict:
+def iter_analysis_pipeline(raw_text: str, db: Session = None, user_id: int = 1):
     """
-    Runs the full analysis pipeline on a raw job offer text.
+    Runs the analysis pipeline on a raw job offer text, yielding (event, data) pairs
+    as soon as each stage finishes:
+
+        "skills"  -> {"skills"}                         user's skills ranked for the offer
+        "keyword_score" -> {"keyword_score"}            fuzzy/semantic skill coverage (0-100)
+        "matches" -> {"score", "summary", "raw_matches"} selected experiences (original descriptions)
+        "bullet"  -> {"index", "bulletPoint", "description"} one per experience, in completion order
+        "result"  -> full response, same shape as run_analysis_pipeline()
+
+    Raises ValueError like run_analysis_pipeline().
     """
     try:
         if not parser_agent:
@@ -196,7 +229,11 @@ def run_analysis_pipeline(raw_text: str, db: Session = None, user_id: int = 1) -
         
         # --- NEW: Smart Skill Selection ---
         # Instead of just showing what the offer asks for, we show the user's best matching skills
-        optimized_skills = _rank_skills_by_relevance(profile.skills, raw_text, top_n=12)
+        optimized_skills = _rank_skills_by_relevance(profile.skills, raw_text, top_n=12, user_id=user_id)
+        yield "skills", {"skills": optimized_skills}
+
+        keyword_score = _calculate_fuzzy_keyword_score(skills_from_offer, profile.skills, user_id=user_id)
+        yield "keyword_score", {"keyword_score": round(keyword_score, 1)}
         
         query_str = f"Skills: {', '.join(skills_from_offer)}. Missions: {' '.join(missions)}"
         
@@ -206,23 +243,22 @@ def run_analysis_pipeline(raw_text: str, db: Session = None, user_id: int = 1) -
         if not embedding_file.exists():
             logger.warning(f"Embedding index {index_name} not found. Building a new one for user {user_id}.")
             if profile and profile.experiences:
-                # We need to construct documents with 'content' key as expected by build_vector_store
-                # Reuse recalculate logic or simpler just for experiences here as a fallback?
-                # Ideally we should call recalculate_user_embeddings but circular import risk or need DB session.
-                # Let's do a simple fallback rebuild using the profile data we have.
-                docs = []
-                for exp in profile.experiences:
-                    content = f"Experience: {exp.title} at {exp.company} ({exp.period}). {exp.description}"
-                    docs.append({"content": content, "metadata": exp.__dict__, "type": "experience"})
-                
-                build_vector_store(docs, index_name)
+                # Full rebuild keyed on DB ids, so later profile edits can update it incrementally
+                recalculate_user_embeddings(user_id, db=db)
         
         initial_matches = search_vector_store(query_str, index_name=index_name, top_n=20)
         
         # Filter only for experiences to avoid matching education/skills here
         experience_matches = [m for m in initial_matches if m.get('type') == 'experience']
         
-        matches = _diversify_results(experience_matches, top_n=3)
+        # Diversify with MMR so near-duplicate experiences don't crowd the top 3
+        candidates = [m for m in experience_matches if m.get('embedding') is not None]
+        matches = []
+        if candidates:
+            vectors = normalize_rows([m['embedding'] for m in candidates])
+            relevance = [m.get('match_score', 0.0) for m in candidates]
+            selected, _ = mmr_select(vectors, relevance, top_n=3, lambda_mult=MMR_LAMBDA, redundancy_threshold=0.95)
+            matches = [candidates[i] for i in selected]
 
         # --- FALLBACK: KEYWORD MATCHING IF SEMANTIC SEARCH IS WEAK ---
         if not matches and profile.experiences:
@@ -250,8 +286,6 @@ def run_analysis_pipeline(raw_text: str, db: Session = None, user_id: int = 1) -
 
         bullet_points = []
         final_score = 0
-        
-        keyword_score = _calculate_fuzzy_keyword_score(skills_from_offer, profile.skills)
 
         if matches:
             # Calculate semantic score (use keyword_score if semantic vector scores are missing)
@@ -270,39 +304,33 @@ def run_analysis_pipeline(raw_text: str, db: Session = None, user_id: int = 1) -
                     for key, val in m['metadata'].items():
                         if key not in m:
                             m[key] = val
-
-                # --- NEW: LLM-based optimization for each experience ---
-                try:
-                    original_desc = m.get('description', '')
-                    # We optimize the description specifically for this job offer
-                    # SANITIZED CONTEXT: We pass only skills and missions to avoid hallucinating the company name
-                    sanitized_context = f"Compétences recherchées: {', '.join(skills_from_offer)}. Missions: {' '.join(missions)}"
-                    
-                    if optimizer_agent:
-                        optimized_desc = optimizer_agent.optimize_description(
-                            original_desc, 
-                            job_offer=sanitized_context
-                        )
-                        m['description'] = optimized_desc
-                    else:
-                        optimized_desc = original_desc
-
-                    # Create a summary bullet point for display
-                    bullet_points.append(f"{m.get('title')}: {optimized_desc.split('.')[0]}...")
-                except Exception as e:
-                    logger.warning(f"Failed to optimize description for {m.get('title')}: {e}")
-                    # Fallback to original excerpt logic
-                    description = m.get('description', '')
-                    bullet_points.append(f"{m.get('title')}: {description.split('.')[0]}...")
         else:
             final_score = max(0, min(100, int(keyword_score)))
             bullet_points = ["Nous n'avons pas trouvé d'expérience correspondant exactement à cette offre dans votre historique, mais vos compétences semblent alignées. C'est peut-être l'occasion de mettre en avant vos projets personnels ou votre capacité d'apprentissage !"]
 
         summary_text = f"Profile match: {final_score}% based on a hybrid analysis of semantic experience relevance and direct skill matching."
+        yield "matches", {
+            "score": final_score,
+            "summary": summary_text,
+            "raw_matches": [dict(m) for m in matches]
+        }
+
+        if matches:
+            # --- NEW: LLM-based optimization for each experience (concurrent) ---
+            # SANITIZED CONTEXT: We pass only skills and missions to avoid hallucinating the company name
+            sanitized_context = f"Compétences recherchées: {', '.join(skills_from_offer)}. Missions: {' '.join(missions)}"
+            bullet_by_index = {}
+            for i, optimized_desc in _iter_optimized_descriptions([m.get('description', '') for m in matches], sanitized_context):
+                if optimized_desc is not None:
+                    matches[i]['description'] = optimized_desc
+                # Original excerpt if the rewrite failed
+                bullet_by_index[i] = _bullet_point(matches[i])
+                yield "bullet", {"index": i, "bulletPoint": bullet_by_index[i], "description": matches[i].get('description', '')}
+            bullet_points = [bullet_by_index[i] for i in range(len(matches))]
         
         logger.info(f"Analysis complete. Final score: {final_score}")
 
-        return {
+        yield "result", {
             "score": final_score,
             "summary": summary_text,
             "skills": optimized_skills, # Returning user's relevant skills instead of offer's required skills
@@ -316,3 +344,12 @@ def run_analysis_pipeline(raw_text: str, db: Session = None, user_id: int = 1) -
         logger.error(f"An unexpected error occurred in the analysis pipeline: {e}", exc_info=True)
         raise ValueError("An unexpected error occurred during analysis.")
 
+def run_analysis_pipeline(raw_text: str, db: Session = None, user_id: int = 1) -> dict:
+    """
+    Runs the full analysis pipeline on a raw job offer text.
+    """
+    result = None
+    for event, data in iter_analysis_pipeline(raw_text, db=db, user_id=user_id):
+        if event == "result":
+            result = data
+    return result
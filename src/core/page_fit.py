@@ -0,0 +1,127 @@
+# src/core/page_fit.py
+import json
+import math
+import threading
+import logging
+from typing import Any, Dict
+
+from src.config.constants import CACHE_DIR
+from src.core.utils import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Starting layout model per template (letterpaper, 7.5in text width, \small bullets),
+# then adjusted from real compiles by record_observation().
+#   chars_per_line: characters of a bullet / skills line before wrapping
+#   lines_per_page: text lines that fit on one page
+#   fixed_lines:    header, section titles and spacing that do not depend on the content
+DEFAULT_LAYOUTS = {
+    "modern": {"chars_per_line": 100, "lines_per_page": 60.0, "fixed_lines": 16},
+    "photo_header": {"chars_per_line": 100, "lines_per_page": 60.0, "fixed_lines": 18},
+}
+SUBHEADING_LINES = 2      # \resumeSubheading: two tabular rows
+MIN_BULLETS_PER_EXPERIENCE = 1
+
+CALIBRATION_PATH = CACHE_DIR / "page_fit.json"
+_calibration_lock = threading.Lock()
+
+def _load_calibration() -> Dict[str, Dict]:
+    try:
+        with open(CALIBRATION_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def get_layout(template_name: str) -> Dict[str, float]:
+    layout = dict(DEFAULT_LAYOUTS.get(template_name, DEFAULT_LAYOUTS["modern"]))
+    layout.update(_load_calibration().get(template_name, {}))
+    return layout
+
+def _wrapped_lines(text: str, chars_per_line: int) -> int:
+    return max(1, math.ceil(len(text or "") / chars_per_line))
+
+def estimate_lines(content: Dict[str, Any], user_profile: Dict[str, Any], template_name: str) -> float:
+    """
+    Predicted height of the rendered CV, in text lines, from the structured content
+    (see generator.parse_cv_content) and the profile sections rendered as-is.
+    """
+    layout = get_layout(template_name)
+    cpl = layout["chars_per_line"]
+    lines = layout["fixed_lines"]
+
+    if template_name != "photo_header":  # only the modern template has a summary section
+        lines += _wrapped_lines(content.get("summary") or user_profile.get("summary"), cpl)
+    for exp in content.get("experiences", []):
+        lines += SUBHEADING_LINES + sum(_wrapped_lines(b, cpl) for b in exp.get("bullets", []))
+    lines += SUBHEADING_LINES * len(user_profile.get("education") or [])
+    for key, fallback in (("hard_skills", "skills"), ("soft_skills", "soft_skills")):
+        skills = content.get(key) or user_profile.get(fallback) or []
+        lines += _wrapped_lines(", ".join(map(str, skills)), cpl)
+    languages = [
+        f"{l.get('name')} ({l.get('level')})" if isinstance(l, dict) else str(l)
+        for l in user_profile.get("languages") or []
+    ]
+    lines += _wrapped_lines(", ".join(languages), cpl)
+    return float(lines)
+
+def fits_on_page(content, user_profile, template_name: str) -> bool:
+    return estimate_lines(content, user_profile, template_name) <= get_layout(template_name)["lines_per_page"]
+
+def bullet_char_budget(user_profile: Dict[str, Any], experiences: list, template_name: str) -> int:
+    """
+    Characters available per experience for its bullets, once the fixed parts
+    (header, education, skills, languages) are placed. Fed to the prompt as a target.
+    """
+    layout = get_layout(template_name)
+    skeleton = {"experiences": [{"bullets": []} for _ in experiences]}
+    free_lines = layout["lines_per_page"] - estimate_lines(skeleton, user_profile, template_name)
+    per_experience = free_lines / max(1, len(experiences))
+    return max(150, int(per_experience * layout["chars_per_line"] * 0.9))
+
+def fit_to_page(content: Dict[str, Any], user_profile: Dict[str, Any], template_name: str) -> Dict[str, Any]:
+    """
+    Deterministically shrinks the content until it is predicted to fit on one page:
+    first drops the longest bullet of the experience with the most bullets (keeping at
+    least one per experience), then shortens the remaining bullets to their first sentence.
+    """
+    capacity = get_layout(template_name)["lines_per_page"]
+    content = json.loads(json.dumps(content))  # never mutate the caller's content
+    experiences = content.get("experiences", [])
+
+    while estimate_lines(content, user_profile, template_name) > capacity:
+        candidates = [e for e in experiences if len(e.get("bullets", [])) > MIN_BULLETS_PER_EXPERIENCE]
+        if not candidates:
+            break
+        exp = max(candidates, key=lambda e: len(e["bullets"]))
+        exp["bullets"].remove(max(exp["bullets"], key=len))
+
+    if estimate_lines(content, user_profile, template_name) > capacity:
+        for exp in experiences:
+            exp["bullets"] = [b.split(". ")[0].rstrip(".") + "." for b in exp.get("bullets", [])]
+
+    estimate = estimate_lines(content, user_profile, template_name)
+    if estimate > capacity:
+        logger.warning(f"Content still estimated at {estimate:.0f}/{capacity:.0f} lines after trimming.")
+    return content
+
+def record_observation(template_name: str, estimated: float, page_count: int):
+    """
+    Calibrates the template's page capacity from a real compile: an estimate that
+    overflowed lowers it, a longer estimate that still fitted raises it.
+    """
+    if not page_count or page_count < 1:
+        return
+    with _calibration_lock:
+        calibration = _load_calibration()
+        layout = get_layout(template_name)
+        capacity = layout["lines_per_page"]
+        if page_count > 1 and estimated <= capacity:
+            capacity = estimated * 0.97
+        elif page_count == 1 and estimated > capacity:
+            capacity = estimated
+        else:
+            return
+        calibration.setdefault(template_name, {})["lines_per_page"] = round(capacity, 2)
+        # The lock only covers this process: other workers may write concurrently
+        atomic_write_json(str(CALIBRATION_PATH), calibration)
+        logger.info(f"Page-fit calibration for {template_name}: {capacity:.1f} lines per page.")
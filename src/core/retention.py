@@ -0,0 +1,159 @@
+# src/core/retention.py
+import time
+import shutil
+import threading
+import logging
+from pathlib import Path
+from datetime import timezone
+from typing import Any, Dict, List
+
+from src.core.utils import load_yaml
+from src.core.database import SessionLocal
+from src.config.constants import GENERATED_CVS_DIR
+from src.models.usage import UsageLog
+
+logger = logging.getLogger(__name__)
+
+# LaTeX intermediates, useless once the PDF is produced
+INTERMEDIATE_SUFFIXES = {".aux", ".log", ".out", ".fls", ".fdb_latexmk", ".synctex.gz"}
+# Folders younger than this are never touched: a generation may still be writing them
+GRACE_PERIOD_S = 15 * 60
+
+_lock = threading.Lock()
+_stats = {"sweeps": 0, "last_sweep_at": None, "last_sweep_s": None, "removed_dirs": 0, "freed_bytes": 0, "expired_jobs": 0}
+
+def _policy() -> Dict[str, Any]:
+    settings = load_yaml("src/config/settings.yaml")
+    defaults = {"max_age_days": 14, "max_size_mb": 1000, "keep_latest_per_user": 10, "sweep_interval_minutes": 30}
+    return {**defaults, **(settings.get("generated_cv_retention") or {})}
+
+def _dir_size(folder: Path) -> int:
+    return sum(f.stat().st_size for f in folder.rglob("*") if f.is_file())
+
+def _job_dir(log: UsageLog) -> Path:
+    return Path(log.model).resolve().parent
+
+def _created_at(log: UsageLog) -> float:
+    """Job creation time as a POSIX timestamp (SQLite returns naive UTC datetimes)."""
+    ts = log.timestamp
+    return (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)).timestamp()
+
+def sweep(root: Path = None, now: float = None) -> Dict[str, int]:
+    """
+    One garbage-collection pass over the generated CV folders:
+    1. drops LaTeX intermediates (.aux, .log...),
+    2. removes folders older than max_age_days,
+    3. keeps only the keep_latest_per_user most recent CVs of each user,
+    4. removes the oldest folders until the total is under max_size_mb.
+    A folder's age is the creation time of its job (UsageLog.timestamp); folders no
+    job points to fall back to the mtime of their newest file.
+    Jobs whose folder is removed are marked 'expired' (download answers 410).
+    """
+    root = (root or GENERATED_CVS_DIR).resolve()
+    now = now or time.time()
+    policy = _policy()
+    started = time.perf_counter()
+    if not root.exists():
+        return {"removed_dirs": 0, "freed_bytes": 0, "expired_jobs": 0}
+
+    db = SessionLocal()
+    try:
+        logs = db.query(UsageLog).filter(
+            UsageLog.action == "cv_generation", UsageLog.status == "success", UsageLog.model.isnot(None)
+        ).all()
+        logs_by_dir: Dict[Path, List[UsageLog]] = {}
+        for log in logs:
+            logs_by_dir.setdefault(_job_dir(log), []).append(log)
+
+        folders = {}
+        for folder in root.iterdir():
+            if not folder.is_dir():
+                continue
+            try:
+                if folder in logs_by_dir and all(log.timestamp for log in logs_by_dir[folder]):
+                    created = max(_created_at(log) for log in logs_by_dir[folder])
+                else:
+                    # Orphan folder: age of the newest file (removing intermediates bumps the folder's own mtime)
+                    created = max((f.stat().st_mtime for f in folder.iterdir() if f.is_file()), default=folder.stat().st_mtime)
+            except OSError:
+                continue
+            if now - created < GRACE_PERIOD_S:
+                continue
+            # 1. Intermediates
+            for f in folder.iterdir():
+                if f.is_file() and (f.suffix in INTERMEDIATE_SUFFIXES or "".join(f.suffixes[-2:]) in INTERMEDIATE_SUFFIXES):
+                    f.unlink(missing_ok=True)
+            folders[folder] = {"created": created, "size": _dir_size(folder)}
+
+        doomed = set()
+        # 2. Age
+        for folder, info in folders.items():
+            if now - info["created"] > policy["max_age_days"] * 86400:
+                doomed.add(folder)
+        # 3. Latest N per user
+        per_user: Dict[int, List[tuple]] = {}
+        for folder, folder_logs in logs_by_dir.items():
+            if folder in folders:
+                for log in folder_logs:
+                    per_user.setdefault(log.user_id, []).append((folders[folder]["created"], folder))
+        for entries in per_user.values():
+            entries.sort(reverse=True)
+            doomed.update(folder for _, folder in entries[policy["keep_latest_per_user"]:])
+        # 4. Total size, oldest first
+        total = sum(info["size"] for folder, info in folders.items() if folder not in doomed)
+        for folder, info in sorted(folders.items(), key=lambda item: item[1]["created"]):
+            if total <= policy["max_size_mb"] * 1024 * 1024:
+                break
+            if folder not in doomed:
+                doomed.add(folder)
+                total -= info["size"]
+
+        freed, expired = 0, 0
+        for folder in doomed:
+            shutil.rmtree(folder, ignore_errors=True)
+            freed += folders[folder]["size"]
+            for log in logs_by_dir.get(folder, []):
+                log.status = "expired"
+                expired += 1
+        db.commit()
+    finally:
+        db.close()
+
+    result = {"removed_dirs": len(doomed), "freed_bytes": freed, "expired_jobs": expired}
+    with _lock:
+        _stats["sweeps"] += 1
+        _stats["last_sweep_at"] = now
+        _stats["last_sweep_s"] = round(time.perf_counter() - started, 3)
+        for key, value in result.items():
+            _stats[key] += value
+    if doomed:
+        logger.info(f"Retention sweep: removed {len(doomed)} CV folders ({freed / 1024 / 1024:.1f} MB), {expired} jobs expired.")
+    return result
+
+class RetentionSweeper:
+    """Runs sweep() every sweep_interval_minutes in a daemon thread."""
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                sweep()
+            except Exception as e:
+                logger.error(f"Retention sweep failed: {e}")
+            self._stop.wait(_policy()["sweep_interval_minutes"] * 60)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="retention-sweeper")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+def get_retention_stats() -> Dict[str, Any]:
+    with _lock:
+        stats = dict(_stats)
+    stats.update(_policy())
+    return stats
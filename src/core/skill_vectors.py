@@ -0,0 +1,210 @@
+# src/core/skill_vectors.py
+import os
+import re
+import json
+import sqlite3
+import threading
+import logging
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.config.constants import EMBEDDINGS_DIR
+from src.core.utils import atomic_write_json
+from src.core.vector_store import get_embeddings
+from src.core.mmr import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+def normalize_skill_name(name: str) -> str:
+    """Canonical vocabulary key: case-folded, whitespace collapsed ("  Python " -> "python")."""
+    return re.sub(r"\s+", " ", name or "").strip().casefold()
+
+class SkillVocabulary:
+    """
+    Global skill store shared by all users: one normalized embedding per normalized skill name.
+
+    Rows are persisted in SQLite (shared by every worker process) and mirrored in memory
+    as a single float32 matrix. Rows added by other processes are picked up on the next
+    lookup miss. Embedding calls and storage grow with the vocabulary, not users x skills.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._row_of_id: Dict[int, int] = {}
+        self._id_of_name: Dict[str, int] = {}
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._max_id = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS skills ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL, vector BLOB NOT NULL)"
+            )
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _sync(self, conn: sqlite3.Connection):
+        """Loads rows added since the last sync (by this or another process) into memory."""
+        rows = conn.execute(
+            "SELECT id, name, vector FROM skills WHERE id > ? ORDER BY id", (self._max_id,)
+        ).fetchall()
+        if not rows:
+            return
+        new_vectors = np.stack([np.frombuffer(vector, dtype=np.float32) for _, _, vector in rows])
+        start = self._matrix.shape[0]
+        self._matrix = new_vectors if start == 0 else np.vstack([self._matrix, new_vectors])
+        for offset, (row_id, name, _) in enumerate(rows):
+            self._row_of_id[row_id] = start + offset
+            self._id_of_name[name] = row_id
+        self._max_id = rows[-1][0]
+
+    def __len__(self) -> int:
+        return len(self._row_of_id)
+
+    def ensure(self, names: List[str]) -> List[Optional[int]]:
+        """
+        Returns the vocabulary id of each skill, embedding only names never seen before.
+        Skills whose embedding failed get None and are not stored.
+        """
+        keys = [normalize_skill_name(n) for n in names]
+        with self._lock:
+            conn = self._connect()
+            if any(k not in self._id_of_name for k in keys):
+                self._sync(conn)
+            missing = [k for k in dict.fromkeys(keys) if k and k not in self._id_of_name]
+
+        if missing:
+            # Same "passage:" prefix the skill ranking has always used
+            vectors = normalize_rows(get_embeddings([f"passage: {k}" for k in missing]))
+            valid = [(k, v) for k, v in zip(missing, vectors) if v.any()]
+            if len(valid) < len(missing):
+                logger.warning(f"Embedding API failed for {len(missing) - len(valid)} skill(s); not stored.")
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR IGNORE INTO skills (name, vector) VALUES (?, ?)",
+                    [(k, sqlite3.Binary(v.astype(np.float32).tobytes())) for k, v in valid]
+                )
+                conn.commit()
+                self._sync(conn)
+            logger.info(f"Skill vocabulary: {len(valid)} new skill(s), {len(self)} total.")
+
+        return [self._id_of_name.get(k) for k in keys]
+
+    def lookup(self, names: List[str]) -> List[Optional[int]]:
+        """Vocabulary id of each skill already known, None for the others (nothing is embedded)."""
+        keys = [normalize_skill_name(n) for n in names]
+        with self._lock:
+            if any(k not in self._id_of_name for k in keys):
+                self._sync(self._connect())
+            return [self._id_of_name.get(k) for k in keys]
+
+    def vectors(self, ids: List[Optional[int]]) -> np.ndarray:
+        """(len(ids), d) matrix of vocabulary rows; unknown ids (or None) give zero rows."""
+        with self._lock:
+            if any(i is not None and i not in self._row_of_id for i in ids):
+                self._sync(self._connect())
+            if self._matrix.shape[0] == 0:
+                return np.zeros((len(ids), 0), dtype=np.float32)
+            out = np.zeros((len(ids), self._matrix.shape[1]), dtype=np.float32)
+            for pos, row_id in enumerate(ids):
+                row = self._row_of_id.get(row_id)
+                if row is not None:
+                    out[pos] = self._matrix[row]
+            return out
+
+_vocabulary = SkillVocabulary(os.path.join(EMBEDDINGS_DIR, "skill_vocabulary.sqlite"))
+
+# --- Per-user skill sets ---
+# user_{id}_skills.json maps each of the user's skill names to its vocabulary id.
+
+def _skill_refs_path(user_id: int) -> str:
+    return os.path.join(EMBEDDINGS_DIR, f"user_{user_id}_skills.json")
+
+def _load_skill_refs(user_id: int) -> Dict[str, int]:
+    path = _skill_refs_path(user_id)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            refs = json.load(f)
+        return refs if isinstance(refs, dict) else {}
+    except Exception as e:
+        logger.warning(f"Could not load skill references for User {user_id}: {e}")
+        return {}
+
+def _save_skill_refs(user_id: int, refs: Dict[str, int]):
+    atomic_write_json(_skill_refs_path(user_id), refs, ensure_ascii=False)
+
+def update_user_skill_vectors(user_id: int, skills: List[str]):
+    """
+    Resolves the user's skills against the global vocabulary (embedding only skills
+    nobody has had before) and stores their references. Called when skills are
+    created, updated or imported.
+    """
+    names = list(dict.fromkeys(skills))
+    # Per-user matrices from before the shared vocabulary are no longer used
+    legacy_matrix = os.path.join(EMBEDDINGS_DIR, f"user_{user_id}_skills.npy")
+    if os.path.exists(legacy_matrix):
+        os.remove(legacy_matrix)
+
+    if not names:
+        if os.path.exists(_skill_refs_path(user_id)):
+            os.remove(_skill_refs_path(user_id))
+        return
+
+    ids = _vocabulary.ensure(names)
+    _save_skill_refs(user_id, {name: i for name, i in zip(names, ids) if i is not None})
+    logger.info(f"Stored {len(names)} skill references for User {user_id}.")
+
+def get_skill_matrix(skills: List[str], user_id: int = None) -> np.ndarray:
+    """
+    Returns a (len(skills), d) matrix of normalized skill vectors, rows aligned with `skills`.
+    Uses the user's stored references when available; other skills are resolved through
+    the vocabulary (and embedded only if no user ever had them). Read-only for the user's
+    references: they are only written by update_user_skill_vectors.
+    """
+    refs = _load_skill_refs(user_id) if user_id is not None else {}
+    ids = [refs.get(s) for s in skills]
+
+    missing = [s for s, i in zip(skills, ids) if i is None]
+    if missing:
+        resolved = dict(zip(missing, _vocabulary.ensure(missing)))
+        ids = [i if i is not None else resolved.get(s) for s, i in zip(skills, ids)]
+
+    return _vocabulary.vectors(ids)
+
+def get_offer_skill_matrix(skills: List[str]) -> np.ndarray:
+    """
+    Same as get_skill_matrix for skills read from a job offer: known skills reuse their
+    vocabulary row, the others are embedded for this call only and never added to the
+    shared vocabulary (offer text is untrusted and would grow it without bound).
+    """
+    ids = _vocabulary.lookup(skills)
+    matrix = _vocabulary.vectors(ids)
+    unknown = [pos for pos, i in enumerate(ids) if i is None and normalize_skill_name(skills[pos])]
+    if unknown:
+        vectors = normalize_rows(get_embeddings([f"passage: {normalize_skill_name(skills[pos])}" for pos in unknown]))
+        if matrix.shape[1] == 0:
+            matrix = np.zeros((len(skills), vectors.shape[1]), dtype=np.float32)
+        matrix[unknown] = vectors
+    return matrix
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (argpartition + sort of the top k only)."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
@@ -1,4 +1,4 @@
-import os, json, yaml, re
+import os, json, yaml, re, tempfile
 
 def ensure_dir(path: str):
     if not os.path.exists(path):
@@ -16,6 +16,23 @@ def load_yaml(path: str):
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
+def atomic_write_json(path: str, data, **dump_kwargs):
+    """
+    Writes JSON through a uniquely named temp file in the same directory, then renames it:
+    concurrent writers (several workers) never interleave, readers never see a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def sanitize_input(text: str) -> str:
     """
     Prevents Prompt Injections and malicious text.
@@ -2,11 +2,19 @@ import faiss
 import numpy as np
 import os
 import json
-from typing import List, Dict, Any
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from openai import OpenAI
-from src.config.constants import EMBEDDINGS_DIR
+from src.config.constants import EMBEDDINGS_DIR, CACHE_DIR
+from src.core.cache import SQLiteCache
 from sqlalchemy.orm import Session
-from src.core.knowledge_base import get_profile_from_db
+from src.core.knowledge_base import experience_from_model, education_from_model, is_soft_skill
+from src.models.user import User as UserModel
+from src.models.profile import Experience as ExperienceModel, Education as EducationModel
 import logging
 
 # Configure logging
@@ -14,33 +22,211 @@ logger = logging.getLogger(__name__)
 
 # Use OpenAI's efficient embedding model
 MODEL_NAME = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+
+# Persistent, content-addressed cache: (model, normalized text) -> float32 vector
+_embedding_cache = SQLiteCache(
+    CACHE_DIR / "embeddings.sqlite",
+    table="embeddings",
+    max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 100000))
+)
+
+def _embedding_cache_key(text: str) -> str:
+    """Cache key: model name + hash of the whitespace-normalized text."""
+    normalized = " ".join(text.split())
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return f"{MODEL_NAME}:{digest}"
+
+def get_embedding_cache_stats() -> Dict[str, float]:
+    return _embedding_cache.stats()
 
 def get_embedding(text: str) -> List[float]:
     """
     Generates an embedding for a given text using OpenAI API.
     """
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    text = text.replace("\n", " ")  # Normalize newlines
-    try:
-        return client.embeddings.create(input=[text], model=MODEL_NAME).data[0].embedding
-    except Exception as e:
-        logger.error(f"Error generating embedding with OpenAI: {e}")
-        # Return a zero vector of appropriate size (1536 for text-embedding-3-small) as fallback
-        return [0.0] * 1536
+    return get_embeddings([text])[0]
 
 def get_embeddings(texts: List[str]) -> List[List[float]]:
     """
     Generates embeddings for a list of texts using OpenAI API.
+    Only texts missing from the local embedding cache are sent to the API.
     """
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
     # Normalize newlines
     texts = [t.replace("\n", " ") for t in texts]
+    if not texts:
+        return []
+
+    keys = [_embedding_cache_key(t) for t in texts]
+    cached = _embedding_cache.get_many(keys)
+
+    # Deduplicate misses so identical texts are only embedded once
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in cached and key not in missing:
+            missing[key] = text
+
+    computed = {}
+    if missing:
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        try:
+            response = client.embeddings.create(input=list(missing.values()), model=MODEL_NAME)
+            for key, data in zip(missing.keys(), response.data):
+                computed[key] = data.embedding
+            _embedding_cache.set_many({
+                key: np.asarray(vec, dtype=np.float32).tobytes() for key, vec in computed.items()
+            })
+        except Exception as e:
+            logger.error(f"Error generating embeddings with OpenAI: {e}")
+            # Fallback vectors are returned but never cached
+            computed = {key: [0.0] * EMBEDDING_DIM for key in missing}
+
+    logger.debug(f"Embeddings: {len(texts) - len(missing)} cached, {len(missing)} requested from API.")
+
+    results = []
+    for key in keys:
+        if key in computed:
+            results.append(computed[key])
+        else:
+            results.append(np.frombuffer(cached[key], dtype=np.float32).tolist())
+    return results
+
+# --- Document ids ---
+# Vectors are stored in a FAISS IndexIDMap2 keyed on the DB primary key of the
+# profile row, tagged with its document type so ids never collide across tables.
+_DOC_ID_SHIFT = 40
+_DOC_KINDS = {"experience": 1, "education": 2, "skills_hard": 3, "skills_soft": 4, "summary": 5}
+
+def make_doc_id(kind: str, pk: int = 0) -> int:
+    return (_DOC_KINDS[kind] << _DOC_ID_SHIFT) | int(pk)
+
+def _index_paths(index_name: str) -> Tuple[str, str]:
+    return (
+        os.path.join(EMBEDDINGS_DIR, f"{index_name}.faiss"),
+        os.path.join(EMBEDDINGS_DIR, f"{index_name}.json"),
+    )
+
+def _embed_documents(documents: List[Dict[str, Any]]) -> np.ndarray:
+    texts = [doc.get('content', '') for doc in documents]
+    embeddings = np.array(get_embeddings(texts), dtype=np.float32)
+    # Normalize for Cosine Similarity (OpenAI embeddings are usually normalized, but good practice)
+    faiss.normalize_L2(embeddings)
+    return embeddings
+
+def _write_temp(directory: str, prefix: str, data: bytes) -> str:
+    """Writes `data` to a new, uniquely named temp file in `directory` (same filesystem as the target)."""
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=prefix, suffix=".tmp")
     try:
-        response = client.embeddings.create(input=texts, model=MODEL_NAME)
-        return [data.embedding for data in response.data]
-    except Exception as e:
-        logger.error(f"Error generating embeddings with OpenAI: {e}")
-        return [[0.0] * 1536 for _ in texts]
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+def _save_index(index, documents: List[Dict[str, Any]], index_name: str):
+    """
+    Writes index + metadata through temp files, each swapped in with an atomic rename.
+    The two renames are not atomic as a pair, so the .json sidecar records the SHA-256
+    of the .faiss file it belongs to and _load_index rejects mismatched pairs.
+    Vectors live only in the .faiss file; the .json sidecar holds slim, compact metadata.
+    """
+    os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
+    index_path, data_path = _index_paths(index_name)
+
+    index_bytes = faiss.serialize_index(index).tobytes()
+    sidecar = {"index_sha256": hashlib.sha256(index_bytes).hexdigest(), "documents": documents}
+    tmp_paths = []
+    try:
+        tmp_paths.append(_write_temp(EMBEDDINGS_DIR, f".{index_name}.faiss.", index_bytes))
+        tmp_paths.append(_write_temp(EMBEDDINGS_DIR, f".{index_name}.json.", json.dumps(sidecar, ensure_ascii=False, separators=(',', ':')).encode('utf-8')))
+        os.replace(tmp_paths[0], index_path)
+        os.replace(tmp_paths[1], data_path)
+    finally:
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    _index_cache.bump_version(index_name)
+
+def _load_index(index_name: str, attempts: int = 3):
+    """
+    Returns (index, documents), or (None, None) if the index is missing or its two files
+    do not belong together (a writer between its two renames, or one that crashed there).
+    """
+    index_path, data_path = _index_paths(index_name)
+    for attempt in range(attempts):
+        if not os.path.exists(index_path) or not os.path.exists(data_path):
+            return None, None
+        with open(data_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+        with open(index_path, 'rb') as f:
+            index_bytes = f.read()
+        # Sidecars written before the checksum are a plain list of documents
+        if isinstance(sidecar, list) or sidecar.get("index_sha256") == hashlib.sha256(index_bytes).hexdigest():
+            index = faiss.deserialize_index(np.frombuffer(index_bytes, dtype=np.uint8))
+            return index, sidecar if isinstance(sidecar, list) else sidecar["documents"]
+        time.sleep(0.05 * (attempt + 1))
+    logger.warning(f"Index {index_name}: .faiss and .json files do not match, ignoring them until the next rebuild.")
+    return None, None
+
+class _LoadedIndexCache:
+    """
+    Bounded, thread-safe LRU of loaded (index, documents_by_id) pairs for search.
+    An entry is reused only while both files keep the same mtime and the in-process
+    version counter (bumped on every write) is unchanged. Cached objects are
+    read-only: writers always reload from disk.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def bump_version(self, index_name: str):
+        with self._lock:
+            self._versions[index_name] = self._versions.get(index_name, 0) + 1
+            self._entries.pop(index_name, None)
+
+    def get(self, index_name: str):
+        index_path, data_path = _index_paths(index_name)
+        try:
+            stamp = (os.stat(index_path).st_mtime_ns, os.stat(data_path).st_mtime_ns)
+        except FileNotFoundError:
+            return None, None
+
+        with self._lock:
+            key = (stamp, self._versions.get(index_name, 0))
+            entry = self._entries.get(index_name)
+            if entry and entry[0] == key:
+                self._entries.move_to_end(index_name)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+
+        index, documents = _load_index(index_name)
+        if index is None:
+            return None, None
+        # Older indexes (plain IndexFlatIP) have no doc_id: ids are list positions
+        documents_by_id = {doc.get('doc_id', i): doc for i, doc in enumerate(documents)}
+
+        with self._lock:
+            # Only store if no write happened while we were loading
+            if key[1] == self._versions.get(index_name, 0):
+                self._entries[index_name] = (key, index, documents_by_id)
+                self._entries.move_to_end(index_name)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return index, documents_by_id
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+_index_cache = _LoadedIndexCache(max_entries=int(os.getenv("VECTOR_INDEX_CACHE_SIZE", 64)))
+
+def get_index_cache_stats() -> Dict[str, int]:
+    return _index_cache.stats()
 
 def build_vector_store(documents: List[Dict[str, Any]], index_name: str = "kb_index"):
     """
@@ -48,6 +234,8 @@ def build_vector_store(documents: List[Dict[str, Any]], index_name: str = "kb_in
     
     Args:
         documents: List of dicts. Each dict MUST have a 'content' key (text to embed).
+                   An optional 'doc_id' key (see make_doc_id) enables incremental updates;
+                   documents without it get their position as id.
                    Other keys are stored as metadata.
         index_name: Name of the index file (e.g. 'user_123').
     """
@@ -55,110 +243,162 @@ def build_vector_store(documents: List[Dict[str, Any]], index_name: str = "kb_in
         logger.warning(f"No documents provided to build vector store for {index_name}.")
         return
 
-    os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
-    
-    index_path = os.path.join(EMBEDDINGS_DIR, f"{index_name}.faiss")
-    data_path = os.path.join(EMBEDDINGS_DIR, f"{index_name}.json")
+    for i, doc in enumerate(documents):
+        doc.setdefault('doc_id', i)
 
-    # Extract text content
-    texts = [doc.get('content', '') for doc in documents]
-    
     # Generate embeddings via API
-    logger.info(f"Generating OpenAI embeddings for {len(texts)} documents ({index_name})...")
-    embeddings_list = get_embeddings(texts)
-    embeddings = np.array(embeddings_list, dtype=np.float32)
-    
-    # Normalize for Cosine Similarity (OpenAI embeddings are usually normalized, but good practice)
-    faiss.normalize_L2(embeddings)
+    logger.info(f"Generating OpenAI embeddings for {len(documents)} documents ({index_name})...")
+    embeddings = _embed_documents(documents)
 
-    # Build Index
-    index = faiss.IndexFlatIP(embeddings.shape[1])
-    index.add(embeddings)
+    # Build Index (IndexIDMap2 so vectors can be read back by id with reconstruct)
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(embeddings.shape[1]))
+    index.add_with_ids(embeddings, np.array([doc['doc_id'] for doc in documents], dtype=np.int64))
     
-    # Save Index
-    faiss.write_index(index, index_path)
-    
-    # Save Metadata with embeddings
-    for i, doc in enumerate(documents):
-        doc['embedding'] = embeddings_list[i] # Add embedding to each document
-    with open(data_path, 'w', encoding='utf-8') as f:
-        json.dump(documents, f, ensure_ascii=False, indent=4)
+    # Save Metadata (without embeddings)
+    _save_index(index, documents, index_name)
         
-    logger.info(f"Index built and saved to {index_path}")
+    logger.info(f"Index built and saved to {_index_paths(index_name)[0]}")
+
+def upsert_documents(index_name: str, documents: List[Dict[str, Any]], remove_ids: Iterable[int] = ()) -> bool:
+    """
+    Adds or replaces documents (matched on 'doc_id') and removes `remove_ids`
+    in an existing IndexIDMap2, embedding only the given documents.
+    Returns False if the index is missing or predates IndexIDMap2; the caller
+    should then do a full rebuild.
+    """
+    try:
+        index, stored = _load_index(index_name)
+    except Exception as e:
+        logger.error(f"Error loading index/data for {index_name}: {e}")
+        return False
+    if index is None or not isinstance(index, faiss.IndexIDMap2):
+        return False
+
+    drop_ids = {int(i) for i in remove_ids} | {int(doc['doc_id']) for doc in documents}
+    if drop_ids:
+        index.remove_ids(np.array(sorted(drop_ids), dtype=np.int64))
+    stored = [doc for doc in stored if doc.get('doc_id') not in drop_ids]
+
+    if documents:
+        embeddings = _embed_documents(documents)
+        if embeddings.shape[1] != index.d:
+            logger.warning(f"Dimension mismatch on {index_name} (index {index.d}, new {embeddings.shape[1]}).")
+            return False
+        index.add_with_ids(embeddings, np.array([doc['doc_id'] for doc in documents], dtype=np.int64))
+        stored.extend(documents)
+
+    _save_index(index, stored, index_name)
+    logger.info(f"Index {index_name} updated incrementally ({len(documents)} upserted, {len(drop_ids) - len(documents)} removed).")
+    return True
+
+# --- Profile documents ---
+
+def _experience_document(exp: ExperienceModel) -> Dict[str, Any]:
+    exp_data = experience_from_model(exp)
+    content = f"Experience: {exp_data.title} at {exp_data.company} ({exp_data.period}). {exp_data.description}"
+    return {
+        "doc_id": make_doc_id("experience", exp.id),
+        "type": "experience",
+        "content": content,
+        "title": exp_data.title,
+        "company": exp_data.company,
+        "period": exp_data.period,
+        "description": exp_data.description,
+        "metadata": {
+            "title": exp_data.title,
+            "company": exp_data.company,
+            "period": exp_data.period
+        }
+    }
+
+def _education_document(edu: EducationModel) -> Dict[str, Any]:
+    edu_data = education_from_model(edu)
+    content = f"Education: {edu_data.degree} at {edu_data.institution} ({edu_data.period})."
+    return {
+        "doc_id": make_doc_id("education", edu.id),
+        "type": "education",
+        "content": content,
+        "metadata": {
+            "institution": edu_data.institution,
+            "degree": edu_data.degree
+        }
+    }
+
+def _skill_documents(user: UserModel) -> List[Dict[str, Any]]:
+    """Skills are grouped into one hard-skills and one soft-skills document."""
+    hard_skills = [s.name for s in user.skills if not is_soft_skill(s)]
+    soft_skills = [s.name for s in user.skills if is_soft_skill(s)]
+
+    documents = []
+    if hard_skills:
+        documents.append({
+            "doc_id": make_doc_id("skills_hard"),
+            "type": "skills_hard",
+            "content": f"Technical Skills: {', '.join(hard_skills)}",
+            "metadata": {"skills": hard_skills}
+        })
+    if soft_skills:
+        documents.append({
+            "doc_id": make_doc_id("skills_soft"),
+            "type": "skills_soft",
+            "content": f"Soft Skills: {', '.join(soft_skills)}",
+            "metadata": {"skills": soft_skills}
+        })
+    return documents
+
+def _summary_document(user: UserModel) -> Optional[Dict[str, Any]]:
+    if not user.summary:
+        return None
+    return {
+        "doc_id": make_doc_id("summary"),
+        "type": "summary",
+        "content": f"Professional Summary: {user.summary}",
+        "metadata": {}
+    }
+
+def _refresh_skill_vectors(user: UserModel):
+    """Keeps the user's precomputed skill matrix in sync with their skill rows."""
+    # Local import: skill_vectors depends on this module for get_embeddings
+    from src.core.skill_vectors import update_user_skill_vectors
+    try:
+        update_user_skill_vectors(user.id, [s.name for s in user.skills if s.name])
+    except Exception as e:
+        logger.error(f"Failed to update skill vectors for User {user.id}: {e}")
+
+def _open_session(db: Session):
+    if db is not None:
+        return db, False
+    from src.core.database import SessionLocal
+    return SessionLocal(), True
 
 def recalculate_user_embeddings(user_id: int, db: Session = None):
     """
     Fetches the user's full profile (Experiences, Skills, etc.), 
     formats them into documents, and rebuilds their personal vector index.
     """
-    should_close = False
-    if db is None:
-        from src.core.database import SessionLocal
-        db = SessionLocal()
-        should_close = True
+    db, should_close = _open_session(db)
 
     try:
         logger.info(f"Recalculating embeddings for User {user_id}...")
-        profile = get_profile_from_db(db, user_id)
+        user = db.query(UserModel).filter(UserModel.id == user_id).first()
+        if not user:
+            raise ValueError(f"Utilisateur {user_id} introuvable.")
         
         documents = []
-        
         # 1. Experiences
-        for exp in profile.experiences:
-            content = f"Experience: {exp.title} at {exp.company} ({exp.period}). {exp.description}"
-            documents.append({
-                "type": "experience",
-                "content": content,
-                "title": exp.title,
-                "company": exp.company,
-                "period": exp.period,
-                "description": exp.description,
-                "metadata": {
-                    "title": exp.title,
-                    "company": exp.company,
-                    "period": exp.period
-                }
-            })
-            
+        documents.extend(_experience_document(exp) for exp in user.experiences)
         # 2. Education
-        for edu in profile.education:
-            content = f"Education: {edu.degree} at {edu.institution} ({edu.period})."
-            documents.append({
-                "type": "education",
-                "content": content,
-                "metadata": {
-                    "institution": edu.institution,
-                    "degree": edu.degree
-                }
-            })
-
-        # 3. Skills (Grouped or individual)
-        if profile.skills:
-            content = f"Technical Skills: {', '.join(profile.skills)}"
-            documents.append({
-                "type": "skills_hard",
-                "content": content,
-                 "metadata": {"skills": profile.skills}
-            })
-            
-        if profile.soft_skills:
-            content = f"Soft Skills: {', '.join(profile.soft_skills)}"
-            documents.append({
-                "type": "skills_soft",
-                "content": content,
-                "metadata": {"skills": profile.soft_skills}
-            })
-        
+        documents.extend(_education_document(edu) for edu in user.education)
+        # 3. Skills (Grouped)
+        documents.extend(_skill_documents(user))
         # 4. Summary/Bio
-        if profile.summary:
-            documents.append({
-                "type": "summary",
-                "content": f"Professional Summary: {profile.summary}",
-                "metadata": {}
-            })
+        summary_doc = _summary_document(user)
+        if summary_doc:
+            documents.append(summary_doc)
 
         # Build the index specific to this user
         build_vector_store(documents, index_name=f"user_{user_id}")
+        _refresh_skill_vectors(user)
         logger.info(f"Successfully updated embeddings for User {user_id}")
         
     except Exception as e:
@@ -167,6 +407,67 @@ def recalculate_user_embeddings(user_id: int, db: Session = None):
         if should_close and db:
             db.close()
 
+def update_user_embeddings(user_id: int, kind: str, row_id: int = None, db: Session = None):
+    """
+    Applies a single profile change to the user's index instead of rebuilding it.
+
+    Args:
+        kind: 'experience', 'education' or 'skills'.
+        row_id: Primary key of the created/updated/deleted row. A row that no longer
+                exists in the DB is removed from the index. Ignored for 'skills',
+                whose grouped documents are rebuilt from the current skill list.
+    """
+    db, should_close = _open_session(db)
+    index_name = f"user_{user_id}"
+
+    try:
+        user = db.query(UserModel).filter(UserModel.id == user_id).first()
+        if not user:
+            raise ValueError(f"Utilisateur {user_id} introuvable.")
+
+        documents, remove_ids = [], []
+        if kind == "experience":
+            exp = db.query(ExperienceModel).filter(ExperienceModel.id == row_id, ExperienceModel.user_id == user_id).first()
+            if exp:
+                documents.append(_experience_document(exp))
+            else:
+                remove_ids.append(make_doc_id("experience", row_id))
+        elif kind == "education":
+            edu = db.query(EducationModel).filter(EducationModel.id == row_id, EducationModel.user_id == user_id).first()
+            if edu:
+                documents.append(_education_document(edu))
+            else:
+                remove_ids.append(make_doc_id("education", row_id))
+        elif kind == "skills":
+            documents = _skill_documents(user)
+            remove_ids = [make_doc_id("skills_hard"), make_doc_id("skills_soft")]
+            _refresh_skill_vectors(user)
+        else:
+            raise ValueError(f"Unknown profile document kind: {kind}")
+
+        if upsert_documents(index_name, documents, remove_ids=remove_ids):
+            return
+
+        logger.info(f"No incremental index for User {user_id}, falling back to a full rebuild.")
+        recalculate_user_embeddings(user_id, db=db)
+
+    except Exception as e:
+        logger.error(f"Failed to update embeddings ({kind}) for User {user_id}: {e}")
+    finally:
+        if should_close and db:
+            db.close()
+
+def _reconstruct_vector(index, doc_id: int) -> Optional[np.ndarray]:
+    """
+    Reads a stored (normalized) vector back from the index.
+    Indexes written before IndexIDMap2 cannot reconstruct by id; their metadata
+    still carries an 'embedding' list, which is left untouched in that case.
+    """
+    try:
+        return index.reconstruct(doc_id)
+    except RuntimeError:
+        return None
+
 def search_vector_store(
     query_text: str, 
     index_name: str = "kb_index", 
@@ -175,21 +476,20 @@ def search_vector_store(
     """
     Searches a FAISS index using cosine similarity.
     """
-    index_path = os.path.join(EMBEDDINGS_DIR, f"{index_name}.faiss")
-    data_path = os.path.join(EMBEDDINGS_DIR, f"{index_name}.json")
+    index_path, data_path = _index_paths(index_name)
 
     if not os.path.exists(index_path) or not os.path.exists(data_path):
         logger.warning(f"Index '{index_name}' not found. Returning empty results.")
         return []
 
-    # Load resources
+    # Load resources (served from memory while the files are unchanged)
     try:
-        index = faiss.read_index(index_path)
-        with open(data_path, 'r', encoding='utf-8') as f:
-            documents = json.load(f)
+        index, documents_by_id = _index_cache.get(index_name)
     except Exception as e:
         logger.error(f"Error loading index/data for {index_name}: {e}")
         return []
+    if index is None:
+        return []
 
     # Generate Query Embedding
     query_embedding_list = get_embedding(query_text)
@@ -216,10 +516,12 @@ def search_vector_store(
     # Format Results
     results = []
     for i, idx in enumerate(indices[0]):
-        if idx != -1:
-            doc = documents[idx].copy() # Copy to avoid mutating original
+        if idx != -1 and int(idx) in documents_by_id:
+            doc = documents_by_id[int(idx)].copy() # Copy to avoid mutating original
             doc['match_score'] = float(distances[0][i])
-            # Reconstruct embedding not strictly needed for basic search, avoiding complexity
+            embedding = _reconstruct_vector(index, int(idx))
+            if embedding is not None:
+                doc['embedding'] = embedding
             results.append(doc)
             
     return results
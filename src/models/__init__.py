@@ -0,0 +1,8 @@
+# Import every model so that the metadata is complete (foreign keys to "users")
+# as soon as any single model is imported.
+from src.models.user import User
+from src.models.profile import Experience, Education, Skill, Language
+from src.models.usage import UsageLog
+from src.models.job import Job
+
+__all__ = ["User", "Experience", "Education", "Skill", "Language", "UsageLog", "Job"]
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from src.core.database import Base
+
+class Job(Base):
+    """
+    Durable background job (see src/core/job_queue.py). Claimed by worker processes,
+    so it survives restarts and can run outside the API process.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, index=True) # 'cv_generation'
+    payload = Column(Text) # JSON arguments of the handler
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    usage_log_id = Column(Integer, ForeignKey("usage_logs.id"), nullable=True, index=True) # public job id of the API
+    status = Column(String, default="queued", index=True) # 'queued', 'running', 'done', 'failed'
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    run_after = Column(DateTime, nullable=True) # not claimable before (retry backoff)
+    locked_by = Column(String, nullable=True) # worker id
+    locked_until = Column(DateTime, nullable=True) # visibility timeout: reclaimable after
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -14,4 +14,6 @@ class UsageLog(Base):
     provider = Column(String, nullable=True) # 'openai', 'groq', etc.
     model = Column(String, nullable=True)
     status = Column(String) # 'success', 'error'
+    stage = Column(String, nullable=True) # generation stage, see src/core/job_events.py
+    progress = Column(Integer, nullable=True) # 0-100
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
@@ -22,6 +22,7 @@ class User(Base):
     llm_provider = Column(String, default="openai") # openai, anthropic, gemini
     llm_model = Column(String, default="gpt-4o-mini")
     role = Column(String, default="user") # 'user' or 'admin'
+    profile_version = Column(Integer, default=0) # bumped on every profile change (profile cache)
     
     # We will add relationships later when profile.py is ready
     # experiences = relationship("Experience", back_populates="owner")
@@ -0,0 +1,19 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.core.database import Base
+import src.models  # noqa: F401 (registers every table on Base.metadata)
+
+@pytest.fixture
+def db_session_factory(tmp_path):
+    """sessionmaker sur une base SQLite temporaire, toutes les tables créées"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def db_session(db_session_factory):
+    session = db_session_factory()
+    yield session
+    session.close()
@@ -0,0 +1,104 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+from src.core import orchestration
+from src.core.orchestration import _optimize_descriptions
+
+def test_rewrites_run_concurrently_and_keep_order():
+    """Vérifie que les réécritures sont lancées en parallèle et rendues dans l'ordre des expériences"""
+    def slow_rewrite(desc, job_offer=None):
+        time.sleep(0.3)
+        return f"optimisé: {desc}"
+
+    agent = MagicMock()
+    agent.optimize_description.side_effect = slow_rewrite
+    with patch.object(orchestration, "optimizer_agent", agent):
+        start = time.perf_counter()
+        results = _optimize_descriptions(["A", "B", "C"], "Python")
+        elapsed = time.perf_counter() - start
+
+    assert results == ["optimisé: A", "optimisé: B", "optimisé: C"]
+    assert elapsed < 0.8
+
+def test_failed_or_slow_rewrite_falls_back():
+    """Vérifie qu'une réécriture en erreur ou trop lente renvoie None sans bloquer les autres"""
+    def rewrite(desc, job_offer=None):
+        if desc == "lent":
+            time.sleep(1)
+        if desc == "erreur":
+            raise RuntimeError("LLM indisponible")
+        return desc.upper()
+
+    agent = MagicMock()
+    agent.optimize_description.side_effect = rewrite
+    with patch.object(orchestration, "optimizer_agent", agent), \
+         patch.object(orchestration, "OPTIMIZER_TIMEOUT", 0.2):
+        results = _optimize_descriptions(["ok", "lent", "erreur"], "Python")
+
+    assert results == ["OK", None, None]
+
+def test_timeout_is_counted_per_rewrite():
+    """Vérifie que le délai court à partir du début de chaque réécriture, pas du lancement du lot"""
+    def rewrite(desc, job_offer=None):
+        time.sleep(0.2)
+        return desc.upper()
+
+    agent = MagicMock()
+    agent.optimize_description.side_effect = rewrite
+    executor = ThreadPoolExecutor(max_workers=2)
+    with patch.object(orchestration, "optimizer_agent", agent), \
+         patch.object(orchestration, "_optimizer_executor", executor), \
+         patch.object(orchestration, "OPTIMIZER_TIMEOUT", 0.3):
+        results = _optimize_descriptions(["a", "b", "c"], "Python")
+    executor.shutdown()
+
+    # "c" démarre après 0.2s et termine vers 0.4s, au-delà du délai d'un lot de 0.3s
+    assert results == ["A", "B", "C"]
+
+def test_queued_rewrites_are_cancelled_when_pool_is_busy():
+    """Vérifie qu'une réécriture qui n'a pas obtenu de worker à temps est annulée sans être lancée"""
+    def rewrite(desc, job_offer=None):
+        time.sleep(0.5)
+        return desc.upper()
+
+    agent = MagicMock()
+    agent.optimize_description.side_effect = rewrite
+    executor = ThreadPoolExecutor(max_workers=1)
+    with patch.object(orchestration, "optimizer_agent", agent), \
+         patch.object(orchestration, "_optimizer_executor", executor), \
+         patch.object(orchestration, "OPTIMIZER_TIMEOUT", 0.1):
+        results = _optimize_descriptions(["lent", "en attente"], "Python")
+    executor.shutdown()
+
+    assert results == [None, None]
+    assert agent.optimize_description.call_count == 1
+
+def test_pipeline_streams_stages_before_rewrites():
+    """Vérifie que compétences, score et expériences sont émis avant les réécritures, puis une puce par expérience"""
+    profile = MagicMock(skills=["Python", "SQL"], experiences=[MagicMock()])
+    matches = [
+        {"type": "experience", "match_score": 0.8, "embedding": [1.0, 0.0], "metadata": {"title": "Data", "description": "Pipelines. Suite"}},
+        {"type": "experience", "match_score": 0.6, "embedding": [0.0, 1.0], "metadata": {"title": "Web", "description": "API. Suite"}},
+    ]
+    parser = MagicMock()
+    parser.extract_information.return_value = {"skills": ["Python"], "missions": ["ETL"]}
+    agent = MagicMock()
+    agent.optimize_description.side_effect = lambda desc, job_offer=None: f"Optimisé {desc}"
+
+    with patch.object(orchestration, "parser_agent", parser), \
+         patch.object(orchestration, "optimizer_agent", agent), \
+         patch.object(orchestration, "get_profile_from_db", return_value=profile), \
+         patch.object(orchestration, "_rank_skills_by_relevance", return_value=["Python"]), \
+         patch.object(orchestration, "_calculate_fuzzy_keyword_score", return_value=50.0), \
+         patch.object(orchestration, "search_vector_store", return_value=matches), \
+         patch.object(orchestration.KNOWLEDGE_BASE_PATH.__class__, "exists", return_value=True):
+        events = list(orchestration.iter_analysis_pipeline("Offre Python", db=MagicMock(), user_id=3))
+
+    names = [e for e, _ in events]
+    assert names[:3] == ["skills", "keyword_score", "matches"]
+    assert names[3:] == ["bullet", "bullet", "result"]
+    assert events[2][1]["raw_matches"][0]["description"] == "Pipelines. Suite"
+
+    result = events[-1][1]
+    assert result["bulletPoints"] == ["Data: Optimisé Pipelines...", "Web: Optimisé API..."]
+    assert result["score"] == int((0.7 * 100) * 0.6 + 50 * 0.4)
@@ -0,0 +1,96 @@
+import os
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from src.core import cv_cache
+
+PROFILE = {"name": "Jean", "skills": ["Python"], "experiences": []}
+EXPERIENCES = [{"title": "Data Engineer", "description": "Pipelines"}]
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cv_cache, "CV_CACHE_DIR", tmp_path / "cv_cache")
+    return tmp_path
+
+def _files(tmp_path, name="src", size=10):
+    folder = tmp_path / name
+    folder.mkdir()
+    (folder / "cv.pdf").write_bytes(b"%PDF" + b"0" * size)
+    (folder / "cv.tex").write_text("\\documentclass{article}")
+    return str(folder / "cv.pdf"), str(folder / "cv.tex")
+
+def test_key_depends_on_every_generation_input():
+    """Vérifie que la clé change avec les expériences, le template, le modèle ou l'offre, et pas sinon"""
+    key = cv_cache.cache_key(PROFILE, EXPERIENCES, "modern", "openai", "gpt-4o-mini", "Offre  Python")
+    assert key == cv_cache.cache_key(dict(PROFILE), list(EXPERIENCES), "modern", "openai", "gpt-4o-mini", "Offre Python")
+    assert key != cv_cache.cache_key(PROFILE, EXPERIENCES[:0], "modern", "openai", "gpt-4o-mini", "Offre Python")
+    assert key != cv_cache.cache_key(PROFILE, EXPERIENCES, "photo_header", "openai", "gpt-4o-mini", "Offre Python")
+    assert key != cv_cache.cache_key(PROFILE, EXPERIENCES, "modern", "groq", "llama-3.3-70b-versatile", "Offre Python")
+    assert key != cv_cache.cache_key(PROFILE, EXPERIENCES, "modern", "openai", "gpt-4o-mini", "Offre Java")
+
+def test_store_then_lookup_copies_into_job_folder(cache_dir):
+    pdf, tex = _files(cache_dir)
+    assert cv_cache.lookup("abc", cache_dir / "job1") is None
+
+    cv_cache.store("abc", pdf, tex)
+    os.remove(pdf)
+    pdf_path, tex_path = cv_cache.lookup("abc", cache_dir / "job2")
+    assert pdf_path.endswith("job2/cv_job2.pdf") and open(pdf_path, "rb").read().startswith(b"%PDF")
+    assert tex_path.endswith("job2/cv_job2.tex")
+
+def test_cache_hit_is_not_swept_as_old(cache_dir, db_session_factory):
+    """Vérifie qu'un CV servi depuis une entrée ancienne du cache n'est pas supprimé par la rétention"""
+    from src.core import retention
+    pdf, tex = _files(cache_dir)
+    cv_cache.store("abc", pdf, tex)
+    twenty_days_ago = time.time() - 20 * 86400
+    for f in (cv_cache.CV_CACHE_DIR / "abc").iterdir():
+        os.utime(f, (twenty_days_ago,) * 2)
+
+    root = cache_dir / "generated_cvs"
+    cv_cache.lookup("abc", root / "job1")
+    policy = {"max_age_days": 14, "max_size_mb": 100, "keep_latest_per_user": 10, "sweep_interval_minutes": 30}
+    with patch.object(retention, "SessionLocal", db_session_factory), \
+         patch.object(retention, "_policy", return_value=policy):
+        retention.sweep(root, now=time.time() + retention.GRACE_PERIOD_S + 1)
+    assert (root / "job1" / "cv_job1.pdf").exists()
+
+def test_eviction_by_age_then_total_size(cache_dir):
+    """Vérifie l'éviction des entrées trop vieilles puis des plus anciennes jusqu'à respecter la taille max"""
+    pdf, tex = _files(cache_dir, size=1000)
+    for i, key in enumerate(["old", "mid", "new"]):
+        cv_cache.store(key, pdf, tex)
+        os.utime(cv_cache.CV_CACHE_DIR / key, (time.time() - 1000 * (3 - i),) * 2)
+
+    assert cv_cache.evict(max_age_s=2500, max_bytes=10**6) == 1
+    assert not (cv_cache.CV_CACHE_DIR / "old").exists()
+    assert cv_cache.evict(max_age_s=2500, max_bytes=1500) == 1
+    assert [e.name for e in cv_cache.CV_CACHE_DIR.iterdir()] == ["new"]
+
+def test_generation_hit_skips_llm_and_compiler(cache_dir):
+    """Vérifie qu'une régénération identique ne rappelle ni l'IA ni LaTeX, sauf si force_regenerate"""
+    from src.api import generation
+    from src.core.api_models import CVGenerationRequest
+
+    log_entry = MagicMock(status="processing")
+    user = MagicMock(selected_template="modern", llm_provider="openai", llm_model="gpt-4o-mini")
+    db = MagicMock()
+    db.query.return_value.filter.return_value.first.side_effect = lambda: log_entry if db.query.call_args[0][0] is generation.UsageLog else user
+    profile = MagicMock(skills=[], experiences=[], education=[], languages=[])
+
+    pdf, tex = _files(cache_dir)
+    request = CVGenerationRequest(experiences=EXPERIENCES)
+    with patch.object(generation, "SessionLocal", return_value=db), \
+         patch.object(generation, "get_profile_from_db", return_value=profile), \
+         patch.object(generation, "_profile_to_dict", return_value=PROFILE), \
+         patch.object(generation, "GENERATED_CVS_DIR", cache_dir / "out"), \
+         patch.object(generation.job_events, "report_progress"), \
+         patch.object(generation, "GeneratorAgent") as agent:
+        cv_cache.store(cv_cache.cache_key(PROFILE, EXPERIENCES, "modern", "openai", "gpt-4o-mini"), pdf, tex)
+        generation.background_generate_cv("1", request, user_id=1)
+        assert not agent.called
+        assert log_entry.status == "success" and log_entry.model.startswith(str(cache_dir / "out"))
+
+        agent.return_value.generate_cv.side_effect = RuntimeError("appel LLM")
+        with pytest.raises(RuntimeError, match="appel LLM"):
+            generation.background_generate_cv("1", CVGenerationRequest(experiences=EXPERIENCES, force_regenerate=True), user_id=1)
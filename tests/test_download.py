@@ -0,0 +1,55 @@
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from api import app
+from src.core.database import get_db
+from src.models.usage import UsageLog
+
+PDF = b"%PDF-1.5\n" + bytes(range(256)) * 40
+
+@pytest.fixture
+def download(tmp_path, db_session_factory):
+    Session = db_session_factory
+    pdf = tmp_path / "cv.pdf"
+    pdf.write_bytes(PDF)
+    db = Session()
+    log = UsageLog(user_id=1, action="cv_generation", status="success", model=str(pdf))
+    db.add(log)
+    db.commit()
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+    with patch.dict(app.dependency_overrides, {get_db: override_get_db}):
+        client = TestClient(app)
+        yield lambda headers=None, **params: client.get(f"/api/download/{log.id}", headers=headers or {}, params=params)
+
+def test_full_download_has_strong_etag_and_immutable_cache(download):
+    response = download(inline="true")
+    assert response.status_code == 200 and response.content == PDF
+    assert response.headers["etag"].startswith('"') and not response.headers["etag"].startswith('W/')
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-disposition"] == "inline"
+    assert download().headers["etag"] == response.headers["etag"]
+
+def test_preview_reload_returns_304(download):
+    """Vérifie qu'un rechargement de l'aperçu avec If-None-Match ne renvoie pas le PDF"""
+    etag = download().headers["etag"]
+    response = download({"If-None-Match": etag}, inline="true")
+    assert response.status_code == 304 and response.content == b""
+    assert download({"If-None-Match": '"autre"'}).status_code == 200
+
+def test_byte_ranges_for_pdf_viewers(download):
+    """Vérifie les requêtes partielles (206), le suffixe, If-Range périmé et la plage invalide (416)"""
+    response = download({"Range": "bytes=0-99"})
+    assert response.status_code == 206 and response.content == PDF[:100]
+    assert response.headers["content-range"] == f"bytes 0-99/{len(PDF)}"
+
+    assert download({"Range": "bytes=-10"}).content == PDF[-10:]
+    assert download({"Range": "bytes=100-"}).content == PDF[100:]
+    assert download({"Range": "bytes=0-9", "If-Range": '"ancienne"'}).status_code == 200
+    assert download({"Range": f"bytes={len(PDF)}-"}).status_code == 416
@@ -0,0 +1,62 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from src.core import vector_store
+from src.core.cache import SQLiteCache
+
+def _fake_response(texts):
+    """Construit une réponse OpenAI factice : un vecteur distinct par texte."""
+    response = MagicMock()
+    response.data = [MagicMock(embedding=[float(len(t))] + [0.0] * 1535) for t in texts]
+    return response
+
+@pytest.fixture
+def isolated_cache(tmp_path, monkeypatch):
+    cache = SQLiteCache(tmp_path / "embeddings.sqlite", table="embeddings", max_entries=100)
+    monkeypatch.setattr(vector_store, "_embedding_cache", cache)
+    return cache
+
+def test_only_cache_misses_are_sent_to_api(isolated_cache):
+    """Vérifie que seuls les textes absents du cache partent vers l'API"""
+    with patch("src.core.vector_store.OpenAI") as mock_openai:
+        create = mock_openai.return_value.embeddings.create
+        create.side_effect = lambda input, model: _fake_response(input)
+
+        first = vector_store.get_embeddings(["Python", "SQL"])
+        second = vector_store.get_embeddings(["Python", "Docker", "SQL"])
+
+        assert create.call_count == 2
+        assert create.call_args_list[1].kwargs["input"] == ["Docker"]
+        assert second[0] == first[0]
+        assert second[2] == first[1]
+
+def test_whitespace_is_normalized_in_key(isolated_cache):
+    """Vérifie que des espaces/retours à la ligne différents réutilisent la même entrée"""
+    with patch("src.core.vector_store.OpenAI") as mock_openai:
+        create = mock_openai.return_value.embeddings.create
+        create.side_effect = lambda input, model: _fake_response(input)
+
+        vector_store.get_embedding("Expert  Python\nFastAPI")
+        vector_store.get_embedding("Expert Python FastAPI")
+        assert create.call_count == 1
+
+def test_api_errors_are_not_cached(isolated_cache):
+    """Vérifie que le vecteur nul de secours n'est jamais mis en cache"""
+    with patch("src.core.vector_store.OpenAI") as mock_openai:
+        create = mock_openai.return_value.embeddings.create
+        create.side_effect = Exception("API down")
+        assert vector_store.get_embedding("Python") == [0.0] * 1536
+
+        create.side_effect = lambda input, model: _fake_response(input)
+        assert vector_store.get_embedding("Python")[0] == 6.0
+
+def test_lru_eviction(tmp_path):
+    """Vérifie que l'entrée la moins récemment utilisée est évincée"""
+    cache = SQLiteCache(tmp_path / "lru.sqlite", table="lru", max_entries=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")  # 'a' devient la plus récente
+    cache.set("c", b"3")
+
+    assert cache.get("a") == b"1"
+    assert cache.get("b") is None
+    assert cache.get("c") == b"3"
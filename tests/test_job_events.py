@@ -0,0 +1,51 @@
+import time
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+from src.core import job_events
+from src.models.usage import UsageLog
+
+@pytest.fixture
+def job(db_session_factory):
+    Session = db_session_factory
+    db = Session()
+    log = UsageLog(user_id=1, action="cv_generation", status="processing", stage="queued", progress=0)
+    db.add(log)
+    db.commit()
+    with patch.object(job_events, "SessionLocal", Session), \
+         patch.object(job_events, "bus", job_events.JobEventBus()):
+        yield str(log.id), Session
+
+def test_long_poll_wakes_up_on_published_stage(job):
+    """Vérifie qu'une requête en attente reçoit la nouvelle étape dès sa publication, sans attendre le timeout"""
+    job_id, _ = job
+    first = asyncio.run(job_events.wait_for_change(job_id, None, 0))
+    assert first == {"status": "processing", "stage": "queued", "progress": 0}
+
+    threading.Timer(0.2, job_events.report_progress, args=(job_id, "compiling")).start()
+    start = time.perf_counter()
+    state = asyncio.run(job_events.wait_for_change(job_id, job_events.state_token(first), 10))
+    assert state == {"status": "processing", "stage": "compiling", "progress": 60}
+    assert time.perf_counter() - start < 2
+
+def test_long_poll_falls_back_to_db_for_external_workers(job):
+    """Vérifie qu'une progression écrite par un autre processus (DB seule) est vue au prochain relevé"""
+    job_id, Session = job
+    def other_process():
+        db = Session()
+        db.query(UsageLog).filter(UsageLog.id == int(job_id)).update({UsageLog.status: "success"})
+        db.commit()
+        db.close()
+    threading.Timer(0.2, other_process).start()
+
+    with patch.object(job_events, "DB_POLL_INTERVAL", 0.1):
+        state = asyncio.run(job_events.wait_for_change(job_id, "processing:queued:0", 10))
+    assert state == {"status": "success", "stage": "done", "progress": 100}
+
+def test_long_poll_returns_unchanged_state_after_timeout(job):
+    job_id, _ = job
+    with patch.object(job_events, "DB_POLL_INTERVAL", 0.1):
+        state = asyncio.run(job_events.wait_for_change(job_id, "processing:queued:0", 0.3))
+    assert job_events.state_token(state) == "processing:queued:0"
+    assert asyncio.run(job_events.wait_for_change("999", None, 0)) is None
@@ -0,0 +1,116 @@
+import pytest
+from datetime import timedelta
+from unittest.mock import patch
+from src.core import job_queue
+from src.core.llm_router import LLMTimeoutError, LLMProviderError
+from src.models.usage import UsageLog
+
+@pytest.fixture
+def Session(db_session_factory):
+    with patch.object(job_queue, "SessionLocal", db_session_factory), \
+         patch.dict(job_queue._handlers, clear=True):
+        yield db_session_factory
+
+def test_a_job_is_claimed_by_one_worker_only(Session):
+    """Vérifie qu'un job réclamé devient invisible pour les autres workers"""
+    db = Session()
+    job_queue.enqueue(db, "test", {"n": 1})
+
+    first = job_queue.claim_job(db, "worker-a")
+    assert first.status == "running" and first.locked_by == "worker-a" and first.attempts == 1
+    assert job_queue.claim_job(Session(), "worker-b") is None
+
+def test_expired_lock_makes_the_job_visible_again(Session):
+    """Vérifie qu'un job dont le worker a disparu est repris après le visibility timeout"""
+    db = Session()
+    job = job_queue.enqueue(db, "test", {})
+    job_queue.claim_job(db, "worker-a")
+
+    later = job_queue._now() + timedelta(seconds=job_queue.JOB_VISIBILITY_TIMEOUT + 1)
+    with patch.object(job_queue, "_now", return_value=later):
+        reclaimed = job_queue.claim_job(Session(), "worker-b")
+    assert reclaimed.id == job.id and reclaimed.locked_by == "worker-b" and reclaimed.attempts == 2
+
+def test_failures_are_retried_then_reported(Session):
+    """Vérifie les nouvelles tentatives avec backoff, puis l'appel du hook d'échec final"""
+    calls, failures = [], []
+    def handler(payload):
+        calls.append(payload)
+        raise LLMTimeoutError("délai dépassé", "gemini")
+    job_queue.register_handler("test", handler, on_failure=lambda payload, error: failures.append((payload, error)))
+
+    db = Session()
+    job = job_queue.enqueue(db, "test", {"job_id": "7"}, max_attempts=2)
+    worker = job_queue.JobWorker(concurrency=1)
+
+    assert worker.run_once()
+    db.refresh(job)
+    assert job.status == "queued" and job.run_after is not None and failures == []
+    assert not worker.run_once()  # backoff pas encore écoulé
+
+    with patch.object(job_queue, "_now", return_value=job.run_after + timedelta(seconds=1)):
+        assert worker.run_once()
+    db.refresh(job)
+    assert job.status == "failed" and len(calls) == 2
+    assert failures == [({"job_id": "7"}, "LLMTimeoutError: gemini: délai dépassé")]
+
+@pytest.mark.parametrize("error", [ValueError("payload invalide"), LLMProviderError("clé API invalide", "openai", status=401)])
+def test_non_transient_error_is_not_retried(Session, error):
+    """Vérifie qu'une erreur non transitoire (bug, requête invalide, 4xx) échoue sans nouvelle tentative"""
+    failures = []
+    def handler(payload):
+        raise RuntimeError("L'IA a échoué") from error
+    job_queue.register_handler("test", handler, on_failure=lambda payload, error: failures.append(error))
+
+    db = Session()
+    job = job_queue.enqueue(db, "test", {}, max_attempts=3)
+    job_queue.JobWorker(concurrency=1).run_once()
+    db.refresh(job)
+    assert job.status == "failed" and job.attempts == 1 and len(failures) == 1
+
+def test_failure_after_lock_lost_is_not_reported(Session):
+    """Vérifie qu'un worker qui a perdu le verrou ne marque pas le job en échec et n'appelle pas le hook"""
+    failures = []
+    db = Session()
+    def handler(payload):
+        # Le verrou a expiré et un autre worker a repris le job pendant l'exécution
+        db.query(job_queue.Job).update({job_queue.Job.locked_by: "worker-b"})
+        db.commit()
+        raise job_queue.PermanentJobError("CV trop long")
+    job_queue.register_handler("test", handler, on_failure=lambda payload, error: failures.append(error))
+
+    job = job_queue.enqueue(db, "test", {})
+    job_queue.JobWorker(concurrency=1).run_once()
+    db.refresh(job)
+    assert job.status == "running" and job.locked_by == "worker-b" and failures == []
+
+def test_permanent_error_is_not_retried(Session):
+    def handler(payload):
+        raise job_queue.PermanentJobError("CV trop long")
+    job_queue.register_handler("test", handler)
+
+    db = Session()
+    job = job_queue.enqueue(db, "test", {})
+    job_queue.JobWorker(concurrency=1).run_once()
+    db.refresh(job)
+    assert job.status == "failed" and job.attempts == 1
+
+def test_generate_cv_job_marks_usage_log(Session):
+    """Vérifie que le handler de génération met à jour le UsageLog en succès comme en échec définitif"""
+    from src.api import generation
+    job_queue.register_handler("cv_generation", generation._run_generation_job, on_failure=generation._generation_job_failed)
+
+    db = Session()
+    log_entry = UsageLog(user_id=1, action="cv_generation", status="processing")
+    db.add(log_entry)
+    db.commit()
+    job = job_queue.enqueue(db, "cv_generation", {"job_id": str(log_entry.id), "request": {"experiences": []}, "user_id": 1}, max_attempts=1)
+
+    with patch.object(generation, "SessionLocal", Session), \
+         patch.object(generation, "get_profile_from_db", side_effect=RuntimeError("profil introuvable")):
+        job_queue.JobWorker(concurrency=1).run_once()
+
+    db.refresh(log_entry)
+    db.refresh(job)
+    assert job.status == "failed"
+    assert log_entry.status == "error" and log_entry.model == "Error: profil introuvable"
@@ -0,0 +1,99 @@
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+from src.core import latex_compiler
+from src.core.latex_compiler import LatexCompiler
+
+def _fake_engine(tex_path, output_dir, timeout):
+    time.sleep(0.05)
+    Path(output_dir, Path(tex_path).with_suffix(".pdf").name).write_bytes(b"%PDF")
+    return "Output written on cv.pdf (1 page)"
+
+def test_engines_are_probed_once():
+    """Vérifie que les moteurs LaTeX ne sont sondés qu'une fois par processus"""
+    with patch.object(latex_compiler, "_engines", None), \
+         patch("src.core.latex_compiler.shutil.which", return_value="/usr/bin/x"), \
+         patch("src.core.latex_compiler.subprocess.run") as mock_run:
+        assert latex_compiler.available_engines() == ["tectonic", "pdflatex"]
+        latex_compiler.available_engines()
+        assert mock_run.call_count == 2
+
+def test_pool_bounds_concurrency_and_reports_metrics(tmp_path):
+    """Vérifie que le pool limite les compilations simultanées et mesure attente et durée"""
+    compiler = LatexCompiler(max_workers=2)
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def tracked(*args):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        try:
+            return _fake_engine(*args)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    with patch.object(latex_compiler, "available_engines", return_value=["pdflatex"]), \
+         patch.dict(latex_compiler._ENGINE_RUNNERS, {"pdflatex": tracked}):
+        tex_files = []
+        for i in range(5):
+            tex = tmp_path / f"cv_{i}.tex"
+            tex.write_text("\\documentclass{article}")
+            tex_files.append(tex)
+        threads = [threading.Thread(target=compiler.compile, args=(t,)) for t in tex_files]
+        for t in threads: t.start()
+        for t in threads: t.join()
+
+    stats = compiler.stats()
+    assert peak[0] <= 2
+    assert stats["completed"] == 5 and stats["queue_depth"] == 0
+    assert stats["avg_compile_s"] > 0
+
+def test_falls_back_to_next_engine(tmp_path):
+    tex = tmp_path / "cv.tex"
+    tex.write_text("\\documentclass{article}")
+    def broken(*args):
+        raise RuntimeError("bundle manquant")
+
+    with patch.object(latex_compiler, "available_engines", return_value=["tectonic", "pdflatex"]), \
+         patch.dict(latex_compiler._ENGINE_RUNNERS, {"tectonic": broken, "pdflatex": _fake_engine}):
+        result = LatexCompiler(max_workers=1).compile(tex)
+
+    assert result.success and result.engine == "pdflatex"
+    assert result.errors == ["tectonic: bundle manquant"]
+
+def test_page_count_and_warnings_from_log():
+    log = "LaTeX Warning: Reference `x' undefined.\nOverfull \\hbox (3.2pt too wide)\nOutput written on cv.pdf (2 pages, 40123 bytes)."
+    assert latex_compiler.parse_page_count(log) == 2
+    assert len(latex_compiler.parse_warnings(log)) == 2
+    assert latex_compiler.parse_page_count("") is None
+
+def test_validate_cv_reuses_compile_result(tmp_path):
+    """Vérifie que la validation utilise le résultat de compilation au lieu de relancer pdflatex"""
+    from src.core.cv_validator import validate_cv
+    tex = tmp_path / "cv.tex"
+    tex.write_text("\\documentclass{article}")
+    result = latex_compiler.CompileResult(success=True, engine="pdflatex", page_count=2)
+
+    with patch("src.core.cv_validator.subprocess.run") as mock_run:
+        validation = validate_cv(str(tex), compile_result=result)
+        mock_run.assert_not_called()
+    assert validation["valid"] is False
+    assert validation["page_count"] == 2
+
+def test_validate_cv_reads_existing_pdf(tmp_path):
+    from pypdf import PdfWriter
+    from src.core.cv_validator import validate_cv
+    tex = tmp_path / "cv.tex"
+    tex.write_text("\\documentclass{article}")
+    writer = PdfWriter()
+    writer.add_blank_page(width=595, height=842)
+    with open(tmp_path / "cv.pdf", "wb") as f:
+        writer.write(f)
+
+    with patch("src.core.cv_validator.subprocess.run") as mock_run:
+        validation = validate_cv(str(tex))
+        mock_run.assert_not_called()
+    assert validation["valid"] is True and validation["page_count"] == 1
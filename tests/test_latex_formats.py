@@ -0,0 +1,42 @@
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from src.core import latex_formats
+from src.config.constants import TEMPLATES_DIR
+
+@pytest.fixture(autouse=True)
+def isolated_formats(tmp_path, monkeypatch):
+    monkeypatch.setattr(latex_formats, "FORMATS_DIR", tmp_path)
+    monkeypatch.setattr(latex_formats, "_failed_builds", set())
+
+def _fake_build(cmd, **kwargs):
+    jobname = next(arg.split("=", 1)[1] for arg in cmd if arg.startswith("-jobname="))
+    Path(latex_formats.FORMATS_DIR, f"{jobname}.fmt").write_bytes(b"fmt")
+
+def test_generated_document_matching_template_uses_format():
+    """Vérifie qu'un document dont le préambule est celui du template utilise le format précompilé"""
+    template = (TEMPLATES_DIR / "modern.tex").read_text(encoding="utf-8")
+    # Le LLM remplit le corps et peut modifier les commentaires / espaces du préambule
+    generated = template.replace("% --- Colors ---", "").replace("\n\n", "\n").replace("{{name}}", "Jean Dupont")
+
+    with patch("src.core.latex_formats.subprocess.run", side_effect=_fake_build) as mock_run:
+        fmt = latex_formats.format_for(generated)
+        latex_formats.format_for(generated)
+
+    assert fmt is not None and fmt.name.startswith("modern-")
+    assert mock_run.call_count == 1
+
+def test_modified_preamble_compiles_without_format():
+    template = (TEMPLATES_DIR / "modern.tex").read_text(encoding="utf-8")
+    edited = template.replace("\\usepackage{latexsym}", "\\usepackage{latexsym}\n\\usepackage{multicol}")
+    with patch("src.core.latex_formats.subprocess.run") as mock_run:
+        assert latex_formats.format_for(edited) is None
+        mock_run.assert_not_called()
+
+def test_failed_build_is_not_retried():
+    """Vérifie qu'un format impossible à construire (mylatexformat absent) n'est pas retenté à chaque CV"""
+    template = (TEMPLATES_DIR / "modern.tex").read_text(encoding="utf-8")
+    with patch("src.core.latex_formats.subprocess.run") as mock_run:
+        assert latex_formats.format_for(template) is None
+        assert latex_formats.format_for(template) is None
+    assert mock_run.call_count == 1
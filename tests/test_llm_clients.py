@@ -0,0 +1,101 @@
+from unittest.mock import patch
+from src.core import llm_provider
+from src.core.llm_provider import _ClientRegistry, get_llm
+
+def test_same_arguments_reuse_client(monkeypatch):
+    """Vérifie que get_llm ne reconstruit pas le client SDK à chaque appel"""
+    monkeypatch.setattr(llm_provider, "_client_registry", _ClientRegistry(max_size=4))
+    with patch("src.core.llm_provider.OpenAI") as mock_openai:
+        first = get_llm(provider="openai", model="gpt-4o-mini", user_api_key="sk-user-1")
+        second = get_llm(provider="openai", model="gpt-4o-mini", user_api_key="sk-user-1")
+        other = get_llm(provider="openai", model="gpt-4o-mini", user_api_key="sk-user-2")
+
+    assert first.backends[0][1] is second.backends[0][1]
+    assert other.backends[0][1] is not first.backends[0][1]
+    assert mock_openai.call_count == 2
+    assert not any("sk-user" in str(k) for k in llm_provider._client_registry._clients)
+    assert "sk-user" not in first.backends[0][0]
+
+def test_registry_is_bounded():
+    registry = _ClientRegistry(max_size=2)
+    for i in range(3):
+        registry.get_or_create(i, object)
+    assert list(registry._clients) == [1, 2]
+
+def test_settings_parsed_once(monkeypatch):
+    """Vérifie que settings.yaml n'est relu que s'il a changé"""
+    monkeypatch.setattr(llm_provider, "_settings_cache", {"mtime": None, "data": {}})
+    with patch("src.core.llm_provider.load_yaml", return_value={"model_name": "gpt-4o-mini"}) as mock_load:
+        llm_provider._load_settings()
+        llm_provider._load_settings()
+    assert mock_load.call_count == 1
+
+def test_async_chat_and_stream_use_async_client(monkeypatch):
+    """Vérifie que achat/astream passent par le client asynchrone du SDK"""
+    import asyncio
+    from unittest.mock import AsyncMock, MagicMock
+    monkeypatch.setattr(llm_provider, "_client_registry", _ClientRegistry(max_size=4))
+
+    async def fake_stream():
+        for piece in ["Bon", "jour"]:
+            yield MagicMock(choices=[MagicMock(delta=MagicMock(content=piece))])
+
+    with patch("src.core.llm_provider.OpenAI"), patch("src.core.llm_provider.AsyncOpenAI") as mock_async:
+        create = mock_async.return_value.chat.completions.create = AsyncMock()
+        llm = get_llm(provider="openai", model="gpt-4o-mini", user_api_key="sk-test")
+
+        create.return_value = MagicMock(choices=[MagicMock(message=MagicMock(content="Réponse"))])
+        assert asyncio.run(llm.achat("Bonjour")) == "Réponse"
+
+        create.return_value = fake_stream()
+        async def collect():
+            return [chunk async for chunk in llm.astream("Bonjour")]
+        assert asyncio.run(collect()) == ["Bon", "jour"]
+        assert create.call_args.kwargs["stream"] is True
+        assert mock_async.call_count == 1
+
+def _settings(temperature, allow_nonzero=False):
+    return {"temperature": temperature, "llm_fallbacks": [],
+            "llm_response_cache": {"enabled": True, "allow_nonzero_temperature": allow_nonzero}}
+
+def test_response_cache_serves_identical_prompts(tmp_path, monkeypatch):
+    """Vérifie qu'un prompt identique est servi depuis le cache sans rappeler le fournisseur"""
+    from src.core.cache import SQLiteCache
+    monkeypatch.setattr(llm_provider, "_client_registry", _ClientRegistry(max_size=4))
+    monkeypatch.setattr(llm_provider, "_response_cache", SQLiteCache(tmp_path / "llm.sqlite", table="llm_responses"))
+    monkeypatch.setattr(llm_provider, "_load_settings", lambda: _settings(0))
+
+    with patch("src.core.llm_provider.OpenAI") as mock_openai:
+        create = mock_openai.return_value.chat.completions.create
+        create.return_value.choices = [type("C", (), {"message": type("M", (), {"content": "Réponse"})()})()]
+        llm = get_llm(provider="openai", model="gpt-4o-mini", user_api_key="sk-test", cache=True)
+        assert llm.chat("Même prompt") == "Réponse"
+        assert llm.chat("Même prompt") == "Réponse"
+        llm.chat("Même prompt", json_mode=True)
+    assert create.call_count == 2
+
+def test_response_cache_bypassed_when_sampling(monkeypatch):
+    monkeypatch.setattr(llm_provider, "_client_registry", _ClientRegistry(max_size=4))
+    with patch("src.core.llm_provider.OpenAI"):
+        monkeypatch.setattr(llm_provider, "_load_settings", lambda: _settings(0.3))
+        assert not isinstance(get_llm(provider="openai", user_api_key="sk-test", cache=True), llm_provider.CachedLLM)
+        monkeypatch.setattr(llm_provider, "_load_settings", lambda: _settings(0.3, allow_nonzero=True))
+        assert isinstance(get_llm(provider="openai", user_api_key="sk-test", cache=True), llm_provider.CachedLLM)
+        assert not isinstance(get_llm(provider="openai", user_api_key="sk-test"), llm_provider.CachedLLM)
+
+def test_gemini_astream_iterates_async_generator():
+    """Vérifie que le streaming Gemini consomme directement le générateur asynchrone du SDK"""
+    import asyncio
+    from types import SimpleNamespace
+
+    async def fake_stream(**kwargs):
+        for text in ["Bon", "", "jour"]:
+            yield SimpleNamespace(text=text)
+
+    client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content_stream=fake_stream)))
+    with patch("google.genai.Client", return_value=client):
+        wrapper = llm_provider._make_gemini_client("gemini-2.0-flash", 0.3, 100, api_key="key")
+
+    async def collect():
+        return [chunk async for chunk in wrapper.astream("Bonjour ?")]
+    assert asyncio.run(collect()) == ["Bon", "jour"]
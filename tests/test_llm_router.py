@@ -0,0 +1,116 @@
+import time
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from src.core import llm_router
+from src.core.llm_router import LLMRouter, ProviderHealth, LLMProviderError, LLMUnavailableError, LLMRateLimitError, to_llm_error
+
+@pytest.fixture(autouse=True)
+def fresh_health(monkeypatch):
+    monkeypatch.setattr(llm_router, "_provider_health", {})
+
+def _backend(answer=None, error=None, delay=0.0):
+    client = MagicMock()
+    def chat(prompt, json_mode=False):
+        time.sleep(delay)
+        if error:
+            raise error
+        return answer
+    async def achat(prompt, json_mode=False):
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return answer
+    client.chat.side_effect = chat
+    client.achat.side_effect = achat
+    return client
+
+def test_failover_to_next_provider():
+    """Vérifie qu'une erreur du fournisseur principal bascule sur le suivant au lieu de renvoyer une chaîne d'erreur"""
+    primary = _backend(error=LLMProviderError("503", "openai"))
+    router = LLMRouter([("openai", primary), ("groq", _backend(answer="ok groq"))])
+    assert router.chat("Bonjour") == "ok groq"
+    assert asyncio.run(router.achat("Bonjour")) == "ok groq"
+
+def test_all_providers_failing_raises_typed_error():
+    router = LLMRouter([("openai", _backend(error=LLMProviderError("503", "openai")))])
+    with pytest.raises(LLMUnavailableError) as exc:
+        router.chat("Bonjour")
+    assert isinstance(exc.value.errors[0], LLMProviderError)
+
+def test_circuit_opens_after_repeated_failures():
+    """Vérifie qu'après plusieurs échecs le fournisseur est ignoré sans être appelé"""
+    primary = _backend(error=LLMProviderError("503", "openai"))
+    router = LLMRouter([("openai", primary), ("groq", _backend(answer="ok"))])
+    for _ in range(3):
+        router.chat("Bonjour")
+    router.chat("Bonjour")
+    assert primary.chat.call_count == 3
+    assert llm_router.get_provider_health_stats()["openai"]["circuit"] == "open"
+
+def test_half_open_circuit_recovers():
+    """Vérifie qu'en semi-ouvert une seule requête de test passe, et que son succès referme le circuit"""
+    health = ProviderHealth(failure_threshold=1, reset_timeout=0.05)
+    health.record_failure()
+    assert not health.allow()
+    time.sleep(0.06)
+    assert health.allow()
+    assert not health.allow()  # sonde déjà en cours
+    assert health.state()["circuit"] == "half-open"
+    health.record_success(0.1)
+    assert health.opened_at is None and health.allow()
+
+def test_failed_probe_reopens_circuit():
+    health = ProviderHealth(failure_threshold=1, reset_timeout=0.05)
+    health.record_failure()
+    time.sleep(0.06)
+    assert health.allow()
+    health.record_failure()
+    assert not health.allow() and health.state()["circuit"] == "open"
+
+def test_unused_fallback_keeps_its_probe():
+    """Vérifie qu'un fournisseur de secours semi-ouvert ne consomme sa sonde que s'il est réellement appelé"""
+    fallback_health = llm_router.get_provider_health("groq")
+    fallback_health.reset_timeout = 0.05
+    fallback_health.failure_threshold = 1
+    fallback_health.record_failure()
+    time.sleep(0.06)
+
+    fallback = _backend(answer="ok groq")
+    router = LLMRouter([("openai", _backend(answer="ok openai")), ("groq", fallback)])
+    assert router.chat("Bonjour") == "ok openai"
+    assert fallback_health.probe_started_at is None
+
+    router = LLMRouter([("openai", _backend(error=LLMProviderError("503", "openai"))), ("groq", fallback)])
+    assert router.chat("Bonjour") == "ok groq"
+    assert fallback_health.state()["circuit"] == "closed"
+
+def test_client_errors_do_not_open_circuit():
+    """Vérifie qu'une erreur 4xx (requête invalide, clé refusée) ne compte pas comme une panne du fournisseur"""
+    bad_request = Exception("invalid request")
+    bad_request.status_code = 400
+    primary = MagicMock()
+    primary.chat.side_effect = bad_request
+    router = LLMRouter([("openai", primary), ("groq", _backend(answer="ok"))])
+    for _ in range(5):
+        assert router.chat("Bonjour") == "ok"
+    assert primary.chat.call_count == 5
+    assert llm_router.get_provider_health_stats()["openai"]["circuit"] == "closed"
+
+def test_hedged_request_returns_fastest_answer():
+    """Vérifie qu'un fournisseur plus lent que son p95 habituel déclenche une requête en parallèle"""
+    health = llm_router.get_provider_health("openai")
+    for _ in range(20):
+        health.record_success(0.05)
+    router = LLMRouter([("openai", _backend(answer="lent", delay=1.0)), ("groq", _backend(answer="rapide"))], hedge_percentile=0.95)
+
+    start = time.perf_counter()
+    assert router.chat("Bonjour") == "rapide"
+    assert time.perf_counter() - start < 0.5
+    assert asyncio.run(router.achat("Bonjour")) == "rapide"
+
+def test_sdk_errors_are_classified():
+    rate_limited = Exception("Too many requests")
+    rate_limited.status_code = 429
+    assert isinstance(to_llm_error("openai", rate_limited), LLMRateLimitError)
+    assert isinstance(to_llm_error("openai", ValueError("boom")), LLMProviderError)
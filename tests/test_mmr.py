@@ -0,0 +1,29 @@
+import numpy as np
+from src.core.mmr import mmr_select, normalize_rows
+
+def test_pure_relevance_order():
+    """Avec lambda=1, la sélection suit simplement la pertinence"""
+    vectors = normalize_rows(np.eye(4))
+    indices, scores = mmr_select(vectors, [0.2, 0.9, 0.5, 0.7], top_n=3, lambda_mult=1.0)
+    assert list(indices) == [1, 3, 2]
+    assert np.allclose(scores, [0.9, 0.7, 0.5])
+
+def test_near_duplicates_are_penalized():
+    """Vérifie qu'un quasi-doublon du premier choix est écarté au profit d'un résultat différent"""
+    vectors = normalize_rows([
+        [1.0, 0.0, 0.0],
+        [0.99, 0.01, 0.0],  # quasi-doublon du premier
+        [0.0, 1.0, 0.0],
+    ])
+    indices, _ = mmr_select(vectors, [0.9, 0.88, 0.6], top_n=2, lambda_mult=0.5)
+    assert list(indices) == [0, 2]
+
+def test_redundancy_threshold_limits_selection():
+    """Vérifie que le seuil de redondance exclut les doublons même s'il reste de la place"""
+    vectors = normalize_rows([[1.0, 0.0], [1.0, 0.001], [0.999, 0.0]])
+    indices, _ = mmr_select(vectors, [0.9, 0.8, 0.7], top_n=3, lambda_mult=1.0, redundancy_threshold=0.95)
+    assert list(indices) == [0]
+
+def test_empty_candidates():
+    indices, scores = mmr_select(np.empty((0, 8), dtype=np.float32), [], top_n=3)
+    assert len(indices) == 0 and len(scores) == 0
@@ -0,0 +1,49 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from api import app
+from src.api import analysis
+from src.api.auth import get_current_user
+from src.core import orchestration
+from src.core.llm_router import LLMProviderError
+from src.models.usage import UsageLog
+
+def _agent(chunks, error=None):
+    async def astream(text, tone="standard", job_offer=None):
+        for chunk in chunks:
+            yield chunk
+        if error:
+            raise error
+    agent = MagicMock()
+    agent.astream_optimize_description.side_effect = astream
+    return agent
+
+@pytest.fixture
+def stream(db_session_factory):
+    user = MagicMock(id=1, llm_provider="openai")
+    def call(agent):
+        with patch.dict(app.dependency_overrides, {get_current_user: lambda: user}), \
+             patch.object(analysis, "SessionLocal", db_session_factory), \
+             patch.object(orchestration, "optimizer_agent", agent):
+            response = TestClient(app).post("/api/optimize-description/stream", json={"text": "Développement d'API"})
+        db = db_session_factory()
+        try:
+            statuses = [log.status for log in db.query(UsageLog).filter(UsageLog.action == "text_optimization")]
+        finally:
+            db.close()
+        return [json.loads(line) for line in response.text.splitlines()], statuses
+    return call
+
+def test_stream_ends_with_result_and_logs_usage(stream):
+    events, statuses = stream(_agent(["Conçu ", "des API "]))
+    assert [e["event"] for e in events] == ["chunk", "chunk", "result"]
+    assert events[-1]["data"] == {"optimized_text": "Conçu des API"}
+    assert statuses == ["success"]
+
+def test_llm_error_mid_stream_emits_error_event(stream):
+    """Vérifie qu'une erreur du LLM en cours de flux termine par un événement 'error' et journalise l'échec"""
+    events, statuses = stream(_agent(["Conçu "], error=LLMProviderError("503", "openai")))
+    assert [e["event"] for e in events] == ["chunk", "error"]
+    assert "503" in events[-1]["data"]["detail"]
+    assert statuses == ["error"]
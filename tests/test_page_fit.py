@@ -0,0 +1,45 @@
+import pytest
+from src.core import page_fit
+
+PROFILE = {"education": [{"institution": "INSA"}], "languages": [{"name": "Anglais", "level": "C1"}], "skills": ["Python"]}
+
+def _content(n_exp, n_bullets, length=180):
+    return {
+        "summary": "Ingénieur data.",
+        "experiences": [{"title": "Dev", "bullets": ["x" * length + ". Détail" for _ in range(n_bullets)]} for _ in range(n_exp)],
+        "hard_skills": ["Python", "SQL"],
+    }
+
+@pytest.fixture(autouse=True)
+def isolated_calibration(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_fit, "CALIBRATION_PATH", tmp_path / "page_fit.json")
+
+def test_short_cv_is_left_untouched():
+    content = _content(2, 2, length=50)
+    assert page_fit.fits_on_page(content, PROFILE, "modern")
+    assert page_fit.fit_to_page(content, PROFILE, "modern") == content
+
+def test_overflowing_cv_is_trimmed_before_any_compile():
+    """Vérifie qu'un contenu trop long est réduit localement, en gardant au moins une puce par expérience"""
+    content = _content(5, 6)
+    assert not page_fit.fits_on_page(content, PROFILE, "modern")
+
+    fitted = page_fit.fit_to_page(content, PROFILE, "modern")
+    assert page_fit.fits_on_page(fitted, PROFILE, "modern")
+    assert all(len(e["bullets"]) >= 1 for e in fitted["experiences"])
+    assert len(content["experiences"][0]["bullets"]) == 6  # l'original n'est pas modifié
+
+def test_calibration_learns_from_compiles(tmp_path):
+    """Vérifie que la capacité du template s'ajuste quand l'estimation s'est trompée"""
+    capacity = page_fit.get_layout("modern")["lines_per_page"]
+    page_fit.record_observation("modern", capacity - 5, page_count=2)
+    lowered = page_fit.get_layout("modern")["lines_per_page"]
+    assert lowered < capacity - 5
+
+    page_fit.record_observation("modern", lowered + 3, page_count=1)
+    assert page_fit.get_layout("modern")["lines_per_page"] == lowered + 3
+    assert page_fit.get_layout("photo_header")["lines_per_page"] == page_fit.DEFAULT_LAYOUTS["photo_header"]["lines_per_page"]
+    assert [f.name for f in tmp_path.iterdir()] == ["page_fit.json"]  # aucun fichier temporaire restant
+
+def test_bullet_budget_shrinks_with_more_experiences():
+    assert page_fit.bullet_char_budget(PROFILE, [{}] * 2, "modern") > page_fit.bullet_char_budget(PROFILE, [{}] * 5, "modern")
@@ -0,0 +1,39 @@
+import pytest
+from unittest.mock import MagicMock
+from src.agents import parser as parser_module
+from src.agents.parser import ParserAgent, JobOfferData
+from src.core.cache import SQLiteCache
+
+OFFER = JobOfferData(skills=["Python", "SQL"], missions=["Construire des pipelines"], values=[], location="Paris")
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    monkeypatch.setattr(parser_module, "_parse_cache", SQLiteCache(tmp_path / "job_offers.sqlite", table="job_offers", ttl_seconds=3600))
+    agent = ParserAgent.__new__(ParserAgent)
+    agent._cache_namespace = "gpt-4o-mini:abc"
+    agent.program = MagicMock(return_value=OFFER)
+    return agent
+
+def test_identical_offer_is_parsed_once(agent):
+    """Vérifie qu'une même offre (aux espaces près) ne déclenche qu'une extraction LLM"""
+    first = agent.extract_information("Data Engineer  Python\nSQL")
+    second = agent.extract_information("Data Engineer Python SQL ")
+
+    assert agent.program.call_count == 1
+    assert first == second == OFFER.model_dump()
+    assert parser_module.get_parse_cache_stats()["hits"] == 1
+
+def test_prompt_or_model_change_invalidates(agent):
+    agent.extract_information("Offre Python")
+    agent._cache_namespace = "gpt-4o-mini:def"
+    agent.extract_information("Offre Python")
+    assert agent.program.call_count == 2
+
+def test_rule_based_fallback_is_not_cached(agent):
+    """Vérifie que le repli par mots-clés n'est jamais mémorisé"""
+    agent.program.side_effect = [RuntimeError("LLM indisponible"), OFFER]
+    fallback = agent.extract_information("Offre Python et Docker")
+    assert fallback["skills"] == ["python", "docker"]
+
+    assert agent.extract_information("Offre Python et Docker") == OFFER.model_dump()
+    assert agent.program.call_count == 2
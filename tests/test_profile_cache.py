@@ -0,0 +1,63 @@
+import pytest
+from unittest.mock import patch
+from sqlalchemy import event
+from src.core import knowledge_base
+from src.core.knowledge_base import get_profile_from_db, invalidate_profile_cache
+from src.models.user import User
+from src.models.profile import Experience, Education, Skill, Language
+
+@pytest.fixture
+def db(db_session):
+    session = db_session
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    user = User(email="a@b.c", full_name="Jean Dupont", profile_version=0)
+    session.add(user)
+    session.commit()
+    for i in range(3):
+        session.add(Experience(user_id=user.id, title=f"Poste {i}", company="ACME", description="..."))
+    session.add(Education(user_id=user.id, institution="INSA", degree="Ingénieur"))
+    session.add_all([Skill(user_id=user.id, name="Python"), Skill(user_id=user.id, name="Écoute", category="Soft")])
+    session.add(Language(user_id=user.id, name="Anglais", level="C1"))
+    session.commit()
+    with patch.dict(knowledge_base._profile_cache, clear=True):
+        yield session, user.id, statements
+
+def test_profile_is_loaded_eagerly_then_served_from_cache(db):
+    """Vérifie le chargement en requêtes groupées, puis une seule requête de version sur les appels suivants"""
+    session, user_id, statements = db
+    session.expire_all()
+    statements.clear()
+    profile = get_profile_from_db(session, user_id)
+    assert len(profile.experiences) == 3 and profile.skills == ["Python"] and profile.soft_skills == ["Écoute"]
+    assert len(statements) == 6  # version + user + 4 relations (indépendant du nombre de lignes)
+
+    statements.clear()
+    again = get_profile_from_db(session, user_id)
+    assert len(statements) == 1
+    assert again == profile
+
+def test_cached_profile_is_a_private_copy(db):
+    session, user_id, _ = db
+    first = get_profile_from_db(session, user_id)
+    first.skills.append("Modifié par l'appelant")
+    assert get_profile_from_db(session, user_id).skills == ["Python"]
+
+def test_profile_change_invalidates_cache(db):
+    """Vérifie qu'une modification du profil (version incrémentée) est visible immédiatement"""
+    session, user_id, _ = db
+    get_profile_from_db(session, user_id)
+
+    session.add(Skill(user_id=user_id, name="SQL"))
+    invalidate_profile_cache(session, user_id)
+    session.commit()
+    assert "SQL" in get_profile_from_db(session, user_id).skills
+
+    # Modification faite par un autre processus : seul le numéro de version en base change
+    session.query(Skill).filter(Skill.name == "SQL").delete()
+    session.query(User).filter(User.id == user_id).update({User.profile_version: User.profile_version + 1})
+    session.commit()
+    assert "SQL" not in get_profile_from_db(session, user_id).skills
+
+    with pytest.raises(ValueError):
+        get_profile_from_db(session, 999)
@@ -0,0 +1,106 @@
+import os
+import time
+from datetime import datetime, timezone
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from src.core import retention
+from src.models.usage import UsageLog
+
+NOW = time.time()
+DAY = 86400
+
+@pytest.fixture
+def env(tmp_path, db_session_factory):
+    Session = db_session_factory
+    root = tmp_path / "generated_cvs"
+    root.mkdir()
+    policy = {"max_age_days": 14, "max_size_mb": 1, "keep_latest_per_user": 2, "sweep_interval_minutes": 30}
+    with patch.object(retention, "SessionLocal", Session), \
+         patch.object(retention, "_policy", return_value=policy):
+        yield root, Session, policy
+
+def _cv(root, Session, name, user_id, age_days, size=100, file_age_days=None):
+    """Dossier de CV lié à un job créé il y a `age_days` jours (fichiers datés de `file_age_days`, par défaut pareil)"""
+    folder = root / name
+    folder.mkdir()
+    pdf = folder / f"cv_{name}.pdf"
+    pdf.write_bytes(b"0" * size)
+    (folder / f"cv_{name}.aux").write_text("aux")
+    file_age_days = age_days if file_age_days is None else file_age_days
+    for f in folder.iterdir():
+        os.utime(f, (NOW - file_age_days * DAY,) * 2)
+    db = Session()
+    created = datetime.fromtimestamp(NOW - age_days * DAY, tz=timezone.utc).replace(tzinfo=None)
+    log = UsageLog(user_id=user_id, action="cv_generation", status="success", model=str(pdf), timestamp=created)
+    db.add(log)
+    db.commit()
+    log_id = log.id
+    db.close()
+    return folder, log_id
+
+def _status(Session, log_id):
+    db = Session()
+    try:
+        return db.get(UsageLog, log_id).status
+    finally:
+        db.close()
+
+def test_sweep_applies_age_and_per_user_rules(env):
+    """Vérifie la suppression des CV trop vieux ou au-delà des N plus récents par utilisateur, et l'expiration des jobs"""
+    root, Session, _ = env
+    old, old_id = _cv(root, Session, "old", 1, age_days=20)
+    a, _ = _cv(root, Session, "a", 2, age_days=3)
+    b, _ = _cv(root, Session, "b", 2, age_days=2)
+    c, c_id = _cv(root, Session, "c", 2, age_days=4)
+    fresh = root / "in_progress"
+    fresh.mkdir()
+
+    result = retention.sweep(root, now=NOW)
+
+    assert result["removed_dirs"] == 2 and result["expired_jobs"] == 2
+    assert not old.exists() and not c.exists()
+    assert a.exists() and b.exists() and fresh.exists()
+    assert not (a / "cv_a.aux").exists() and (a / "cv_a.pdf").exists()
+    assert _status(Session, old_id) == "expired" and _status(Session, c_id) == "expired"
+
+def test_age_comes_from_job_creation_not_file_mtime(env):
+    """Vérifie que l'âge d'un dossier lié à un job vient de la date du job, et du mtime pour un dossier orphelin"""
+    root, Session, _ = env
+    copied, copied_id = _cv(root, Session, "copied", 1, age_days=1, file_age_days=20)
+    stale, _ = _cv(root, Session, "stale", 1, age_days=20, file_age_days=0.5)
+    orphan = root / "orphan"
+    orphan.mkdir()
+    (orphan / "cv.pdf").write_bytes(b"0")
+    os.utime(orphan / "cv.pdf", (NOW - 20 * DAY,) * 2)
+
+    retention.sweep(root, now=NOW)
+    assert copied.exists() and _status(Session, copied_id) == "success"
+    assert not stale.exists() and not orphan.exists()
+
+def test_sweep_bounds_total_size_oldest_first(env):
+    root, Session, policy = env
+    policy["keep_latest_per_user"] = 10
+    first, _ = _cv(root, Session, "first", 1, age_days=5, size=600 * 1024)
+    second, _ = _cv(root, Session, "second", 1, age_days=4, size=600 * 1024)
+
+    retention.sweep(root, now=NOW)
+    assert not first.exists() and second.exists()
+
+def test_download_of_collected_cv_returns_410(env):
+    """Vérifie qu'un CV supprimé par le nettoyage renvoie 410 et non une erreur 500"""
+    from api import app
+    from src.core.database import get_db
+    root, Session, _ = env
+    folder, log_id = _cv(root, Session, "gone", 1, age_days=30)
+    retention.sweep(root, now=NOW)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+    with patch.dict(app.dependency_overrides, {get_db: override_get_db}):
+        response = TestClient(app).get(f"/api/download/{log_id}")
+    assert response.status_code == 410
@@ -0,0 +1,95 @@
+import pytest
+import numpy as np
+from unittest.mock import patch
+from src.core import skill_vectors
+from src.core.orchestration import _rank_skills_by_relevance, _calculate_fuzzy_keyword_score
+
+def _unit(i):
+    vec = [0.0] * 1536
+    vec[i] = 1.0
+    return vec
+
+# Un axe par compétence ; "conteneurisation" est volontairement sur le même axe que Docker
+SKILL_AXES = {"passage: python": 0, "passage: sql": 1, "passage: docker": 2, "passage: conteneurisation": 2, "passage: excel": 3}
+
+def fake_embeddings(texts):
+    return [_unit(SKILL_AXES[t]) for t in texts]
+
+@pytest.fixture(autouse=True)
+def isolated_vocabulary(tmp_path, monkeypatch):
+    monkeypatch.setattr(skill_vectors, "EMBEDDINGS_DIR", str(tmp_path))
+    monkeypatch.setattr(skill_vectors, "_vocabulary", skill_vectors.SkillVocabulary(tmp_path / "vocab.sqlite"))
+
+def test_ranking_uses_precomputed_vectors():
+    """Vérifie que le classement n'encode plus les compétences une fois le profil enregistré"""
+    with patch("src.core.skill_vectors.get_embeddings", side_effect=fake_embeddings):
+        skill_vectors.update_user_skill_vectors(7, ["Python", "SQL", "Docker"])
+
+    query = np.zeros(1536)
+    query[1], query[0] = 0.9, 0.4
+    with patch("src.core.vector_store.get_embedding", return_value=query.tolist()):
+        with patch("src.core.skill_vectors.get_embeddings") as mock_embed:
+            ranked = _rank_skills_by_relevance(["Python", "SQL", "Docker"], "Offre data", top_n=2, user_id=7)
+            mock_embed.assert_not_called()
+
+    assert ranked == ["SQL", "Python"]
+
+def test_vocabulary_is_shared_across_users():
+    """Vérifie qu'une compétence déjà connue (même écrite différemment) n'est jamais ré-encodée"""
+    with patch("src.core.skill_vectors.get_embeddings", side_effect=fake_embeddings) as mock_embed:
+        skill_vectors.update_user_skill_vectors(1, ["Python", "SQL"])
+        skill_vectors.update_user_skill_vectors(2, [" python ", "SQL", "Excel"])
+        assert mock_embed.call_args_list[1].args[0] == ["passage: excel"]
+
+    assert len(skill_vectors._vocabulary) == 3
+    refs_1 = skill_vectors._load_skill_refs(1)
+    refs_2 = skill_vectors._load_skill_refs(2)
+    assert refs_1["Python"] == refs_2[" python "]
+
+def test_new_skill_is_resolved_without_touching_references():
+    """Vérifie qu'une compétence absente des références est résolue sans réécrire les références de l'utilisateur"""
+    with patch("src.core.skill_vectors.get_embeddings", side_effect=fake_embeddings):
+        skill_vectors.update_user_skill_vectors(8, ["Python", "Excel"])
+
+    with patch("src.core.skill_vectors.get_embeddings", side_effect=fake_embeddings) as mock_embed:
+        matrix = skill_vectors.get_skill_matrix(["Python", "Docker"], user_id=8)
+        mock_embed.assert_called_once_with(["passage: docker"])
+    assert matrix.shape == (2, 1536)
+    assert matrix[1][2] == 1.0
+    assert set(skill_vectors._load_skill_refs(8)) == {"Python", "Excel"}
+
+def test_offer_skills_are_not_added_to_vocabulary():
+    """Vérifie que les compétences d'une offre sont encodées à la volée sans enrichir le vocabulaire partagé"""
+    with patch("src.core.skill_vectors.get_embeddings", side_effect=fake_embeddings):
+        skill_vectors.update_user_skill_vectors(9, ["Python"])
+
+    with patch("src.core.skill_vectors.get_embeddings", side_effect=fake_embeddings) as mock_embed:
+        matrix = skill_vectors.get_offer_skill_matrix(["Python", "Conteneurisation"])
+        mock_embed.assert_called_once_with(["passage: conteneurisation"])
+    assert matrix[0][0] == 1.0 and matrix[1][2] == 1.0
+    assert len(skill_vectors._vocabulary) == 1
+
+def test_keyword_score_semantic_fallback():
+    """Vérifie qu'une compétence sans correspondance orthographique est reconnue sémantiquement"""
+    with patch("src.core.skill_vectors.get_embeddings", side_effect=fake_embeddings):
+        score = _calculate_fuzzy_keyword_score(["python", "Conteneurisation", "Excel"], ["Python", "Docker"])
+    assert round(score) == 67
+
+def test_top_k_indices_order():
+    scores = np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32)
+    assert list(skill_vectors.top_k_indices(scores, 3)) == [1, 3, 2]
+    assert list(skill_vectors.top_k_indices(scores, 10)) == [1, 3, 2, 0]
+
+def test_concurrent_reference_writes_never_mix(tmp_path):
+    """Vérifie que des écritures simultanées des références laissent un fichier complet, sans fichier temporaire"""
+    import json
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+
+    versions = [{f"compétence {n}-{i}": i for i in range(200)} for n in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda refs: [skill_vectors._save_skill_refs(5, refs) for _ in range(20)], versions))
+
+    with open(skill_vectors._skill_refs_path(5), encoding="utf-8") as f:
+        assert json.load(f) in versions
+    assert os.listdir(tmp_path) == ["user_5_skills.json"]
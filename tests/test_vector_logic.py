@@ -32,3 +32,113 @@ def test_vector_store_search_logic():
         assert len(results) > 0
         assert "Python" in results[0]["content"]
         assert results[0]["id"] == 1
+
+def _unit(i):
+    """Vecteur unitaire de dimension 1536 sur l'axe i."""
+    vec = [0.0] * 1536
+    vec[i] = 1.0
+    return vec
+
+def test_incremental_upsert_and_remove():
+    """Vérifie qu'une mise à jour ne ré-encode que le document modifié"""
+    from src.core.vector_store import make_doc_id, upsert_documents
+
+    docs = [
+        {"doc_id": make_doc_id("experience", 10), "content": "Expert en Python", "type": "experience"},
+        {"doc_id": make_doc_id("experience", 11), "content": "Expert en Java", "type": "experience"},
+    ]
+    with patch('src.core.vector_store.get_embeddings', return_value=[_unit(0), _unit(1)]):
+        build_vector_store(docs, index_name="test_incremental")
+
+    # Mise à jour de l'expérience 11 : seul ce document est envoyé à l'API
+    updated = [{"doc_id": make_doc_id("experience", 11), "content": "Designer UI/UX", "type": "experience"}]
+    with patch('src.core.vector_store.get_embeddings', return_value=[_unit(2)]) as mock_embed:
+        assert upsert_documents("test_incremental", updated) is True
+        mock_embed.assert_called_once_with(["Designer UI/UX"])
+
+    with patch('src.core.vector_store.get_embedding', return_value=_unit(2)):
+        results = search_vector_store("Design", index_name="test_incremental", top_n=3)
+    assert len(results) == 2
+    assert results[0]["content"] == "Designer UI/UX"
+
+    # Suppression de l'expérience 10
+    with patch('src.core.vector_store.get_embeddings') as mock_embed:
+        assert upsert_documents("test_incremental", [], remove_ids=[make_doc_id("experience", 10)]) is True
+        mock_embed.assert_not_called()
+
+    with patch('src.core.vector_store.get_embedding', return_value=_unit(0)):
+        results = search_vector_store("Python", index_name="test_incremental", top_n=3)
+    assert [r["content"] for r in results] == ["Designer UI/UX"]
+
+def test_upsert_requires_existing_index():
+    """Vérifie qu'un index absent demande une reconstruction complète"""
+    from src.core.vector_store import upsert_documents
+    assert upsert_documents("test_missing_index", [{"doc_id": 1, "content": "x"}]) is False
+
+def test_loaded_index_cache_hits_and_invalidation():
+    """Vérifie que l'index chargé est réutilisé puis invalidé après reconstruction"""
+    from src.core import vector_store
+
+    docs = [{"content": "Expert en Python"}, {"content": "Expert en Java"}]
+    with patch('src.core.vector_store.get_embeddings', return_value=[_unit(0), _unit(1)]):
+        build_vector_store(docs, index_name="test_cache")
+
+    before = vector_store.get_index_cache_stats()
+    with patch('src.core.vector_store.get_embedding', return_value=_unit(0)):
+        with patch('src.core.vector_store.faiss.deserialize_index', wraps=vector_store.faiss.deserialize_index) as mock_read:
+            search_vector_store("Python", index_name="test_cache", top_n=1)
+            search_vector_store("Python", index_name="test_cache", top_n=1)
+            assert mock_read.call_count == 1
+
+    after = vector_store.get_index_cache_stats()
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"] + 1
+
+    # Une reconstruction invalide l'entrée en mémoire
+    with patch('src.core.vector_store.get_embeddings', return_value=[_unit(1)]):
+        build_vector_store([{"content": "Designer UI/UX"}], index_name="test_cache")
+    with patch('src.core.vector_store.get_embedding', return_value=_unit(1)):
+        results = search_vector_store("Design", index_name="test_cache", top_n=1)
+    assert results[0]["content"] == "Designer UI/UX"
+
+def test_metadata_sidecar_has_no_embeddings():
+    """Vérifie que les vecteurs ne sont stockés que dans l'index FAISS"""
+    import json
+    from src.core.vector_store import _index_paths
+
+    docs = [{"content": "Expert en Python"}, {"content": "Expert en Java"}]
+    with patch('src.core.vector_store.get_embeddings', return_value=[_unit(0), _unit(1)]):
+        build_vector_store(docs, index_name="test_sidecar")
+
+    with open(_index_paths("test_sidecar")[1], encoding="utf-8") as f:
+        stored = json.load(f)
+    assert all("embedding" not in doc for doc in stored["documents"])
+
+    # Les vecteurs sont relus depuis l'index pour la diversification
+    with patch('src.core.vector_store.get_embedding', return_value=_unit(1)):
+        results = search_vector_store("Java", index_name="test_sidecar", top_n=1)
+    assert np.allclose(results[0]["embedding"], _unit(1))
+
+def test_mismatched_index_files_are_rejected():
+    """Vérifie qu'un .faiss et un .json issus de deux écritures différentes ne sont jamais chargés ensemble"""
+    import os
+    import shutil
+    from src.core import vector_store
+    from src.core.vector_store import _index_paths, _load_index
+
+    index_path, data_path = _index_paths("test_pair")
+    with patch('src.core.vector_store.get_embeddings', return_value=[_unit(0)]):
+        build_vector_store([{"content": "Expert en Python"}], index_name="test_pair")
+    shutil.copy(index_path, index_path + ".old")
+    with patch('src.core.vector_store.get_embeddings', return_value=[_unit(1), _unit(2)]):
+        build_vector_store([{"content": "Designer"}, {"content": "Chef de projet"}], index_name="test_pair")
+
+    index, documents = _load_index("test_pair")
+    assert index.ntotal == 2 and len(documents) == 2
+    # Aucun fichier temporaire ne reste dans le dossier
+    assert not [f for f in os.listdir(os.path.dirname(index_path)) if f.startswith(".test_pair.")]
+
+    # Écrivain interrompu entre les deux renommages : ancien .faiss, nouveau .json
+    os.replace(index_path + ".old", index_path)
+    with patch.object(vector_store.time, "sleep"):
+        assert _load_index("test_pair") == (None, None)
@@ -0,0 +1,27 @@
+# worker.py (CV generation worker process)
+import os
+import sys
+import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from src.core.database import engine, Base, run_auto_migrations
+from src.models.user import User
+from src.models.profile import Experience, Education, Skill, Language
+from src.models.usage import UsageLog
+from src.models.job import Job
+from src.core.job_queue import JobWorker
+from src.core.latex_compiler import available_engines
+import src.api.generation  # registers the "cv_generation" handler
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    run_auto_migrations()
+    available_engines()
+
+    # Concurrency per process: JOB_WORKER_CONCURRENCY (scale out by starting more processes)
+    JobWorker().run_forever()